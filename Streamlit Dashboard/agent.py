@@ -1,8 +1,334 @@
 import requests
+import urllib3
 import json
 import pandas as pd
+import random
 import time
-import sys
+import threading
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from json_output import VERDICT_SCHEMA, parse_json_answer, reask_prompt
+from llm_cache import ResponseCache, get_response_cache, payload_key
+from sensor_index import SensorIndex
+
+
+class OllamaError(Exception):
+    """Base class of Ollama client errors."""
+
+
+class OllamaConnectionError(OllamaError):
+    """The Ollama server cannot be reached."""
+
+
+class OllamaUnavailableError(OllamaConnectionError):
+    """The server's circuit breaker is open: calls fail fast until a probe succeeds."""
+
+
+class OllamaTimeoutError(OllamaError):
+    """The server did not answer (or stopped streaming) within the read timeout."""
+
+
+class OllamaModelNotFoundError(OllamaError):
+    """The requested model is not installed on the Ollama server."""
+
+    def __init__(self, message: str, available_models: Optional[List[str]] = None):
+        super().__init__(message)
+        self.available_models = available_models or []
+
+
+class OllamaOutputError(OllamaError):
+    """The model's answer is not valid JSON for the expected schema, even after repair and re-asking."""
+
+    def __init__(self, message: str, text: str = "", errors: Optional[List[str]] = None):
+        super().__init__(message)
+        self.text = text
+        self.errors = errors or []
+
+
+OLLAMA_SETUP_HELP = """
+Please ensure Ollama is installed and running:
+
+1. Install Ollama:
+   curl -fsSL https://ollama.com/install.sh | sh
+
+2. Start the server:
+   ollama serve
+
+3. Pull the model:
+   ollama pull mistral
+"""
+
+
+class _HealthCache:
+    """
+    Process-wide cache of Ollama server health and installed models, per base URL.
+
+    A fresh entry is served without any request. A stale entry is still served
+    while one background thread refreshes it, so callers never wait on the
+    check after the first one. Failures are kept for a shorter TTL so that a
+    restarted server is noticed quickly.
+    """
+
+    def __init__(self, ttl: float = 30.0, failure_ttl: float = 5.0, timeout: float = 5.0):
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.timeout = timeout
+        self._entries = {}  # base_url -> (checked_at, models, error)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def models(self, base_url: str) -> List[str]:
+        """
+        Names of the models installed on the server.
+
+        Raises:
+            OllamaConnectionError: If the server could not be reached at the last check
+        """
+        with self._lock:
+            entry = self._entries.get(base_url)
+        if entry is None:
+            entry = self._refresh(base_url)
+        else:
+            checked_at, _, error = entry
+            ttl = self.ttl if error is None else self.failure_ttl
+            if time.monotonic() - checked_at > ttl:
+                self._refresh_in_background(base_url)
+
+        _, models, error = entry
+        if error is not None:
+            raise type(error)(*error.args)
+        return models
+
+    def invalidate(self, base_url: Optional[str] = None):
+        """Forgets the cached check of one server (or of all servers)."""
+        with self._lock:
+            if base_url is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(base_url, None)
+
+    def _refresh(self, base_url: str):
+        models, error = [], None
+        try:
+            response = requests.get(f"{base_url}/api/tags", timeout=self.timeout)
+            response.raise_for_status()
+            models = [m["name"] for m in response.json().get("models", [])]
+        except requests.exceptions.ConnectionError:
+            error = OllamaConnectionError(f"❌ Cannot connect to Ollama server at {base_url}\n{OLLAMA_SETUP_HELP}")
+        except Exception as e:
+            error = OllamaConnectionError(f"❌ Error checking Ollama connection: {str(e)}")
+
+        entry = (time.monotonic(), models, error)
+        with self._lock:
+            self._entries[base_url] = entry
+        return entry
+
+    def _refresh_in_background(self, base_url: str):
+        with self._lock:
+            if base_url in self._refreshing:
+                return
+            self._refreshing.add(base_url)
+
+        def refresh():
+            try:
+                self._refresh(base_url)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(base_url)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+
+class _CircuitBreaker:
+    """
+    Circuit breaker of one Ollama server, shared by every client of that URL.
+
+    closed: calls go through; consecutive server failures are counted (see
+    OllamaLLM._record_failure). After failure_threshold of them it opens.
+    open: calls fail immediately with OllamaUnavailableError, and a background
+    thread probes /api/tags every probe_interval seconds.
+    half_open: a probe succeeded; calls go through again, and the first one
+    decides: success closes the breaker, failure reopens it.
+    """
+
+    def __init__(self, base_url: str, failure_threshold: int = 3, probe_interval: float = 5.0,
+                 probe_timeout: float = 3.0):
+        self.base_url = base_url
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def check(self):
+        """
+        Raises:
+            OllamaUnavailableError: If the breaker is open
+        """
+        if self.state == "open":
+            raise self.unavailable_error()
+
+    def unavailable_error(self) -> OllamaUnavailableError:
+        with self._lock:
+            since = time.monotonic() - self.opened_at if self.opened_at is not None else 0.0
+            error = self.last_error
+        return OllamaUnavailableError(
+            f"❌ Ollama server at {self.base_url} is unavailable (failing fast for {since:.0f}s, "
+            f"probing every {self.probe_interval:g}s). Last error: {error}"
+        )
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.state == "open" or (self.state == "closed" and self.failures < self.failure_threshold):
+                return
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            if self._probing:
+                return
+            self._probing = True
+        print(f"⚠️ Ollama at {self.base_url} failed {self.failures} times; failing fast until it recovers")
+        _health.invalidate(self.base_url)
+        threading.Thread(target=self._probe, daemon=True).start()
+
+    def _probe(self):
+        try:
+            while True:
+                time.sleep(self.probe_interval)
+                try:
+                    requests.get(f"{self.base_url}/api/tags", timeout=self.probe_timeout).raise_for_status()
+                except requests.exceptions.RequestException as e:
+                    with self._lock:
+                        self.last_error = str(e)
+                    continue
+                with self._lock:
+                    if self.state == "open":
+                        self.state = "half_open"
+                _health.invalidate(self.base_url)
+                print(f"✅ Ollama at {self.base_url} answered a probe; letting calls through again")
+                return
+        finally:
+            with self._lock:
+                self._probing = False
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "base_url": self.base_url,
+                "state": self.state,
+                "failures": self.failures,
+                "open_seconds": time.monotonic() - self.opened_at if self.opened_at is not None else None,
+                "last_error": self.last_error
+            }
+
+
+def _is_read_timeout(error: Exception) -> bool:
+    """
+    Read timeouts, including those raised while reading a response body: requests
+    reports a body read that timed out (e.g. a stream stalled mid-generation) as
+    a ConnectionError wrapping urllib3's ReadTimeoutError.
+    """
+    if isinstance(error, requests.exceptions.ReadTimeout):
+        return True
+    return (isinstance(error, requests.exceptions.ConnectionError) and bool(error.args)
+            and isinstance(error.args[0], urllib3.exceptions.ReadTimeoutError))
+
+
+def _is_server_failure(error: Exception) -> bool:
+    """
+    Errors that say the server is down or broken: connection errors (including
+    connect timeouts and connections dropped mid-response) and 5xx responses.
+    Read timeouts and malformed bodies are not: they can come from one request.
+    """
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+    if _is_read_timeout(error):
+        return False
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError))
+
+
+_health = _HealthCache()
+_breakers = {}
+_breakers_lock = threading.Lock()
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _breaker(base_url: str) -> _CircuitBreaker:
+    with _breakers_lock:
+        breaker = _breakers.get(base_url)
+        if breaker is None:
+            breaker = _breakers[base_url] = _CircuitBreaker(base_url)
+        return breaker
+
+
+def ollama_status(base_url: str = "http://localhost:11434") -> Dict[str, Any]:
+    """
+    Circuit breaker state of an Ollama server, for display.
+
+    Returns:
+        Dictionary containing:
+            - base_url: Server URL
+            - state: "closed" (healthy), "open" (failing fast) or "half_open" (recovering)
+            - failures: Consecutive server failures
+            - open_seconds: Time since the breaker opened (None unless open)
+            - last_error: Last failure message
+            - label: One-line summary with a status emoji
+    """
+    status = _breaker(base_url).status()
+    if status["state"] == "open":
+        status["label"] = f"🔴 Ollama unavailable for {status['open_seconds']:.0f}s, probing for recovery"
+    elif status["state"] == "half_open":
+        status["label"] = "🟡 Ollama recovering"
+    elif status["failures"]:
+        status["label"] = f"🟠 Ollama: {status['failures']} recent failure(s)"
+    else:
+        status["label"] = "🟢 Ollama available"
+    return status
+
+
+class TokenStream:
+    """
+    Iterator over the text chunks of one streamed generation.
+
+    While iterating, text accumulates the response so far. Once exhausted,
+    metrics holds the call's timings:
+        - cached: Whether the response came from the response cache
+        - ttft_seconds: Time to first token
+        - total_seconds: Time until the last token
+        - tokens: Generated tokens (as reported by the server)
+        - tokens_per_second: Generation rate after the first token
+    """
+
+    def __init__(self, chunks: Iterator[str], metrics: Dict[str, Any]):
+        self._chunks = chunks
+        self._parts = []
+        self.metrics = metrics
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk in self._chunks:
+            self._parts.append(chunk)
+            yield chunk
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
 
 class OllamaLLM:
     def __init__(
@@ -13,10 +339,30 @@ class OllamaLLM:
         stream: bool = False,
         system: str = "You are a helpful graduate teaching assistant",
         max_retries: int = 3,
-        retry_delay: float = 1.0
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 10.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 120.0,
+        max_concurrency: int = 4,
+        cache: Union[bool, ResponseCache] = True
     ):
         """
         Initializes the OllamaLLM adapter.
+
+        Requests time out after connect_timeout seconds without a connection
+        and read_timeout seconds without data (for streams: between chunks).
+        Failed attempts are retried after an exponential backoff with full
+        jitter: a random delay up to retry_delay * 2**attempt, capped at
+        max_retry_delay. Repeated server failures open the server's circuit
+        breaker, after which calls fail fast (see ollama_status).
+
+        max_concurrency bounds the requests this client has in flight at once
+        (across map calls and threads); match it to the server's parallelism
+        (OLLAMA_NUM_PARALLEL).
+
+        cache is the on-disk response cache: True for the shared default file,
+        a ResponseCache for another one, or False to disable it. Responses are
+        only cached by default at temperature 0 (see __call__).
         """
         self.model = model
         self.base_url = base_url
@@ -25,70 +371,558 @@ class OllamaLLM:
         self.system = system
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_concurrency = max(1, max_concurrency)
+        self._breaker = _breaker(base_url)
+
+        # Persistent session: connections to the server are kept alive and
+        # reused, with a pool large enough for the concurrent requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+
+        # Timings of the most recent streamed calls (see TokenStream)
+        self.call_metrics = deque(maxlen=256)
+
+        # Outcomes of structured (JSON) answers: valid as generated, repaired
+        # locally, fixed by a re-ask, or failed (see resolve_json)
+        self.json_stats = {"valid": 0, "repaired": 0, "reasked": 0, "failed": 0}
+        self._json_stats_lock = threading.Lock()
+
+        # Persistent response cache (shared by every client using the same file)
+        self.cache = None
+        if cache is True:
+            try:
+                self.cache = get_response_cache()
+            except Exception as e:
+                print(f"⚠️ LLM response cache unavailable: {str(e)}")
+        elif cache:
+            self.cache = cache
         
         # Check if Ollama is running
         self._check_ollama_connection()
 
     def _check_ollama_connection(self):
-        """Check if Ollama server is running and model is available."""
-        try:
-            # Try to connect to Ollama server
-            response = requests.get(f"{self.base_url}/api/tags")
-            response.raise_for_status()
-            
-            # Check if model is available
-            models = response.json().get("models", [])
-            if not any(m["name"] == self.model for m in models):
-                print(f"⚠️ Model '{self.model}' not found. Available models: {[m['name'] for m in models]}")
-                print(f"\nTo install the model, run:\n    ollama pull {self.model}")
-                sys.exit(1)
-                
-        except requests.exceptions.ConnectionError:
-            print("""
-❌ Cannot connect to Ollama server
-
-Please ensure Ollama is installed and running:
-
-1. Install Ollama:
-   curl -fsSL https://ollama.com/install.sh | sh
+        """
+        Check if Ollama server is running and model is available.
 
-2. Start the server:
-   ollama serve
+        Uses the process-wide health cache, so only the first check of a server
+        (and background refreshes) make a request.
 
-3. Pull the model:
-   ollama pull mistral
-            """)
-            sys.exit(1)
-        except Exception as e:
-            print(f"❌ Error checking Ollama connection: {str(e)}")
-            sys.exit(1)
-
-    def __call__(self, prompt: str) -> str:
-        """
-        Sends the prompt to the Ollama /api/generate endpoint and returns the generated response.
+        Raises:
+            OllamaConnectionError: If the server cannot be reached
+            OllamaModelNotFoundError: If the model is not installed
         """
-        url = f"{self.base_url}/api/generate"
+        models = _health.models(self.base_url)
+        if self.model not in models:
+            raise OllamaModelNotFoundError(
+                f"⚠️ Model '{self.model}' not found. Available models: {models}\n\n"
+                f"To install the model, run:\n    ollama pull {self.model}",
+                models
+            )
+
+    def _payload(self, prompt: str, stream: bool, format: Optional[Union[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
         payload = {
             "model": self.model,
             "system": self.system,
             "prompt": prompt,
-            "stream": self.stream,
+            "stream": stream,
             "options": {"temperature": self.temperature},
         }
+        if format is not None:
+            payload["format"] = format
+        return payload
+
+    def _cache_enabled(self, use_cache: Optional[bool]) -> bool:
+        if use_cache is None:
+            use_cache = self.temperature == 0
+        return bool(use_cache) and self.cache is not None
+
+    def _retry_or_raise(self, attempt: int, error: Exception):
+        """
+        Records a failed attempt, then sleeps before the next one or raises.
+
+        Stops retrying as soon as the circuit breaker opens.
+        """
+        self._record_failure(error, request_failed=attempt == self.max_retries - 1)
+        if self._breaker.state == "open":
+            print(f"❌ Failed to get response after {attempt + 1} attempt(s): {str(error)}")
+            raise self._breaker.unavailable_error() from error
+        if attempt == self.max_retries - 1:
+            print(f"❌ Failed to get response after {self.max_retries} attempts: {str(error)}")
+            raise self._typed_error(error) from error
+        delay = random.uniform(0, min(self.max_retry_delay, self.retry_delay * 2 ** attempt))
+        print(f"⚠️ Attempt {attempt + 1} failed, retrying in {delay:.1f}s...")
+        time.sleep(delay)
+
+    def _record_failure(self, error: Exception, request_failed: bool):
+        """
+        Counts a failure against the server's circuit breaker.
+
+        Server failures (see _is_server_failure) count on every attempt. A read
+        timeout, e.g. an oversized prompt or a long generation, only counts once
+        the whole request has failed, so one slow request cannot open the
+        breaker for every caller; other errors (e.g. a malformed body) never count.
+        """
+        if _is_server_failure(error) or (request_failed and _is_read_timeout(error)):
+            self._breaker.record_failure(error)
+
+    def _typed_error(self, error: Exception) -> Exception:
+        """The Ollama error for a requests exception (other errors are returned unchanged)."""
+        if _is_read_timeout(error):
+            return OllamaTimeoutError(f"❌ Ollama server at {self.base_url} sent nothing for {self.timeout[1]:g}s")
+        # Includes connect timeouts and connections broken while reading a stream
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError)):
+            _health.invalidate(self.base_url)
+            return OllamaConnectionError(f"❌ Cannot connect to Ollama server at {self.base_url}: {error}")
+        return error
+
+    def __call__(
+        self,
+        prompt: str,
+        use_cache: Optional[bool] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = None
+    ) -> str:
+        """
+        Sends the prompt to the Ollama /api/generate endpoint and returns the generated response.
+
+        use_cache=None reads and writes the response cache only when generation
+        is deterministic (temperature 0); True or False force it on or off for
+        this call. format="json" (or a JSON schema, on servers that support
+        structured outputs) makes the server constrain the answer to JSON.
+        With stream=True the response is streamed and joined.
+        """
+        if self.stream:
+            return "".join(self.generate_stream(prompt, use_cache, format))
+
+        url = f"{self.base_url}/api/generate"
+        payload = self._payload(prompt, stream=False, format=format)
+
+        use_cache = self._cache_enabled(use_cache)
+        if use_cache:
+            key = payload_key(payload)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         
         for attempt in range(self.max_retries):
             try:
-                response = requests.post(url, json=payload)
-                response.raise_for_status()
-                data = response.json()
-                return data.get("response", "")
+                with self._slots:
+                    self._breaker.check()
+                    response = self.session.post(url, json=payload, timeout=self.timeout)
+                    response.raise_for_status()
+                    data = response.json()
+                self._breaker.record_success()
+                text = data.get("response", "")
+                if use_cache:
+                    self.cache.put(key, self.model, text)
+                return text
                 
             except requests.exceptions.RequestException as e:
-                if attempt == self.max_retries - 1:
-                    print(f"❌ Failed to get response after {self.max_retries} attempts: {str(e)}")
-                    raise
-                print(f"⚠️ Attempt {attempt + 1} failed, retrying in {self.retry_delay}s...")
-                time.sleep(self.retry_delay)
+                self._retry_or_raise(attempt, e)
+
+    def generate_stream(
+        self,
+        prompt: str,
+        use_cache: Optional[bool] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = None
+    ) -> TokenStream:
+        """
+        Streams the generated response chunk by chunk as the server produces it.
+
+        The request is only retried before the first chunk arrives; after
+        that, errors propagate to the consumer as OllamaConnectionError or
+        OllamaTimeoutError. A cached response is yielded as a single chunk.
+
+        The response is read by a worker thread that holds a concurrency slot
+        and the connection only while the server is sending; a slow consumer
+        holds neither, and one that stops iterating cancels the request.
+
+        Args:
+            prompt: Prompt to send
+            use_cache: Response cache setting (see __call__)
+            format: Answer format (see __call__)
+
+        Returns:
+            TokenStream to iterate; its metrics are complete once it is exhausted
+        """
+        metrics = {"cached": False, "ttft_seconds": None, "total_seconds": None,
+                   "tokens": 0, "tokens_per_second": None}
+        return TokenStream(self._stream_chunks(prompt, use_cache, format, metrics), metrics)
+
+    def _stream_chunks(
+        self,
+        prompt: str,
+        use_cache: Optional[bool],
+        format: Optional[Union[str, Dict[str, Any]]],
+        metrics: Dict[str, Any]
+    ) -> Iterator[str]:
+        url = f"{self.base_url}/api/generate"
+        payload = self._payload(prompt, stream=True, format=format)
+        start = time.perf_counter()
+
+        use_cache = self._cache_enabled(use_cache)
+        if use_cache:
+            key = payload_key(payload)
+            cached = self.cache.get(key)
+            if cached is not None:
+                elapsed = time.perf_counter() - start
+                metrics.update(cached=True, ttft_seconds=elapsed, total_seconds=elapsed)
+                self.call_metrics.append(metrics)
+                yield cached
+                return
+
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+        threading.Thread(target=self._read_stream, args=(url, payload, start, metrics, chunks, cancelled),
+                         daemon=True).start()
+
+        parts = []
+        try:
+            while True:
+                kind, value = chunks.get()
+                if kind == "error":
+                    raise value
+                if kind == "done":
+                    final = value
+                    break
+                parts.append(value)
+                yield value
+        finally:
+            # Stops the reader (and closes the response) if the consumer gave up early
+            cancelled.set()
+
+        metrics["total_seconds"] = time.perf_counter() - start
+        metrics["tokens"] = final.get("eval_count", len(parts))
+        if final.get("eval_duration"):
+            generation_seconds = final["eval_duration"] / 1e9
+        else:
+            generation_seconds = metrics["total_seconds"] - (metrics["ttft_seconds"] or 0.0)
+        if generation_seconds > 0:
+            metrics["tokens_per_second"] = metrics["tokens"] / generation_seconds
+        self.call_metrics.append(metrics)
+
+        if use_cache:
+            self.cache.put(key, self.model, "".join(parts))
+
+    def _read_stream(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        start: float,
+        metrics: Dict[str, Any],
+        chunks: "queue.Queue",
+        cancelled: threading.Event
+    ):
+        """
+        Runs one streamed request, putting ("chunk", text), then ("done", final
+        message) or ("error", exception) on chunks; returns early once cancelled.
+        """
+        received = False
+        try:
+            for attempt in range(self.max_retries):
+                try:
+                    final = {}
+                    with self._slots:
+                        self._breaker.check()
+                        with self.session.post(url, json=payload, stream=True, timeout=self.timeout) as response:
+                            response.raise_for_status()
+                            # NDJSON: one JSON object per line, the last one has done=true
+                            for line in response.iter_lines():
+                                if cancelled.is_set():
+                                    return
+                                if not line:
+                                    continue
+                                data = json.loads(line)
+                                if "error" in data:
+                                    raise OllamaError(data["error"])
+                                chunk = data.get("response", "")
+                                if chunk:
+                                    if not received:
+                                        metrics["ttft_seconds"] = time.perf_counter() - start
+                                        received = True
+                                    chunks.put(("chunk", chunk))
+                                if data.get("done"):
+                                    final = data
+                                    break
+                    self._breaker.record_success()
+                    chunks.put(("done", final))
+                    return
+
+                except requests.exceptions.RequestException as e:
+                    if received:
+                        # Already partly consumed: not retried, so the request has failed
+                        self._record_failure(e, request_failed=True)
+                        raise self._typed_error(e) from e
+                    self._retry_or_raise(attempt, e)
+        except Exception as e:
+            chunks.put(("error", e))
+
+    def stream_many(
+        self,
+        prompts: List[str],
+        max_concurrency: Optional[int] = None,
+        use_cache: Optional[bool] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = None
+    ) -> Iterator[Tuple[int, str, Any]]:
+        """
+        Streams several prompts concurrently, yielding events as they arrive.
+
+        Generation runs in worker threads; events are handed to the caller's
+        thread, so UI updates (e.g. Streamlit placeholders) stay on the script thread.
+
+        Args:
+            prompts: Prompts to send
+            max_concurrency: Worker threads (default: the client's limit)
+            use_cache: Response cache setting for every prompt (see __call__)
+            format: Answer format for every prompt (see __call__)
+
+        Yields:
+            (index, kind, value) tuples:
+                - (index, "token", chunk): A chunk of prompt index's response
+                - (index, "done", stream): The TokenStream of a finished prompt
+                - (index, "error", exception): A failed prompt
+        """
+        prompts = list(prompts)
+        if not prompts:
+            return
+        events = queue.Queue()
+
+        def run(index: int, prompt: str):
+            try:
+                tokens = self.generate_stream(prompt, use_cache, format)
+                for chunk in tokens:
+                    events.put((index, "token", chunk))
+                events.put((index, "done", tokens))
+            except Exception as e:
+                events.put((index, "error", e))
+
+        workers = min(len(prompts), max_concurrency or self.max_concurrency)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for index, prompt in enumerate(prompts):
+                pool.submit(run, index, prompt)
+            finished = 0
+            while finished < len(prompts):
+                event = events.get()
+                if event[1] != "token":
+                    finished += 1
+                yield event
+
+    def map(
+        self,
+        prompts: List[str],
+        max_concurrency: Optional[int] = None,
+        return_exceptions: bool = False,
+        use_cache: Optional[bool] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = None
+    ) -> List[Any]:
+        """
+        Sends several prompts concurrently over the pooled session.
+
+        Requests are pipelined against the server, at most max_concurrency at a
+        time (never more than the client's own limit), so a batch takes about
+        len(prompts) / server parallelism round-trips instead of len(prompts).
+
+        Args:
+            prompts: Prompts to send
+            max_concurrency: Worker threads for this batch (default: the client's limit)
+            return_exceptions: Put a failed prompt's exception in its slot instead of raising
+            use_cache: Response cache setting for every prompt (see __call__)
+            format: Answer format for every prompt (see __call__)
+
+        Returns:
+            Responses in the same order as the prompts
+        """
+        prompts = list(prompts)
+        if not prompts:
+            return []
+        workers = min(len(prompts), max_concurrency or self.max_concurrency)
+
+        def run(prompt: str) -> Any:
+            try:
+                return self(prompt, use_cache=use_cache, format=format)
+            except Exception as e:
+                if return_exceptions:
+                    return e
+                raise
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(run, prompts))
+
+    def _count_json(self, outcome: str):
+        with self._json_stats_lock:
+            self.json_stats[outcome] += 1
+
+    def resolve_json(
+        self,
+        prompt: str,
+        answer: str,
+        schema: Optional[Dict[str, Any]] = None,
+        max_reasks: int = 1,
+        format: Optional[Union[str, Dict[str, Any]]] = "json"
+    ) -> Any:
+        """
+        Turns an answer to prompt into a JSON value that matches schema.
+
+        The answer is first repaired locally (code fences, surrounding prose,
+        trailing commas, enum case, "true"/"false" strings). Only if it is
+        still invalid is the model re-asked, with its answer and the exact
+        validation errors, at most max_reasks times.
+
+        Args:
+            prompt: Prompt that produced the answer
+            answer: The model's answer
+            schema: Expected schema (see json_output; any JSON value if None)
+            max_reasks: Corrective generations allowed
+            format: Answer format of the re-asks (see __call__)
+
+        Returns:
+            The validated value
+
+        Raises:
+            OllamaOutputError: If no valid value was obtained
+        """
+        value, errors = parse_json_answer(answer, schema)
+        if not errors:
+            strict = answer.strip()
+            try:
+                self._count_json("valid" if json.loads(strict) == value else "repaired")
+            except json.JSONDecodeError:
+                self._count_json("repaired")
+            return value
+
+        for _ in range(max_reasks):
+            print(f"⚠️ Invalid JSON answer ({'; '.join(errors)}), re-asking...")
+            # A cached corrective answer is fine: the re-ask prompt embeds the faulty answer
+            answer = self(reask_prompt(prompt, answer, errors, schema or {}), format=format)
+            value, errors = parse_json_answer(answer, schema)
+            if not errors:
+                self._count_json("reasked")
+                return value
+
+        self._count_json("failed")
+        raise OllamaOutputError(f"❌ Invalid JSON answer: {'; '.join(errors)}", answer, errors)
+
+    def generate_json(
+        self,
+        prompt: str,
+        schema: Optional[Dict[str, Any]] = None,
+        max_reasks: int = 1,
+        use_cache: Optional[bool] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = "json"
+    ) -> Any:
+        """
+        Generates a JSON answer and validates it against schema.
+
+        The server is asked for JSON output (format); the answer then goes
+        through resolve_json, so formatting slips cost no extra generation.
+
+        Args:
+            prompt: Prompt to send
+            schema: Expected schema (see json_output; any JSON value if None)
+            max_reasks: Corrective generations allowed
+            use_cache: Response cache setting (see __call__)
+            format: Answer format requested from the server (see __call__)
+
+        Raises:
+            OllamaOutputError: If no valid value was obtained
+        """
+        answer = self(prompt, use_cache=use_cache, format=format)
+        return self.resolve_json(prompt, answer, schema, max_reasks, format)
+
+    def gather(self, *prompts: str, return_exceptions: bool = False) -> List[Any]:
+        """Sends the given prompts concurrently; see map."""
+        return self.map(prompts, return_exceptions=return_exceptions)
+
+    def close(self):
+        """Closes the pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def get_llm(model: str, base_url: str = "http://localhost:11434", **options) -> OllamaLLM:
+    """
+    Returns the shared client for (base_url, model, options), creating it on first use.
+
+    Clients are reused across calls, Streamlit reruns and sessions, so their
+    pooled connections and cached health checks are too.
+
+    Args:
+        model: Ollama model name (e.g. "mistral:latest")
+        base_url: Ollama server URL
+        **options: Other OllamaLLM arguments (temperature, system, ...)
+
+    Raises:
+        OllamaConnectionError: If the server cannot be reached
+        OllamaModelNotFoundError: If the model is not installed
+    """
+    key = (base_url, model, tuple(sorted(options.items())))
+    with _registry_lock:
+        llm = _registry.get(key)
+        if llm is None:
+            llm = OllamaLLM(model, base_url=base_url, **options)
+            _registry[key] = llm
+            return llm
+    # Cached check: raises if the server or model went away since
+    llm._check_ollama_connection()
+    return llm
+
+
+def clear_llm_registry():
+    """Closes and forgets every shared client and cached health check."""
+    with _registry_lock:
+        for llm in _registry.values():
+            llm.close()
+        _registry.clear()
+    _health.invalidate()
+
+
+def tweet_sensor_payload(
+    tweet_row: pd.Series,
+    sensor_index: SensorIndex,
+    window_minutes: float = 10,
+    radius_km: float = 5,
+):
+    """
+    Build the tweet payload and its sensor evidence for the agent prompt.
+
+    Evidence is every non-faulty sensor reading within window_minutes and
+    radius_km of the tweet, looked up in the in-memory sensor index.
+
+    Returns:
+        Tuple of (tweet payload dict, sensor readings as CSV lines, closest first)
+    """
+    tweet_payload = {
+        "tweet": tweet_row["text"],
+        "date time": pd.Timestamp(tweet_row["timestamp"]).strftime("%Y-%m-%d %H:%M:%S"),
+        "latitude": str(tweet_row["latitude"]),
+        "longitude": str(tweet_row["longitude"]),
+        "hdbscan_cluster": tweet_row["hdbscan_cluster"],
+    }
+
+    nearby = sensor_index.query(
+        tweet_row["latitude"], tweet_row["longitude"], tweet_row["timestamp"],
+        window_minutes=window_minutes, radius_km=radius_km
+    )
+    if nearby.empty:
+        print(f"⚠️ No sensor data found within {radius_km} km and ±{window_minutes} min of {tweet_payload['date time']}")
+
+    # Format sensor data as multi-line CSV string
+    sensor_lines = (
+        nearby[["timestamp", "latitude", "longitude", "sensor_type", "reading_value"]]
+        .astype(str)
+        .agg(",".join, axis=1)
+        .tolist()
+    )
+    return tweet_payload, "\n".join(sensor_lines)
 
 
 def extract_tweet_and_sensor_payload(
@@ -97,7 +931,7 @@ def extract_tweet_and_sensor_payload(
     cluster_number: int,
     target_timestamp: str = "2023-01-01 00:00:00",
 ):
-    """Extract tweet and sensor data for analysis."""
+    """Extract tweet and sensor data for analysis (one-off; reuse a SensorIndex with tweet_sensor_payload for batches)."""
     try:
         # Load tweets and sensor data
         tweets_df = pd.read_csv(tweet_csv_path)
@@ -116,42 +950,14 @@ def extract_tweet_and_sensor_payload(
         if filtered.empty:
             raise ValueError(f"No tweet found for timestamp={target_timestamp}, cluster={cluster_number}")
 
-        tweet_row = filtered.iloc[0]
-
-        # Extract tweet in required format
-        tweet_payload = {
-            "tweet": tweet_row["text"],
-            "date time": tweet_row["timestamp"].strftime("%Y-%m-%d %H:%M:%S"),
-            "latitude": str(tweet_row["latitude"]),
-            "longitude": str(tweet_row["longitude"]),
-            "hdbscan_cluster": tweet_row["hdbscan_cluster"],
-        }
-
-        # Filter sensors at that timestamp
-        sensor_data_at_time = sensors_df[sensors_df["timestamp"] == tweet_row["timestamp"]]
-
-        if sensor_data_at_time.empty:
-            print(f"⚠️ No sensor data found for timestamp {tweet_row['timestamp']}")
-
-        # Format sensor data as multi-line CSV string
-        sensor_lines = (
-            sensor_data_at_time[
-                ["timestamp", "latitude", "longitude", "sensor_type", "reading_value"]
-            ]
-            .astype(str)
-            .agg(",".join, axis=1)
-            .tolist()
-        )
-
-        sensor_csv_block = "\n".join(sensor_lines)
-        return tweet_payload, sensor_csv_block
+        return tweet_sensor_payload(filtered.iloc[0], SensorIndex(sensors_df))
 
     except FileNotFoundError as e:
         print(f"❌ File not found: {str(e)}")
-        sys.exit(1)
+        raise
     except Exception as e:
         print(f"❌ Error processing data: {str(e)}")
-        sys.exit(1)
+        raise
 
 
 def main():
@@ -224,15 +1030,13 @@ Be logical and data-driven. If you lack enough evidence, state so clearly.
 {sensor_csv_block}
 """.strip()
 
-        # Get LLM response
-        result = llm(CRISIS_AGENT_PROMPT)
+        # Get LLM response as a validated verdict
+        result = llm.generate_json(CRISIS_AGENT_PROMPT, VERDICT_SCHEMA)
         print("\n🤖 AI Analysis:", result)
-        
-        # Parse and return JSON
-        return json.loads(result)
+        return result
 
-    except json.JSONDecodeError:
-        print("❌ Error: LLM response is not valid JSON")
+    except OllamaOutputError as e:
+        print(f"❌ Error: LLM response is not a valid verdict: {str(e)}")
         return None
     except Exception as e:
         print(f"❌ Error in main: {str(e)}")
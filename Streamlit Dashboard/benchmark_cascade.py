@@ -0,0 +1,340 @@
+# benchmark_cascade.py
+#
+# Reproducible benchmark of DisasterCascadePredictor on synthetic networks.
+#
+# Sweeps network size (disaster types), CPD density, cascade_length and top_k;
+# records latency percentiles, peak traced memory and retained memory blocks
+# per case into a JSON file. Results from two commits can be compared:
+#
+#     python benchmark_cascade.py --output bench-new.json --compare bench-old.json
+#
+# Latency is measured "cold" (result memo cleared before every call) and
+# "warm" (repeated identical call). Memory is measured in a separate pass under
+# tracemalloc so that tracing does not inflate the latencies.
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from typing import Dict, List, Optional, Callable, Any
+
+from disaster import DisasterCascadePredictor
+
+SEVERITIES = ["low", "medium", "high"]
+
+
+def generate_synthetic_network(n_types: int,
+                               density: float = 1.0,
+                               max_second_order_rows: int = 2000,
+                               seed: int = 0) -> Dict[str, Any]:
+    """
+    Generate a random Bayesian network in the cascade CPD JSON schema
+
+    Every first-order row (type x severity, plus "all") and each sampled
+    second-order row has max(1, round(density * n_types)) outcomes with
+    Dirichlet-distributed probabilities.
+
+    Args:
+        n_types: Number of disaster types
+        density: Fraction of disaster types with non-zero probability in each row
+        max_second_order_rows: Maximum number of (second_last, last) rows; a dense
+            second-order CPD has n_types ** 2 rows of n_types entries, which is
+            not practical as JSON for hundreds of types
+        seed: Random seed
+
+    Returns:
+        Dictionary with metadata, first_order_cpd and second_order_cpd
+    """
+    rng = np.random.default_rng(seed)
+    names = [f"type_{i:03d}" for i in range(n_types)]
+    support = max(1, int(round(density * n_types)))
+
+    def random_row() -> Dict[str, float]:
+        outcomes = rng.choice(n_types, size=support, replace=False)
+        probs = rng.dirichlet(np.ones(support))
+        return {names[o]: float(p) for o, p in zip(outcomes, probs)}
+
+    first_order = {
+        name: {severity: random_row() for severity in SEVERITIES + ["all"]}
+        for name in names
+    }
+
+    n_rows = min(n_types * n_types, max_second_order_rows)
+    rows = rng.choice(n_types * n_types, size=n_rows, replace=False)
+    second_order = {}
+    for row in np.sort(rows):
+        second_last, last = divmod(int(row), n_types)
+        second_order.setdefault(names[second_last], {})[names[last]] = random_row()
+
+    return {
+        "metadata": {
+            "description": f"Synthetic network ({n_types} types, density {density})",
+            "parameters": {"time_window_hours": 72, "distance_threshold_km": 50, "sample_size": 0},
+            "disaster_types": names,
+            "severity_categories": SEVERITIES
+        },
+        "first_order_cpd": first_order,
+        "second_order_cpd": second_order
+    }
+
+
+def _load_predictor(json_path: str) -> DisasterCascadePredictor:
+    """Load from JSON, on any commit (older predictors have no use_artifact argument)"""
+    try:
+        return DisasterCascadePredictor(json_path, use_artifact=False)
+    except TypeError:
+        return DisasterCascadePredictor(json_path)
+
+
+def _clear_memo() -> None:
+    clear = getattr(DisasterCascadePredictor, "cache_clear", None)
+    if clear is not None:
+        clear()
+
+
+def _latency_stats(samples: List[float]) -> Dict[str, float]:
+    """Latency percentiles in milliseconds"""
+    ms = np.asarray(samples) * 1000.0
+    return {
+        "min": float(ms.min()),
+        "mean": float(ms.mean()),
+        "p50": float(np.percentile(ms, 50)),
+        "p90": float(np.percentile(ms, 90)),
+        "p99": float(np.percentile(ms, 99)),
+        "max": float(ms.max())
+    }
+
+
+def _measure(call: Callable[[], Any], repeats: int, cold: bool) -> Dict[str, Any]:
+    """
+    Time a call, then measure its peak memory and the memory blocks it retains
+
+    Returns:
+        Dictionary containing:
+            - latency_ms: Latency percentiles over the repeats
+            - peak_memory_bytes: Peak traced memory of one call
+            - retained_blocks: Net change in live memory blocks over one call (traced
+              allocations minus frees, not the number of allocations made)
+    """
+    samples = []
+    if not cold:
+        call()
+    for _ in range(repeats):
+        if cold:
+            _clear_memo()
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+
+    if cold:
+        _clear_memo()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained_blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+
+    return {
+        "latency_ms": _latency_stats(samples),
+        "peak_memory_bytes": int(peak - baseline),
+        "retained_blocks": int(retained_blocks)
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(type_counts: List[int] = (5, 50, 200, 500),
+                  densities: List[float] = (1.0, 0.05),
+                  cascade_lengths: List[int] = (3, 5, 10),
+                  top_ks: List[int] = (1, 3, 10),
+                  repeats: int = 30,
+                  seed: int = 0) -> Dict[str, Any]:
+    """
+    Run the benchmark sweep
+
+    Args:
+        type_counts: Network sizes (number of disaster types)
+        densities: CPD densities (1.0 = dense)
+        cascade_lengths: cascade_length values for predict_cascade
+        top_ks: top_k values for predict_cascade
+        repeats: Timed calls per case
+        seed: Seed of the synthetic networks and the queried disasters
+
+    Returns:
+        Dictionary containing:
+            - meta: Commit, environment and sweep configuration
+            - results: One entry per case with its parameters and measurements
+    """
+    results = []
+    rng = np.random.default_rng(seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_types in type_counts:
+            for density in densities:
+                network = generate_synthetic_network(n_types, density, seed=seed)
+                json_path = os.path.join(tmp, f"network_{n_types}_{density}.json")
+                with open(json_path, "w") as f:
+                    json.dump(network, f)
+                names = network["metadata"]["disaster_types"]
+                initial = names[int(rng.integers(n_types))]
+                sequence = [names[int(i)] for i in rng.integers(n_types, size=2)]
+                case_base = {"n_types": n_types, "density": density}
+
+                # Model load (parse + compile)
+                gc.collect()
+                start = time.perf_counter()
+                predictor = _load_predictor(json_path)
+                load_seconds = time.perf_counter() - start
+                results.append({
+                    "case": f"load/T={n_types}/d={density}",
+                    "function": "__init__",
+                    **case_base,
+                    "latency_ms": _latency_stats([load_seconds])
+                })
+                print(f"T={n_types} density={density}: loaded in {load_seconds * 1000:.1f} ms")
+
+                cases = []
+                for length in cascade_lengths:
+                    for top_k in top_ks:
+                        cases.append((
+                            f"predict_cascade/T={n_types}/d={density}/L={length}/k={top_k}",
+                            "predict_cascade",
+                            {"cascade_length": length, "top_k": top_k},
+                            lambda predictor=predictor, length=length, top_k=top_k:
+                                predictor.predict_cascade(initial, "high", cascade_length=length, top_k=top_k)
+                        ))
+                for n_previous in (1, 2):
+                    cases.append((
+                        f"predict_most_likely_next_event/T={n_types}/d={density}/n={n_previous}",
+                        "predict_most_likely_next_event",
+                        {"sequence_length": n_previous},
+                        lambda predictor=predictor, n_previous=n_previous:
+                            predictor.predict_most_likely_next_event(sequence[:n_previous], ["high"] * n_previous)
+                    ))
+                cases.append((
+                    f"generate_alert_message/T={n_types}/d={density}",
+                    "generate_alert_message",
+                    {},
+                    lambda predictor=predictor: predictor.generate_alert_message(initial, "high", "Zone A")
+                ))
+
+                for case, function, params, call in cases:
+                    for cold in (True, False):
+                        measured = _measure(call, repeats, cold)
+                        results.append({
+                            "case": f"{case}/{'cold' if cold else 'warm'}",
+                            "function": function,
+                            **case_base,
+                            **params,
+                            "cache": "cold" if cold else "warm",
+                            **measured
+                        })
+                # Drop the network's arrays (the case calls hold the predictor) before the next one
+                del predictor, cases, call
+                _clear_memo()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "config": {
+                "type_counts": list(type_counts),
+                "densities": list(densities),
+                "cascade_lengths": list(cascade_lengths),
+                "top_ks": list(top_ks),
+                "repeats": repeats,
+                "seed": seed
+            }
+        },
+        "results": results
+    }
+
+
+def compare_results(old: Dict[str, Any], new: Dict[str, Any], threshold: float = 1.2) -> List[Dict[str, Any]]:
+    """
+    Compare median latencies of the cases present in both result files
+
+    Args:
+        old: Baseline results (as written by run_benchmark)
+        new: New results
+        threshold: Ratio new / old above which a case is reported as a regression
+
+    Returns:
+        List of dictionaries, one per shared case:
+            - case: Case identifier
+            - old_p50_ms / new_p50_ms: Median latencies
+            - ratio: new / old
+            - regression: Whether the ratio exceeds the threshold
+    """
+    old_cases = {r["case"]: r for r in old["results"]}
+    rows = []
+    for result in new["results"]:
+        previous = old_cases.get(result["case"])
+        if previous is None:
+            continue
+        old_p50 = previous["latency_ms"]["p50"]
+        new_p50 = result["latency_ms"]["p50"]
+        ratio = new_p50 / old_p50 if old_p50 > 0 else float("inf")
+        rows.append({
+            "case": result["case"],
+            "old_p50_ms": old_p50,
+            "new_p50_ms": new_p50,
+            "ratio": ratio,
+            "regression": ratio > threshold
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark DisasterCascadePredictor on synthetic networks")
+    parser.add_argument("--types", type=int, nargs="+", default=[5, 50, 200, 500],
+                        help="Numbers of disaster types")
+    parser.add_argument("--densities", type=float, nargs="+", default=[1.0, 0.05],
+                        help="CPD densities (1.0 = dense)")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[3, 5, 10], help="cascade_length values")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 3, 10], help="top_k values")
+    parser.add_argument("--repeats", type=int, default=30, help="Timed calls per case")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", default="benchmark_results.json", help="Results JSON path")
+    parser.add_argument("--compare", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Regression ratio threshold")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.types, args.densities, args.lengths, args.top_k, args.repeats, args.seed)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Wrote {len(results['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare_results(baseline, results, args.threshold)
+        print(f"\nComparison with {baseline['meta'].get('commit')} (p50 latency, ms):")
+        for row in rows:
+            flag = "⚠️ " if row["regression"] else "  "
+            print(f"{flag}{row['case']:<70} {row['old_p50_ms']:>10.3f} {row['new_p50_ms']:>10.3f} "
+                  f"{row['ratio']:>6.2f}x")
+        regressions = sum(row["regression"] for row in rows)
+        print(f"\n{regressions} of {len(rows)} shared cases slower than {args.threshold}x")
+        sys.exit(1 if regressions else 0)
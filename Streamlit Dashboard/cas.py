@@ -1,12 +1,7 @@
 import streamlit as st
 import pandas as pd
-from disaster import DisasterCascadePredictor
 from constants import FOOTER
-# --- Load Data ---
-ZONE_STRESS_PATH = "data/zone_stress_index.csv"
-SENSOR_DATA_PATH = "data/sensor_anomaly_scored.csv"
-BN_JSON_PATH = "data/cascade-disaster-cpd.json"
-
+from data_access import zones, cascade_predictor, load_metrics
 # --- Streamlit UI ---
 st.set_page_config(
     page_title="Crisis Command Copilot",
@@ -36,9 +31,8 @@ Welcome to the Smart City Crisis Copilot dashboard. Use the navigation menu on t
 """)
 
 # Load data for the overview section
-zone_df = pd.read_csv(ZONE_STRESS_PATH)
-sensor_df = pd.read_csv(SENSOR_DATA_PATH)
-predictor = DisasterCascadePredictor(BN_JSON_PATH)
+zone_df = zones()
+predictor = cascade_predictor()
 
 # Display a summary of high alert zones
 high_stress_zones = zone_df[zone_df["zone_stress"] > 0.6]
@@ -54,6 +48,10 @@ if not high_stress_zones.empty:
 else:
     st.info("No zones are currently under high stress.")
 
+# Data layer status (loads are shared by every page and session)
+with st.expander("Data layer"):
+    st.dataframe(pd.DataFrame(load_metrics()))
+
 # Footer
 st.markdown("---")
 st.markdown(FOOTER)
@@ -0,0 +1,284 @@
+# cascade_simulator.py
+
+import math
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional, Any
+
+from disaster import DisasterCascadePredictor
+
+# Tensors shared with pool workers, set once per worker by _init_worker
+_WORKER_TENSORS = None
+
+
+def _row_cdfs(probs: np.ndarray) -> np.ndarray:
+    """
+    Turn transition rows into cumulative distributions along the last axis
+
+    Rows whose total is within rounding of 1 are renormalized to end exactly at 1.
+    Rows with less mass keep the remainder, which the sampler treats as the
+    cascade ending there.
+    """
+    cdf = np.cumsum(probs, axis=-1)
+    total = cdf[..., -1:]
+    normalize = total > 1.0 - 1e-6
+    return np.where(normalize, cdf / np.where(normalize, total, 1.0), cdf)
+
+
+def _init_worker(first_cdf: np.ndarray, second_cdf: np.ndarray) -> None:
+    """Pool initializer: receive the transition tensors once per worker"""
+    global _WORKER_TENSORS
+    _WORKER_TENSORS = (first_cdf, second_cdf)
+
+
+def _simulate_in_worker(initial_code: int, horizon: int, n_trajectories: int,
+                        seed: np.random.SeedSequence) -> Dict[str, np.ndarray]:
+    """Run one shard in a pool worker with the tensors set by _init_worker"""
+    first_cdf, second_cdf = _WORKER_TENSORS
+    return _simulate_shard(first_cdf, second_cdf, initial_code, horizon, n_trajectories, seed)
+
+
+def _simulate_shard(first_cdf: np.ndarray,
+                    second_cdf: np.ndarray,
+                    initial_code: int,
+                    horizon: int,
+                    n_trajectories: int,
+                    seed: np.random.SeedSequence) -> Dict[str, np.ndarray]:
+    """
+    Sample one shard of trajectories and reduce it to aggregate histograms
+
+    Every step draws one uniform per trajectory and inverts the CDF of its
+    current (second_last, last) row with a single searchsorted over all rows
+    laid end to end (row r occupies values r..r+1).
+
+    Args:
+        first_cdf: CDF (types,) of the first transition
+        second_cdf: CDFs (types, types, types) of later transitions
+        initial_code: Integer code of the initial disaster
+        horizon: Number of follow-on events to sample
+        n_trajectories: Number of trajectories in the shard
+        seed: Seed of this shard
+
+    Returns:
+        Dictionary of integer aggregates:
+            - n: Number of trajectories
+            - count_histogram: (types, horizon + 1) trajectories with k events of each type
+            - first_step_histogram: (horizon, types) trajectories whose first event of
+              each type is at step t + 1
+            - length_histogram: (horizon + 1,) trajectories with m follow-on events
+    """
+    rng = np.random.default_rng(seed)
+    n_types = len(first_cdf)
+    events = np.full((n_trajectories, horizon), -1, dtype=np.int64)
+    alive = np.ones(n_trajectories, dtype=bool)
+    second_last = np.full(n_trajectories, initial_code, dtype=np.int64)
+    last = second_last.copy()
+    flat_cdf = (second_cdf.reshape(-1, n_types) + np.arange(n_types * n_types)[:, None]).ravel()
+
+    for step in range(horizon):
+        u = rng.random(n_trajectories)
+        if step == 0:
+            draws = np.searchsorted(first_cdf, u, side="right")
+        else:
+            rows = second_last * n_types + last
+            draws = np.searchsorted(flat_cdf, rows + u, side="right") - rows * n_types
+        # A draw past the last type falls in the missing mass: the cascade ends
+        alive &= draws < n_types
+        events[alive, step] = draws[alive]
+        second_last, last = last, np.where(alive, draws, last)
+
+    # Count events per (trajectory, type) without a dense trajectory x type matrix
+    trajectory, event_step = np.nonzero(events >= 0)
+    keys = trajectory * n_types + events[trajectory, event_step]
+    unique_keys, first_index, counts = np.unique(keys, return_index=True, return_counts=True)
+    types = unique_keys % n_types
+
+    count_histogram = np.zeros((n_types, horizon + 1), dtype=np.int64)
+    np.add.at(count_histogram, (types, counts), 1)
+    count_histogram[:, 0] = n_trajectories - count_histogram[:, 1:].sum(axis=1)
+
+    first_step_histogram = np.zeros((horizon, n_types), dtype=np.int64)
+    np.add.at(first_step_histogram, (event_step[first_index], types), 1)
+
+    length_histogram = np.bincount((events >= 0).sum(axis=1), minlength=horizon + 1)
+
+    return {
+        "n": np.int64(n_trajectories),
+        "count_histogram": count_histogram,
+        "first_step_histogram": first_step_histogram,
+        "length_histogram": length_histogram.astype(np.int64)
+    }
+
+
+class CascadeSimulator:
+    """
+    Monte Carlo simulator of cascade trajectories over a DisasterCascadePredictor's CPDs
+
+    Complements the top-k paths with distributions: expected number of
+    secondary events, probability that a disaster type happens within the
+    horizon, and the tail of the number of follow-on events.
+    """
+
+    def __init__(self, predictor: DisasterCascadePredictor):
+        """
+        Initialize the simulator from a predictor's compiled network
+
+        Args:
+            predictor: The predictor whose CPDs are sampled
+        """
+        self.predictor = predictor
+        network = predictor.compiled_network()
+        self.disaster_types = network["disaster_types"]
+        self._severity_levels = network["severity_levels"]
+        self._first_cdf = _row_cdfs(network["first_order"])
+        self._second_cdf = _row_cdfs(network["second_order"])
+
+    def simulate(self,
+                 initial_disaster: str,
+                 initial_severity: str = "all",
+                 horizon: int = 3,
+                 n_trajectories: int = 1_000_000,
+                 shard_size: int = 100_000,
+                 n_workers: int = 1,
+                 seed: int = 0,
+                 target_standard_error: Optional[float] = None,
+                 quantiles: List[float] = (0.5, 0.9, 0.95, 0.99)) -> Dict[str, Any]:
+        """
+        Sample cascade trajectories and aggregate their statistics
+
+        Work is split into shards with their own seeds spawned from `seed`, so
+        results are reproducible regardless of the number of workers. Shards are
+        merged in order; when target_standard_error is set, sampling stops as
+        soon as every reported probability and expected count is within it.
+
+        Args:
+            initial_disaster: The type of the initial disaster (e.g., "earthquake")
+            initial_severity: Severity of the initial disaster ("low", "medium", "high", or "all")
+            horizon: Number of follow-on events to sample per trajectory
+            n_trajectories: Maximum number of trajectories to sample
+            shard_size: Trajectories per shard
+            n_workers: Worker processes; 1 samples in the calling process
+            seed: Base seed
+            target_standard_error: Stop early once the largest standard error is below this
+            quantiles: Quantiles of the number of follow-on events to report
+
+        Returns:
+            Dictionary containing:
+                - disaster_types: Column labels of the per-type arrays
+                - n_trajectories: Number of trajectories actually sampled
+                - occurrence_probability: (types,) P(type occurs within the horizon)
+                - occurrence_probability_by_step: (horizon, types) P(type occurs within t + 1 steps)
+                - expected_counts: (types,) expected number of events of each type
+                - count_histogram: (types, horizon + 1) trajectories with k events of each type
+                - expected_events: Expected number of follow-on events
+                - event_quantiles: Quantiles of the number of follow-on events
+                - length_histogram: (horizon + 1,) trajectories with m follow-on events
+                - standard_error: Standard errors of occurrence_probability,
+                  expected_counts and expected_events
+                - converged: Whether target_standard_error was reached
+        """
+        self.predictor._validate_cascade_inputs(initial_disaster, initial_severity)
+        if horizon < 1:
+            raise ValueError("Horizon must be at least 1")
+
+        initial_code = self.disaster_types.index(initial_disaster)
+        first_cdf = self._first_cdf[initial_code, self._severity_levels.index(initial_severity)]
+        n_shards = max(1, math.ceil(n_trajectories / shard_size))
+        shard_sizes = [min(shard_size, n_trajectories - i * shard_size) for i in range(n_shards)]
+        seeds = np.random.SeedSequence(seed).spawn(n_shards)
+
+        totals = None
+        converged = False
+
+        def merge(shard: Dict[str, np.ndarray]) -> bool:
+            nonlocal totals
+            totals = shard if totals is None else {key: totals[key] + value for key, value in shard.items()}
+            if target_standard_error is None:
+                return False
+            return self._max_standard_error(totals) <= target_standard_error
+
+        if n_workers <= 1:
+            for size, shard_seed in zip(shard_sizes, seeds):
+                if merge(_simulate_shard(first_cdf, self._second_cdf, initial_code, horizon, size, shard_seed)):
+                    converged = True
+                    break
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(first_cdf, self._second_cdf)) as pool:
+                # Keep a bounded number of shards in flight and merge them in shard
+                # order, so early stopping gives the same answer for any worker count
+                pending = {}
+                finished = {}
+                next_submit = next_merge = 0
+                while next_merge < n_shards and not converged:
+                    while next_submit < n_shards and len(pending) < 2 * n_workers:
+                        future = pool.submit(_simulate_in_worker, initial_code, horizon,
+                                             shard_sizes[next_submit], seeds[next_submit])
+                        pending[future] = next_submit
+                        next_submit += 1
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finished[pending.pop(future)] = future.result()
+                    while next_merge in finished and not converged:
+                        converged = merge(finished.pop(next_merge))
+                        next_merge += 1
+                for future in pending:
+                    future.cancel()
+
+        return self._summarize(totals, quantiles, converged)
+
+    def _max_standard_error(self, totals: Dict[str, np.ndarray]) -> float:
+        """Largest standard error over the occurrence probabilities and expected counts"""
+        errors = self._standard_errors(totals)
+        return float(max(errors["occurrence_probability"].max(), errors["expected_counts"].max(),
+                         errors["expected_events"]))
+
+    @staticmethod
+    def _standard_errors(totals: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """Standard errors of the estimates computed from the merged histograms"""
+        n = int(totals["n"])
+        k = np.arange(totals["count_histogram"].shape[1])
+
+        occurrence = 1.0 - totals["count_histogram"][:, 0] / n
+        mean = totals["count_histogram"] @ k / n
+        second_moment = totals["count_histogram"] @ (k * k) / n
+        events_mean = totals["length_histogram"] @ k / n
+        events_second_moment = totals["length_histogram"] @ (k * k) / n
+
+        return {
+            "occurrence_probability": np.sqrt(occurrence * (1.0 - occurrence) / n),
+            "expected_counts": np.sqrt(np.maximum(second_moment - mean ** 2, 0.0) / n),
+            "expected_events": float(np.sqrt(max(events_second_moment - events_mean ** 2, 0.0) / n))
+        }
+
+    def _summarize(self, totals: Dict[str, np.ndarray], quantiles: List[float],
+                   converged: bool) -> Dict[str, Any]:
+        """Turn merged histograms into probabilities, expectations and quantiles"""
+        n = int(totals["n"])
+        k = np.arange(totals["count_histogram"].shape[1])
+        length_cdf = np.cumsum(totals["length_histogram"]) / n
+
+        return {
+            "disaster_types": list(self.disaster_types),
+            "n_trajectories": n,
+            "occurrence_probability": 1.0 - totals["count_histogram"][:, 0] / n,
+            "occurrence_probability_by_step": np.cumsum(totals["first_step_histogram"], axis=0) / n,
+            "expected_counts": totals["count_histogram"] @ k / n,
+            "count_histogram": totals["count_histogram"],
+            "expected_events": float(totals["length_histogram"] @ k / n),
+            "event_quantiles": {q: int(np.searchsorted(length_cdf, q - 1e-12)) for q in quantiles},
+            "length_histogram": totals["length_histogram"],
+            "standard_error": self._standard_errors(totals),
+            "converged": converged
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    simulator = CascadeSimulator(DisasterCascadePredictor("data/cascade-disaster-cpd.json"))
+    result = simulator.simulate("earthquake", "high", horizon=3, n_trajectories=1_000_000,
+                                target_standard_error=0.001)
+    print(f"Sampled {result['n_trajectories']:,} trajectories (converged: {result['converged']})")
+    for disaster, prob, count in zip(result["disaster_types"], result["occurrence_probability"],
+                                     result["expected_counts"]):
+        print(f"  {disaster}: P(occurs) = {prob:.3f}, expected events = {count:.3f}")
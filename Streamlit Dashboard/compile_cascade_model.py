@@ -0,0 +1,22 @@
+# compile_cascade_model.py
+#
+# Compile the cascade CPD JSON into the memory-mappable artifact that
+# DisasterCascadePredictor loads on cold start. Re-run after changing the JSON;
+# a stale artifact is ignored and the JSON is used instead.
+#
+#     python compile_cascade_model.py data/cascade-disaster-cpd.json
+
+import argparse
+
+from disaster import compile_network_artifact
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile a cascade CPD JSON file into a binary artifact")
+    parser.add_argument("json_path", nargs="?", default="data/cascade-disaster-cpd.json",
+                        help="Path to the CPD JSON file")
+    parser.add_argument("--output", default=None, help="Artifact path (default: next to the JSON file)")
+    args = parser.parse_args()
+
+    path = compile_network_artifact(args.json_path, args.output)
+    print(f"✅ Compiled {args.json_path} → {path}")
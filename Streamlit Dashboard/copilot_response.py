@@ -1,6 +1,6 @@
 # copilot_response.py
 
-from agent import OllamaLLM
+from agent import get_llm, TokenStream
 
 def generate_zone_summary(
     zone_name: str,
@@ -24,9 +24,41 @@ def generate_zone_summary(
     Returns:
         str: A descriptive Copilot response.
     """
-    llm = OllamaLLM(model=model_name)
+    llm = get_llm(model_name)
+    return llm(_zone_summary_prompt(zone_name, disaster_type, alert_message, cascade_path, cumulative_probability))
 
-    prompt = f"""
+
+def stream_zone_summary(
+    zone_name: str,
+    disaster_type: str,
+    alert_message: str,
+    cascade_path: list,
+    cumulative_probability: float,
+    model_name: str = "mistral:latest"
+) -> TokenStream:
+    """
+    Streams the executive-level AI summary of a crisis zone as it is generated.
+
+    Takes the same arguments as generate_zone_summary.
+
+    Returns:
+        TokenStream: Iterable of text chunks (e.g. for st.write_stream), with timing metrics.
+    """
+    llm = get_llm(model_name)
+    return llm.generate_stream(
+        _zone_summary_prompt(zone_name, disaster_type, alert_message, cascade_path, cumulative_probability)
+    )
+
+
+def _zone_summary_prompt(
+    zone_name: str,
+    disaster_type: str,
+    alert_message: str,
+    cascade_path: list,
+    cumulative_probability: float
+) -> str:
+    """Builds the Copilot summary prompt."""
+    return f"""
 You are an advanced AI Copilot deployed in a Smart City Command Center during a multi-disaster emergency scenario. Your role is to synthesize sensor data, Bayesian risk predictions, and historical disaster patterns to provide clear, confident, and actionable insights to human decision-makers.
 
 You have access to:
@@ -55,5 +87,3 @@ Now, analyze the following situation and generate a **short, executive-level sum
 
 Respond with a confident, human-readable paragraph. End with a one-sentence **Action Tip**.
 """.strip()
-
-    return llm(prompt)
@@ -0,0 +1,496 @@
+# cpd_fitter.py
+#
+# Rebuilds cascade-disaster-cpd.json from historical disaster events.
+#
+# An event b "follows" an event a when it happens after a, at most
+# time_window_hours later and at most distance_threshold_km away. Pairs (a, b)
+# give the first-order CPD P(b | a, severity of a); chains a -> b -> c give the
+# second-order CPD P(c | a, b).
+#
+# Events are streamed in time order. Each chunk is processed together with the
+# last two time windows of earlier events, so pairs and chains crossing chunk
+# boundaries are counted exactly once, and chunks can be counted in parallel.
+# Only sparse (key, count) arrays and that short history are kept in memory.
+
+import json
+import math
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional, Tuple, Any
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Count keys pack three 16-bit codes into one int64: (x << 32) | (y << 16) | z
+_CODE_BITS = 16
+_MAX_CODES = 1 << _CODE_BITS
+
+# Neighbouring cells of the 3D grid (including the cell itself)
+_NEIGHBOUR_OFFSETS = np.array([(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)])
+_CELL_BITS = 21
+_CELL_OFFSET = 1 << (_CELL_BITS - 1)
+
+# Upper bound on candidate pairs materialized at once per block
+_PAIR_BATCH = 2_000_000
+
+
+def _pack(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return (x.astype(np.int64) << 32) | (y.astype(np.int64) << 16) | z.astype(np.int64)
+
+
+def _unpack(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    mask = _MAX_CODES - 1
+    return (keys >> 32) & mask, (keys >> 16) & mask, keys & mask
+
+
+def _sum_by_key(keys: np.ndarray, weights: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum weights (default 1) per distinct key; returns sorted keys and their totals"""
+    if weights is None:
+        return np.unique(keys, return_counts=True)
+    order = np.argsort(keys, kind="stable")
+    keys, weights = keys[order], weights[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, dtype=int)
+    return keys[starts], np.add.reduceat(weights, starts) if len(keys) else weights
+
+
+def _merge_counts(keys: np.ndarray, counts: np.ndarray,
+                  more_keys: np.ndarray, more_counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge two sparse count arrays"""
+    return _sum_by_key(np.concatenate([keys, more_keys]), np.concatenate([counts, more_counts]))
+
+
+def _unit_vectors(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    """Points on the unit sphere; chord length is monotonic in great-circle distance"""
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def _follow_on_pairs(seconds: np.ndarray,
+                     xyz: np.ndarray,
+                     targets: np.ndarray,
+                     window_seconds: int,
+                     max_chord: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find every (a, b) with b in targets, seconds[b] - window <= seconds[a] < seconds[b]
+    and a within the distance threshold of b
+
+    Points are bucketed in a 3D grid whose cell edge is the chord of the
+    distance threshold, so candidates of b are in the 27 cells around it. Within
+    each cell events are sorted by time, so each (b, cell) candidate range is
+    found with two binary searches over a (cell rank, time) composite key.
+
+    Returns:
+        Tuple of (a, b) index arrays
+    """
+    cells = np.floor(xyz / max_chord).astype(np.int64) + _CELL_OFFSET
+    packed_cells = (cells[:, 0] << (2 * _CELL_BITS)) | (cells[:, 1] << _CELL_BITS) | cells[:, 2]
+    unique_cells, cell_rank = np.unique(packed_cells, return_inverse=True)
+
+    span = int(seconds.max()) + 1 if len(seconds) else 1
+    composite = cell_rank.astype(np.int64) * span + seconds
+    order = np.argsort(composite, kind="stable")
+    composite = composite[order]
+
+    offsets = (_NEIGHBOUR_OFFSETS[:, 0] << (2 * _CELL_BITS)) + (_NEIGHBOUR_OFFSETS[:, 1] << _CELL_BITS) \
+        + _NEIGHBOUR_OFFSETS[:, 2]
+    found_a, found_b = [], []
+    for offset in offsets:
+        neighbour = packed_cells[targets] + offset
+        position = np.searchsorted(unique_cells, neighbour)
+        position = np.minimum(position, len(unique_cells) - 1)
+        exists = unique_cells[position] == neighbour
+        b = targets[exists]
+        base = position[exists].astype(np.int64) * span
+        lo = np.searchsorted(composite, base + np.maximum(seconds[b] - window_seconds, 0), side="left")
+        hi = np.searchsorted(composite, base + seconds[b], side="left")
+
+        # Expand candidate ranges in batches to bound memory
+        lengths = hi - lo
+        ends = np.cumsum(lengths)
+        batch_start = 0
+        while batch_start < len(b):
+            base_count = ends[batch_start - 1] if batch_start else 0
+            batch_end = max(int(np.searchsorted(ends, base_count + _PAIR_BATCH, side="right")), batch_start + 1)
+            batch_lengths = lengths[batch_start:batch_end]
+            total = int(batch_lengths.sum())
+            if total:
+                repeat = np.repeat(np.arange(batch_start, batch_end), batch_lengths)
+                within = np.arange(total) - np.repeat(np.cumsum(batch_lengths) - batch_lengths, batch_lengths)
+                a_candidates = order[lo[repeat] + within]
+                b_candidates = b[repeat]
+                chord = np.linalg.norm(xyz[a_candidates] - xyz[b_candidates], axis=1)
+                close = chord <= max_chord
+                found_a.append(a_candidates[close])
+                found_b.append(b_candidates[close])
+            batch_start = batch_end
+
+    if not found_a:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(found_a), np.concatenate(found_b)
+
+
+def _count_block(seconds: np.ndarray,
+                 latitude: np.ndarray,
+                 longitude: np.ndarray,
+                 types: np.ndarray,
+                 severities: np.ndarray,
+                 own_start: int,
+                 window_seconds: int,
+                 distance_km: float) -> Dict[str, np.ndarray]:
+    """
+    Count follow-on pairs and chains ending in the block's own events
+
+    The block is time-sorted history (the two windows before the chunk)
+    followed by the chunk itself, starting at own_start. Only pairs whose
+    follower and chains whose last event belong to the chunk are counted.
+
+    Returns:
+        Dictionary of sorted sparse counts:
+            - first_keys / first_counts: keys (type a, severity a, type b)
+            - second_keys / second_counts: keys (type a, type b, type c)
+    """
+    empty = np.empty(0, dtype=np.int64)
+    if own_start >= len(seconds):
+        return {"first_keys": empty, "first_counts": empty, "second_keys": empty, "second_counts": empty}
+
+    xyz = _unit_vectors(latitude, longitude)
+    max_chord = 2.0 * math.sin(distance_km / (2.0 * EARTH_RADIUS_KM))
+
+    # Middle events need their own predecessors for chains ending in the chunk
+    middle_start = int(np.searchsorted(seconds, seconds[own_start] - window_seconds, side="left"))
+    a, b = _follow_on_pairs(seconds, xyz, np.arange(middle_start, len(seconds)), window_seconds, max_chord)
+
+    # First order: pairs whose follower is in the chunk
+    own = b >= own_start
+    first_keys, first_counts = _sum_by_key(_pack(types[a[own]], severities[a[own]], types[b[own]]))
+
+    # Second order: join (a, b) pairs with (b, c) pairs on b, using predecessor
+    # type counts per middle event instead of materializing every chain
+    pred_keys, pred_counts = _sum_by_key(b * _MAX_CODES + types[a])
+    pred_middle, pred_type = np.divmod(pred_keys, _MAX_CODES)
+    middle, last = a[own], b[own]
+    lo = np.searchsorted(pred_middle, middle, side="left")
+    hi = np.searchsorted(pred_middle, middle, side="right")
+    lengths = hi - lo
+    repeat = np.repeat(np.arange(len(middle)), lengths)
+    within = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    chain = lo[repeat] + within
+    second_keys, second_counts = _sum_by_key(
+        _pack(pred_type[chain], types[middle[repeat]], types[last[repeat]]), pred_counts[chain]
+    )
+
+    return {
+        "first_keys": first_keys,
+        "first_counts": first_counts.astype(np.int64),
+        "second_keys": second_keys,
+        "second_counts": second_counts.astype(np.int64)
+    }
+
+
+class CascadeCPDFitter:
+    """
+    Incremental fitter of the cascade Bayesian network from disaster events
+
+    Feed time-ordered events with partial_fit or fit_csv, then write the model
+    with write_json. The fitter state (counts, vocabulary and the short event
+    history) can be saved and reloaded to append new events without a refit.
+    """
+
+    def __init__(self,
+                 time_window_hours: float = 72,
+                 distance_threshold_km: float = 50,
+                 severity_categories: List[str] = ("low", "medium", "high"),
+                 disaster_types: Optional[List[str]] = None,
+                 time_column: str = "timestamp",
+                 latitude_column: str = "latitude",
+                 longitude_column: str = "longitude",
+                 type_column: str = "disaster_type",
+                 severity_column: str = "severity"):
+        """
+        Initialize an empty fitter
+
+        Args:
+            time_window_hours: Maximum delay between an event and a follow-on event
+            distance_threshold_km: Maximum distance between an event and a follow-on event
+            severity_categories: Severity levels of the first-order CPD; other values
+                only count towards "all"
+            disaster_types: Known disaster types, in output order (new types are appended)
+            time_column: Column with event timestamps
+            latitude_column: Column with event latitudes
+            longitude_column: Column with event longitudes
+            type_column: Column with disaster types
+            severity_column: Column with severities
+        """
+        self.time_window_hours = time_window_hours
+        self.distance_threshold_km = distance_threshold_km
+        self.severity_categories = list(severity_categories)
+        self.disaster_types = list(disaster_types or [])
+        self.columns = {
+            "time": time_column,
+            "latitude": latitude_column,
+            "longitude": longitude_column,
+            "type": type_column,
+            "severity": severity_column
+        }
+
+        self._type_codes = {name: i for i, name in enumerate(self.disaster_types)}
+        self._severity_codes = {name: i for i, name in enumerate(self.severity_categories)}
+        self._window_seconds = int(round(time_window_hours * 3600))
+
+        empty = np.empty(0, dtype=np.int64)
+        self._first_keys, self._first_counts = empty, empty
+        self._second_keys, self._second_counts = empty, empty
+        self._history = self._empty_history()
+        self.n_events = 0
+
+    @staticmethod
+    def _empty_history() -> Dict[str, np.ndarray]:
+        return {
+            "seconds": np.empty(0, dtype=np.int64),
+            "latitude": np.empty(0),
+            "longitude": np.empty(0),
+            "types": np.empty(0, dtype=np.int64),
+            "severities": np.empty(0, dtype=np.int64)
+        }
+
+    def _prepare_block(self, events: pd.DataFrame) -> Optional[Tuple]:
+        """
+        Encode a chunk of events, prepend the history and advance the history
+
+        Returns:
+            Arguments of _count_block, or None for an empty chunk
+        """
+        if events.empty:
+            return None
+
+        seconds = pd.to_datetime(events[self.columns["time"]]).to_numpy("datetime64[s]").astype(np.int64)
+        order = np.argsort(seconds, kind="stable")
+        seconds = seconds[order]
+        history = self._history
+        if len(history["seconds"]) and seconds[0] < history["seconds"][-1]:
+            raise ValueError("Events must be fed in time order: chunk starts before the last event seen")
+
+        # Encode types (growing the vocabulary) and severities
+        type_values, type_inverse = np.unique(events[self.columns["type"]].astype(str).to_numpy(),
+                                              return_inverse=True)
+        for name in type_values:
+            if name not in self._type_codes:
+                if len(self.disaster_types) >= _MAX_CODES:
+                    raise ValueError(f"Too many disaster types (maximum {_MAX_CODES})")
+                self._type_codes[name] = len(self.disaster_types)
+                self.disaster_types.append(name)
+        types = np.array([self._type_codes[name] for name in type_values], dtype=np.int64)[type_inverse][order]
+
+        severity_values, severity_inverse = np.unique(
+            events[self.columns["severity"]].astype(str).to_numpy(), return_inverse=True
+        )
+        unknown = len(self.severity_categories)
+        severities = np.array([self._severity_codes.get(name, unknown) for name in severity_values],
+                              dtype=np.int64)[severity_inverse][order]
+
+        block = {
+            "seconds": np.concatenate([history["seconds"], seconds]),
+            "latitude": np.concatenate([history["latitude"],
+                                        events[self.columns["latitude"]].to_numpy(float)[order]]),
+            "longitude": np.concatenate([history["longitude"],
+                                         events[self.columns["longitude"]].to_numpy(float)[order]]),
+            "types": np.concatenate([history["types"], types]),
+            "severities": np.concatenate([history["severities"], severities])
+        }
+        own_start = len(history["seconds"])
+
+        # Keep two windows of history: enough for chains a -> b -> c ending later
+        keep = int(np.searchsorted(block["seconds"], block["seconds"][-1] - 2 * self._window_seconds,
+                                   side="left"))
+        self._history = {key: value[keep:] for key, value in block.items()}
+        self.n_events += len(seconds)
+
+        # Times relative to the block start keep the composite keys small
+        relative = block["seconds"] - block["seconds"][0]
+        return (relative, block["latitude"], block["longitude"], block["types"], block["severities"],
+                own_start, self._window_seconds, self.distance_threshold_km)
+
+    def _add_counts(self, counts: Dict[str, np.ndarray]) -> None:
+        self._first_keys, self._first_counts = _merge_counts(
+            self._first_keys, self._first_counts, counts["first_keys"], counts["first_counts"]
+        )
+        self._second_keys, self._second_counts = _merge_counts(
+            self._second_keys, self._second_counts, counts["second_keys"], counts["second_counts"]
+        )
+
+    def partial_fit(self, events: pd.DataFrame) -> "CascadeCPDFitter":
+        """
+        Add a chunk of events that happened after every event seen so far
+
+        Args:
+            events: Events with time, latitude, longitude, type and severity columns
+
+        Returns:
+            The fitter itself
+        """
+        block = self._prepare_block(events)
+        if block is not None:
+            self._add_counts(_count_block(*block))
+        return self
+
+    def fit_csv(self, csv_path: str, chunksize: int = 500_000, n_workers: int = 1) -> "CascadeCPDFitter":
+        """
+        Stream a time-sorted events CSV in chunks, counting chunks in parallel
+
+        Args:
+            csv_path: Path to the events CSV (e.g., disaster_events.csv)
+            chunksize: Events per chunk
+            n_workers: Worker processes; 1 counts in the calling process
+
+        Returns:
+            The fitter itself
+        """
+        reader = pd.read_csv(csv_path, usecols=list(self.columns.values()), chunksize=chunksize)
+
+        if n_workers <= 1:
+            for chunk in reader:
+                self.partial_fit(chunk)
+            return self
+
+        # Blocks are prepared in order (history is sequential); counting is
+        # independent per block, with a bounded number of blocks in flight
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            pending = set()
+            for chunk in reader:
+                block = self._prepare_block(chunk)
+                if block is None:
+                    continue
+                if len(pending) >= 2 * n_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._add_counts(future.result())
+                pending.add(pool.submit(_count_block, *block))
+            for future in pending:
+                self._add_counts(future.result())
+        return self
+
+    def to_network(self, description: str = "Bayesian Network for Cascading Disasters") -> Dict[str, Any]:
+        """
+        Build the Bayesian network in the JSON schema DisasterCascadePredictor loads
+
+        Rows without any observed follow-on event are left out; the predictor
+        falls back to the "all" row (first order) or the first-order CPD
+        (second order) for them.
+
+        Returns:
+            Dictionary with metadata, first_order_cpd and second_order_cpd
+        """
+        names = self.disaster_types
+        severity_names = self.severity_categories
+
+        first_order = {}
+        a, s, b = _unpack(self._first_keys)
+        counts = self._first_counts.astype(float)
+        # "all" sums every severity, including unrecognised ones
+        all_keys, all_counts = _sum_by_key(_pack(a, np.zeros_like(s), b), counts)
+        for keys, values, by_severity in ((all_keys, all_counts, False), (self._first_keys, counts, True)):
+            row_a, row_s, row_b = _unpack(keys)
+            row = row_a * _MAX_CODES + row_s
+            row_keys, row_totals = _sum_by_key(row, values)
+            totals = row_totals[np.searchsorted(row_keys, row)]
+            for i in range(len(keys)):
+                if by_severity and row_s[i] >= len(severity_names):
+                    continue
+                severity = severity_names[row_s[i]] if by_severity else "all"
+                first_order.setdefault(names[row_a[i]], {}).setdefault(severity, {})[names[row_b[i]]] = \
+                    float(values[i] / totals[i])
+
+        second_order = {}
+        a, b, c = _unpack(self._second_keys)
+        counts = self._second_counts.astype(float)
+        row = a * _MAX_CODES + b
+        row_keys, row_totals = _sum_by_key(row, counts)
+        totals = row_totals[np.searchsorted(row_keys, row)]
+        for i in range(len(counts)):
+            second_order.setdefault(names[a[i]], {}).setdefault(names[b[i]], {})[names[c[i]]] = \
+                float(counts[i] / totals[i])
+
+        return {
+            "metadata": {
+                "description": description,
+                "parameters": {
+                    "time_window_hours": self.time_window_hours,
+                    "distance_threshold_km": self.distance_threshold_km,
+                    "sample_size": int(self.n_events)
+                },
+                "disaster_types": list(names),
+                "severity_categories": list(severity_names)
+            },
+            "first_order_cpd": first_order,
+            "second_order_cpd": second_order
+        }
+
+    def write_json(self, json_path: str) -> None:
+        """Write the fitted network to a CPD JSON file"""
+        with open(json_path, "w") as f:
+            json.dump(self.to_network(), f, indent=2)
+
+    def save_state(self, state_path: str) -> None:
+        """
+        Save counts, vocabulary and history so more events can be appended later
+
+        Args:
+            state_path: Path of the .npz state file
+        """
+        config = {
+            "time_window_hours": self.time_window_hours,
+            "distance_threshold_km": self.distance_threshold_km,
+            "severity_categories": self.severity_categories,
+            "disaster_types": self.disaster_types,
+            "columns": self.columns,
+            "n_events": int(self.n_events)
+        }
+        np.savez(
+            state_path,
+            config=np.array(json.dumps(config)),
+            first_keys=self._first_keys,
+            first_counts=self._first_counts,
+            second_keys=self._second_keys,
+            second_counts=self._second_counts,
+            **{f"history_{key}": value for key, value in self._history.items()}
+        )
+
+    @classmethod
+    def load_state(cls, state_path: str) -> "CascadeCPDFitter":
+        """
+        Restore a fitter saved with save_state
+
+        Args:
+            state_path: Path of the .npz state file
+
+        Returns:
+            Fitter ready for more partial_fit / fit_csv calls
+        """
+        with np.load(state_path) as state:
+            config = json.loads(str(state["config"]))
+            columns = config["columns"]
+            fitter = cls(
+                time_window_hours=config["time_window_hours"],
+                distance_threshold_km=config["distance_threshold_km"],
+                severity_categories=config["severity_categories"],
+                disaster_types=config["disaster_types"],
+                time_column=columns["time"],
+                latitude_column=columns["latitude"],
+                longitude_column=columns["longitude"],
+                type_column=columns["type"],
+                severity_column=columns["severity"]
+            )
+            fitter.n_events = config["n_events"]
+            fitter._first_keys, fitter._first_counts = state["first_keys"], state["first_counts"]
+            fitter._second_keys, fitter._second_counts = state["second_keys"], state["second_counts"]
+            fitter._history = {key: state[f"history_{key}"] for key in cls._empty_history()}
+        return fitter
+
+
+# Example usage
+if __name__ == "__main__":
+    fitter = CascadeCPDFitter(time_window_hours=72, distance_threshold_km=50)
+    fitter.fit_csv("Smart_City_Dataset/disaster_events.csv", chunksize=500_000, n_workers=4)
+    fitter.write_json("data/cascade-disaster-cpd.json")
+    fitter.save_state("data/cascade-disaster-cpd-state.npz")
+    print(f"✅ Fitted {fitter.n_events:,} events over {len(fitter.disaster_types)} disaster types")
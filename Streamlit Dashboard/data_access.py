@@ -0,0 +1,278 @@
+# data_access.py
+#
+# Process-wide cached handles to the dashboard's tables and cascade predictor.
+#
+# Every page gets its data from here instead of parsing files itself. A
+# handle is loaded once per process and shared by all reruns and sessions;
+# each access only stats the source files (microseconds). When a file's size
+# or mtime changes, its content hash decides whether the data really changed:
+# only then is the handle reloaded (the first load hashes nothing, so the
+# first change always reloads). Handles are shared: treat the returned
+# DataFrames as read-only (filtering and .copy() are fine). Loads are logged
+# at INFO level to the "data_access" logger.
+
+import logging
+import os
+import threading
+import time
+import pandas as pd
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from data_store import (DATA_DIR, csv_path, dataset_path, files_hash, load_table, source_files, source_stat,
+                        source_version)
+from disaster import DisasterCascadePredictor
+from sensor_grid import SOURCE_COLUMNS as GRID_SOURCE_COLUMNS, SensorGrid
+from sensor_index import SensorIndex
+from zone_geometry import SOURCE_COLUMNS as GEOMETRY_SOURCE_COLUMNS
+from zone_geometry import build_zone_geometry, read_zone_geometry, write_zone_geometry
+from zone_stream import LIVE_ZONES_PATH, read_snapshot
+
+logger = logging.getLogger(__name__)
+
+BN_JSON_PATH = os.path.join(DATA_DIR, "cascade-disaster-cpd.json")
+
+# Columns the tweet validator needs from the tweet and sensor reading tables
+TWEET_COLUMNS = ["text", "timestamp", "latitude", "longitude", "hdbscan_cluster"]
+SENSOR_READING_COLUMNS = ["timestamp", "latitude", "longitude", "sensor_type", "reading_value", "status"]
+
+
+def _stat(paths: List[str]) -> Tuple:
+    signature = []
+    for path in paths:
+        try:
+            info = os.stat(path)
+            signature.append((path, info.st_size, info.st_mtime_ns))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+class _Handle:
+    """
+    One cached resource and the files it is loaded from
+
+    watch() returns the cheap-to-stat files whose change may mean new data
+    (e.g. a table's CSV and its Parquet marker); sources() returns the files
+    actually read, which are hashed when the watched files change.
+    """
+
+    def __init__(self, name: str, load: Callable[[], Any], watch: Callable[[], List[str]],
+                 sources: Callable[[], List[str]]):
+        self.name = name
+        self._load = load
+        self._watch = watch
+        self._sources = sources
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value = None
+        self._stat = None
+        self._hash = None
+        self.metrics = {"name": name, "loads": 0, "hits": 0, "unchanged_reloads_skipped": 0,
+                        "last_load_seconds": None, "total_load_seconds": 0.0, "rows": None,
+                        "memory_bytes": None, "version": None, "loaded_at": None}
+
+    def get(self) -> Any:
+        stat = _stat(self._watch())
+        with self._lock:
+            if self._loaded and stat == self._stat:
+                self.metrics["hits"] += 1
+                return self._value
+
+            # Only files that changed since a load are hashed (never on the first load)
+            content = None
+            if self._loaded:
+                sources = self._sources()
+                content = files_hash(sources) if all(os.path.exists(p) for p in sources) else None
+                if content is not None and content == self._hash:
+                    # Touched or rewritten with identical content
+                    self._stat = stat
+                    self.metrics["unchanged_reloads_skipped"] += 1
+                    return self._value
+
+            start = time.perf_counter()
+            value = self._load()
+            elapsed = time.perf_counter() - start
+            self._value, self._stat, self._hash, self._loaded = value, stat, content, True
+            self.metrics.update({
+                "loads": self.metrics["loads"] + 1,
+                "last_load_seconds": elapsed,
+                "total_load_seconds": self.metrics["total_load_seconds"] + elapsed,
+                "rows": len(value) if hasattr(value, "__len__") else None,
+                "memory_bytes": int(value.memory_usage(deep=True).sum()) if isinstance(value, pd.DataFrame) else None,
+                "version": content[:12] if content else None,
+                "loaded_at": time.strftime("%Y-%m-%d %H:%M:%S")
+            })
+            logger.info("Loaded %s in %.0f ms", self.name, elapsed * 1000)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._loaded = False
+            self._value = self._stat = self._hash = None
+
+
+_handles = {}
+_handles_lock = threading.Lock()
+
+
+def _handle(key: Tuple, make: Callable[[], _Handle]) -> _Handle:
+    with _handles_lock:
+        handle = _handles.get(key)
+        if handle is None:
+            handle = _handles[key] = make()
+        return handle
+
+
+def _table_watch(name: str, data_dir: str) -> List[str]:
+    return [csv_path(name, data_dir), os.path.join(dataset_path(name, data_dir), "_columns.json")]
+
+
+def table(name: str, columns: Optional[List[str]] = None, data_dir: str = DATA_DIR) -> pd.DataFrame:
+    """
+    Cached table from the data store (see data_store.TABLES)
+
+    Args:
+        name: Table name
+        columns: Columns to load (all if None); each column set is cached separately
+        data_dir: Data directory
+
+    Returns:
+        Shared DataFrame (read-only)
+    """
+    key = ("table", name, tuple(columns) if columns is not None else None, data_dir)
+    label = name if columns is None else f"{name}[{', '.join(columns)}]"
+    return _handle(key, lambda: _Handle(
+        label,
+        lambda: load_table(name, columns=columns, data_dir=data_dir),
+        lambda: _table_watch(name, data_dir),
+        lambda: source_files(name, data_dir)
+    )).get()
+
+
+def zones(data_dir: str = DATA_DIR) -> pd.DataFrame:
+    """Zone stress index (one row per zone)"""
+    return table("zones", data_dir=data_dir)
+
+
+def sensors(columns: Optional[List[str]] = None, data_dir: str = DATA_DIR) -> pd.DataFrame:
+    """
+    Scored sensors (anomaly score, status and zone of every sensor)
+
+    Pass the columns a page uses: only those are read. Every projection
+    has the same rows in the same order.
+    """
+    return table("sensor_scores", columns=columns, data_dir=data_dir)
+
+
+def live_zones(path: str = LIVE_ZONES_PATH) -> Optional[pd.DataFrame]:
+    """
+    Latest zone stress snapshot published by the streaming aggregator (see zone_stream.py)
+
+    Returns:
+        Zone table with the columns of zones() plus sliding window metrics,
+        watermark and published_at, or None if no snapshot was published
+    """
+    return _handle(("live_zones", path), lambda: _Handle(
+        "live_zones",
+        lambda: read_snapshot(path),
+        lambda: [path],
+        lambda: [path]
+    )).get()
+
+
+def tweets(data_dir: str = DATA_DIR) -> pd.DataFrame:
+    """Clustered tweets, with the columns the tweet validator uses"""
+    return table("tweets", columns=TWEET_COLUMNS, data_dir=data_dir)
+
+
+def _load_zone_geometry(data_dir: str) -> pd.DataFrame:
+    path = os.path.join(data_dir, "zone_geometry.csv")
+    stat = source_stat("sensor_scores", data_dir)
+    # Sensor files not written since the table was: no need to hash them
+    geometry = read_zone_geometry(path=path, source_stat=stat)
+    if geometry is not None:
+        return geometry
+
+    version = source_version("sensor_scores", data_dir)
+    geometry = read_zone_geometry(version, path)
+    if geometry is None:
+        geometry = build_zone_geometry(sensors(GEOMETRY_SOURCE_COLUMNS, data_dir))
+    try:
+        # (Re)tagged with the current file stats, so the next cold load skips the hash
+        write_zone_geometry(geometry, version, path, stat)
+    except OSError as e:
+        print(f"⚠️ Could not persist zone geometry: {str(e)}")
+    return geometry
+
+
+def zone_geometry(data_dir: str = DATA_DIR) -> pd.DataFrame:
+    """
+    Per-zone centroid, bounding box, sensor counts and anomaly statistics
+
+    Read from data/zone_geometry.csv when it matches the current sensor data,
+    otherwise rebuilt (one groupby) and persisted there; see zone_geometry.py.
+    """
+    return _handle(("zone_geometry", data_dir), lambda: _Handle(
+        "zone_geometry",
+        lambda: _load_zone_geometry(data_dir),
+        lambda: _table_watch("sensor_scores", data_dir),
+        lambda: source_files("sensor_scores", data_dir)
+    )).get()
+
+
+def sensor_grid(data_dir: str = DATA_DIR) -> SensorGrid:
+    """Multi-resolution grid of sensor aggregates for the risk map, rebuilt when the sensors change"""
+    return _handle(("sensor_grid", data_dir), lambda: _Handle(
+        "sensor_grid",
+        lambda: SensorGrid(sensors(GRID_SOURCE_COLUMNS, data_dir)),
+        lambda: _table_watch("sensor_scores", data_dir),
+        lambda: source_files("sensor_scores", data_dir)
+    )).get()
+
+
+def sensor_index(data_dir: str = DATA_DIR) -> SensorIndex:
+    """Spatiotemporal index of the sensor readings, rebuilt when they change"""
+    return _handle(("sensor_index", data_dir), lambda: _Handle(
+        "sensor_index",
+        lambda: SensorIndex(load_table("sensor_readings", columns=SENSOR_READING_COLUMNS, data_dir=data_dir)),
+        lambda: _table_watch("sensor_readings", data_dir),
+        lambda: source_files("sensor_readings", data_dir)
+    )).get()
+
+
+def cascade_predictor(json_path: str = BN_JSON_PATH) -> DisasterCascadePredictor:
+    """Disaster cascade predictor, reloaded when its network JSON changes"""
+    return _handle(("predictor", json_path), lambda: _Handle(
+        "cascade_predictor",
+        lambda: DisasterCascadePredictor(json_path),
+        lambda: [json_path],
+        lambda: [json_path]
+    )).get()
+
+
+def load_metrics() -> List[Dict[str, Any]]:
+    """
+    Load metrics of every handle used in this process
+
+    Returns:
+        List of dictionaries, one per handle:
+            - name: Handle name
+            - loads: Times the data was (re)loaded
+            - hits: Accesses served from the cache
+            - unchanged_reloads_skipped: File changes whose content hash was unchanged
+            - last_load_seconds / total_load_seconds: Load times
+            - rows: Rows (or entries) of the loaded value
+            - memory_bytes: Memory of a loaded DataFrame
+            - version: Content hash prefix of the loaded files (None until they first change)
+            - loaded_at: Time of the last load
+    """
+    with _handles_lock:
+        handles = list(_handles.values())
+    return [dict(handle.metrics) for handle in handles]
+
+
+def clear():
+    """Drop every cached handle (the next access reloads)"""
+    with _handles_lock:
+        for handle in _handles.values():
+            handle.clear()
@@ -0,0 +1,394 @@
+# data_store.py
+#
+# Columnar (Parquet) store for the dashboard's sensor, tweet and zone tables.
+#
+# The ingestion step converts each CSV in data/ once into a Parquet dataset
+# under data/parquet/<table>/, with explicit column types, rows sorted by
+# time and hive-style partitions (date=YYYY-MM-DD for timestamped tables,
+# nearest_zone_name=<zone> for the scored sensors). load_table reads only the
+# requested columns, and its filters skip whole partitions and row groups
+# before any data is decoded:
+#
+#     python data_store.py                      # ingest every CSV found in data/
+#     load_table("sensor_readings", columns=["timestamp", "latitude", "longitude", "reading_value"],
+#                start="2023-01-01", end="2023-01-02")
+#
+# Until a table has been ingested (or when its CSV is newer than the
+# dataset), load_table reads the CSV with the same types and filters.
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pandas as pd
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+PARQUET_DIRNAME = "parquet"
+DATE_COLUMN = "date"
+ROWS_PER_GROUP = 128 * 1024
+
+# Table name -> source CSV, column types, timestamp column and partition columns.
+# Columns not listed here are kept with inferred types.
+TABLES = {
+    "zones": {
+        "csv": "zone_stress_index.csv",
+        "schema": pa.schema([
+            ("nearest_zone_name", pa.int32()),
+            ("avg_anomaly_score", pa.float64()),
+            ("faulty_rate", pa.float64()),
+            ("sensor_count", pa.int32()),
+            ("zone_stress", pa.float64())
+        ]),
+        "timestamp": None,
+        "partition_by": []
+    },
+    "sensor_scores": {
+        "csv": "sensor_anomaly_scored.csv",
+        "schema": pa.schema([
+            ("sensor_id", pa.string()),
+            ("latitude", pa.float64()),
+            ("longitude", pa.float64()),
+            ("sensor_type", pa.string()),
+            ("value", pa.float64()),
+            ("anomaly_score", pa.float64()),
+            ("status", pa.string()),
+            ("nearest_zone_name", pa.int32())
+        ]),
+        "timestamp": None,
+        "partition_by": ["nearest_zone_name"]
+    },
+    "sensor_readings": {
+        "csv": "sensor_with_clusters_fast.csv",
+        "schema": pa.schema([
+            ("sensor_id", pa.string()),
+            ("timestamp", pa.timestamp("ns")),
+            ("latitude", pa.float64()),
+            ("longitude", pa.float64()),
+            ("sensor_type", pa.string()),
+            ("reading_value", pa.float64()),
+            ("status", pa.string()),
+            ("assigned_cluster", pa.int32()),
+            ("distance_km_to_cluster", pa.float64())
+        ]),
+        "timestamp": "timestamp",
+        "partition_by": [DATE_COLUMN]
+    },
+    "tweets": {
+        "csv": "tweets_with_hdbscan_clusters.csv",
+        "schema": pa.schema([
+            ("user_id", pa.string()),
+            ("text", pa.string()),
+            ("timestamp", pa.timestamp("ns")),
+            ("latitude", pa.float64()),
+            ("longitude", pa.float64()),
+            ("hdbscan_cluster", pa.int32())
+        ]),
+        "timestamp": "timestamp",
+        "partition_by": [DATE_COLUMN]
+    }
+}
+
+# (column, op, value) filter operators, as in pandas.read_parquet(filters=...)
+_OPERATORS = {
+    "==": lambda field, value: field == value,
+    "=": lambda field, value: field == value,
+    "!=": lambda field, value: field != value,
+    "<": lambda field, value: field < value,
+    "<=": lambda field, value: field <= value,
+    ">": lambda field, value: field > value,
+    ">=": lambda field, value: field >= value,
+    "in": lambda field, value: field.isin(list(value)),
+    "not in": lambda field, value: ~field.isin(list(value))
+}
+
+
+def _spec(name: str) -> Dict[str, Any]:
+    if name not in TABLES:
+        raise KeyError(f"Unknown table '{name}' (known tables: {', '.join(TABLES)})")
+    return TABLES[name]
+
+
+def csv_path(name: str, data_dir: str = DATA_DIR) -> str:
+    """Source CSV of a table"""
+    return os.path.join(data_dir, _spec(name)["csv"])
+
+
+def dataset_path(name: str, data_dir: str = DATA_DIR) -> str:
+    """Parquet dataset directory of a table"""
+    return os.path.join(data_dir, PARQUET_DIRNAME, name)
+
+
+def _partitioning(spec: Dict[str, Any]) -> Optional[ds.Partitioning]:
+    if not spec["partition_by"]:
+        return None
+    fields = [pa.field(DATE_COLUMN, pa.string()) if column == DATE_COLUMN else spec["schema"].field(column)
+              for column in spec["partition_by"]]
+    return ds.partitioning(pa.schema(fields), flavor="hive")
+
+
+def _read_csv(name: str, data_dir: str) -> pa.Table:
+    spec = _spec(name)
+    convert = pacsv.ConvertOptions(
+        column_types={field.name: field.type for field in spec["schema"]},
+        strings_can_be_null=True
+    )
+    return pacsv.read_csv(csv_path(name, data_dir), convert_options=convert)
+
+
+def is_ingested(name: str, data_dir: str = DATA_DIR) -> bool:
+    """Whether the table has a Parquet dataset at least as recent as its CSV"""
+    marker = os.path.join(dataset_path(name, data_dir), "_columns.json")
+    if not os.path.exists(marker):
+        return False
+    source = csv_path(name, data_dir)
+    return not os.path.exists(source) or os.path.getmtime(source) <= os.path.getmtime(marker)
+
+
+def source_files(name: str, data_dir: str = DATA_DIR) -> List[str]:
+    """Files load_table currently reads for a table: its Parquet files, or its CSV"""
+    if is_ingested(name, data_dir):
+        target = dataset_path(name, data_dir)
+        return sorted(os.path.join(root, f) for root, _, names in os.walk(target)
+                      for f in names if f.endswith(".parquet") or f == "_columns.json")
+    return [csv_path(name, data_dir)]
+
+
+def files_hash(paths: List[str]) -> str:
+    """SHA-256 of the names and contents of some files"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def files_stat(paths: List[str]) -> str:
+    """Paths, sizes and mtimes of some files: unchanged unless a file was written (cheap check before files_hash)"""
+    signature = []
+    for path in paths:
+        info = os.stat(path)
+        signature.append([path, info.st_size, info.st_mtime_ns])
+    return json.dumps(signature)
+
+
+def source_version(name: str, data_dir: str = DATA_DIR) -> str:
+    """Content hash of the files load_table currently reads for a table"""
+    return files_hash(source_files(name, data_dir))
+
+
+def source_stat(name: str, data_dir: str = DATA_DIR) -> str:
+    """files_stat of the files load_table currently reads for a table"""
+    return files_stat(source_files(name, data_dir))
+
+
+def write_atomic(path: str, write: Callable[[str], None]) -> None:
+    """
+    Write a file or directory next to its final path and swap it in when complete
+
+    Readers see the previous or the new version, never a partial one. A
+    directory cannot be replaced by a rename, so an existing one is renamed
+    away just before the new one takes its place.
+
+    Args:
+        path: Final path
+        write: Called with the staging path to write to
+    """
+    staging = f"{path}.tmp-{os.getpid()}"
+    _remove(staging)
+    try:
+        write(staging)
+    except BaseException:
+        _remove(staging)
+        raise
+    retired = f"{path}.old-{os.getpid()}"
+    if os.path.isdir(path):
+        os.replace(path, retired)
+    os.replace(staging, path)
+    shutil.rmtree(retired, ignore_errors=True)
+
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def ingest_table(name: str, data_dir: str = DATA_DIR, rows_per_group: int = ROWS_PER_GROUP) -> Dict[str, Any]:
+    """
+    Convert a table's CSV into a partitioned Parquet dataset
+
+    Rows are sorted by partition and time, so each row group covers a narrow
+    time range and timestamp filters can skip it from its statistics. The new
+    dataset replaces the old one through write_atomic.
+
+    Args:
+        name: Table name (key of TABLES)
+        data_dir: Directory holding the CSV files
+        rows_per_group: Maximum rows per Parquet row group
+
+    Returns:
+        Dictionary containing:
+            - table: Table name
+            - rows: Number of rows
+            - files: Number of Parquet files written
+            - csv_bytes / parquet_bytes: Size of the source and of the dataset
+            - seconds: Conversion time
+    """
+    spec = _spec(name)
+    start = time.perf_counter()
+    table = _read_csv(name, data_dir)
+    columns = table.column_names
+
+    timestamp = spec["timestamp"]
+    if timestamp is not None:
+        table = table.append_column(DATE_COLUMN, pc.strftime(table[timestamp], format="%Y-%m-%d"))
+    sort_keys = [(column, "ascending") for column in spec["partition_by"]]
+    if timestamp is not None:
+        sort_keys.append((timestamp, "ascending"))
+    if sort_keys:
+        table = table.sort_by(sort_keys)
+
+    def write(staging: str) -> None:
+        ds.write_dataset(
+            table, staging, format="parquet",
+            partitioning=_partitioning(spec),
+            max_rows_per_group=rows_per_group,
+            max_rows_per_file=max(rows_per_group * 16, 1),
+            min_rows_per_group=min(rows_per_group, 1024 * 64),
+            file_options=ds.ParquetFileFormat().make_write_options(compression="zstd")
+        )
+        # Column order of the CSV (partition columns are read back last otherwise)
+        with open(os.path.join(staging, "_columns.json"), "w") as f:
+            json.dump(columns, f)
+
+    target = dataset_path(name, data_dir)
+    write_atomic(target, write)
+
+    files = [os.path.join(root, f) for root, _, names in os.walk(target) for f in names if f.endswith(".parquet")]
+    return {
+        "table": name,
+        "rows": table.num_rows,
+        "files": len(files),
+        "csv_bytes": os.path.getsize(csv_path(name, data_dir)),
+        "parquet_bytes": sum(os.path.getsize(f) for f in files),
+        "seconds": time.perf_counter() - start
+    }
+
+
+def ingest_all(data_dir: str = DATA_DIR) -> List[Dict[str, Any]]:
+    """Ingest every table whose CSV is present in data_dir"""
+    return [ingest_table(name, data_dir) for name in TABLES if os.path.exists(csv_path(name, data_dir))]
+
+
+def _filter_expression(filters: Sequence[Tuple[str, str, Any]]) -> Optional[ds.Expression]:
+    expression = None
+    for column, op, value in filters:
+        if op not in _OPERATORS:
+            raise ValueError(f"Unsupported filter operator '{op}' (supported: {', '.join(_OPERATORS)})")
+        term = _OPERATORS[op](ds.field(column), value)
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def _time_filters(spec: Dict[str, Any], start, end, partitioned: bool) -> List[Tuple[str, str, Any]]:
+    """Filters for start <= timestamp < end, plus the matching date partitions"""
+    timestamp = spec["timestamp"]
+    if timestamp is None:
+        raise ValueError("start/end filters need a table with a timestamp column")
+    filters = []
+    if start is not None:
+        start = pd.Timestamp(start)
+        filters.append((timestamp, ">=", start.to_datetime64()))
+        if partitioned:
+            filters.append((DATE_COLUMN, ">=", start.strftime("%Y-%m-%d")))
+    if end is not None:
+        end = pd.Timestamp(end)
+        filters.append((timestamp, "<", end.to_datetime64()))
+        if partitioned:
+            filters.append((DATE_COLUMN, "<=", end.strftime("%Y-%m-%d")))
+    return filters
+
+
+def open_dataset(name: str, data_dir: str = DATA_DIR) -> ds.Dataset:
+    """
+    Arrow dataset of a table: the Parquet dataset if up to date, else the CSV
+
+    Prints a warning when falling back to the CSV.
+    """
+    spec = _spec(name)
+    if is_ingested(name, data_dir):
+        return ds.dataset(dataset_path(name, data_dir), format="parquet", partitioning=_partitioning(spec),
+                          exclude_invalid_files=False, ignore_prefixes=[".", "_"])
+
+    source = csv_path(name, data_dir)
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"No data for table '{name}': {source} not found")
+    if spec["partition_by"]:
+        print(f"⚠️ Table '{name}' is not ingested; reading {source} (run `python data_store.py` to convert it)")
+    convert = pacsv.ConvertOptions(
+        column_types={field.name: field.type for field in spec["schema"]},
+        strings_can_be_null=True
+    )
+    return ds.dataset(source, format=ds.CsvFileFormat(convert_options=convert))
+
+
+def load_table(name: str,
+               columns: Optional[List[str]] = None,
+               filters: Optional[Sequence[Tuple[str, str, Any]]] = None,
+               start=None,
+               end=None,
+               data_dir: str = DATA_DIR) -> pd.DataFrame:
+    """
+    Load a table with column projection and predicate pushdown
+
+    Only the requested columns are decoded, and filters on partition columns
+    (nearest_zone_name of sensor_scores, or the date range from start/end)
+    skip whole files; other filters skip row groups by their statistics.
+
+    Args:
+        name: Table name (key of TABLES)
+        columns: Columns to load (all columns of the CSV if None)
+        filters: (column, op, value) conditions, all of which must hold; op is one
+            of ==, !=, <, <=, >, >=, in, not in
+        start: Keep rows with timestamp >= start (timestamped tables only)
+        end: Keep rows with timestamp < end (timestamped tables only)
+        data_dir: Directory holding the CSV files and the parquet/ store
+
+    Returns:
+        DataFrame with the requested columns, in CSV column order if columns is None
+    """
+    spec = _spec(name)
+    dataset = open_dataset(name, data_dir)
+    partitioned = is_ingested(name, data_dir) and DATE_COLUMN in spec["partition_by"]
+
+    conditions = list(filters or [])
+    if start is not None or end is not None:
+        conditions += _time_filters(spec, start, end, partitioned)
+
+    if columns is None:
+        marker = os.path.join(dataset_path(name, data_dir), "_columns.json")
+        if is_ingested(name, data_dir):
+            with open(marker) as f:
+                columns = json.load(f)
+        else:
+            columns = dataset.schema.names
+
+    table = dataset.to_table(columns=list(columns), filter=_filter_expression(conditions))
+    return table.to_pandas()
+
+
+if __name__ == "__main__":
+    print(f"Ingesting CSV tables from {DATA_DIR}")
+    for stats in ingest_all():
+        ratio = stats["parquet_bytes"] / stats["csv_bytes"] if stats["csv_bytes"] else 0.0
+        print(f"✅ {stats['table']}: {stats['rows']} rows -> {stats['files']} file(s), "
+              f"{stats['parquet_bytes'] / 1e6:.1f} MB ({ratio:.0%} of CSV) in {stats['seconds']:.1f}s")
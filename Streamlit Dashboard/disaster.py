@@ -1,28 +1,352 @@
+import os
 import json
+import heapq
+import struct
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
 import numpy as np
+import pandas as pd
 from typing import Dict, List, Tuple, Optional, Any
 
+
+class _LRUMemo:
+    """
+    A thread-safe, bounded least-recently-used memo with hit/miss/eviction counters
+    """
+    
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        """Return (found, value) for a key, marking it as most recently used"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+    
+    def put(self, key: Tuple, value: Any) -> None:
+        """Store a value, evicting the least recently used entries beyond maxsize"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._evict()
+    
+    def resize(self, maxsize: int) -> None:
+        """Change the maximum number of entries"""
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+    
+    def clear(self) -> None:
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+    
+    def info(self) -> Dict[str, int]:
+        """Return the current counters and size"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "maxsize": self.maxsize
+            }
+    
+    def _evict(self) -> None:
+        while len(self._entries) > max(self.maxsize, 0):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    """The array itself, marked read-only (copied first if it is a view of writeable data)"""
+    array = np.asarray(array)
+    if array.base is not None:
+        # A view could still be modified through the array it views
+        array = array.copy()
+    array.flags.writeable = False
+    return array
+
+
+class CascadePaths:
+    """
+    Compact, prefix-shared storage for a ranked set of cascade paths
+    
+    Paths are stored as a trie in flat arrays: every node holds an int16
+    disaster code, the int32 index of its parent node (-1 for the root) and the
+    float64 log-probability of the transition into it. Paths that share a
+    prefix share its nodes, and full paths are only materialized on export.
+    All paths in one set have the same length. The arrays are read-only, so a
+    set can be shared between callers (e.g. through the result memo).
+    """
+    
+    __slots__ = ("disaster_types", "codes", "parents", "log_probs", "leaves", "length")
+    
+    def __init__(self,
+                 disaster_types: List[str],
+                 codes: np.ndarray,
+                 parents: np.ndarray,
+                 log_probs: np.ndarray,
+                 leaves: np.ndarray,
+                 length: int):
+        """
+        Args:
+            disaster_types: Vocabulary used to decode the codes
+            codes: int16 disaster code per node
+            parents: int32 parent node per node, -1 for roots
+            log_probs: float64 log-probability of the transition into each node
+            leaves: Last node of each path, in rank order
+            length: Number of disasters in every path
+        """
+        self.disaster_types = tuple(disaster_types)
+        self.codes = _read_only(codes)
+        self.parents = _read_only(parents)
+        self.log_probs = _read_only(log_probs)
+        self.leaves = _read_only(leaves)
+        self.length = length
+    
+    @classmethod
+    def from_arrays(cls,
+                    disaster_types: List[str],
+                    path_codes: np.ndarray,
+                    probabilities: np.ndarray) -> "CascadePaths":
+        """
+        Build the trie from ranked full paths, merging shared prefixes
+        
+        Args:
+            disaster_types: Vocabulary used to decode the codes
+            path_codes: Integer array (n_paths, length) of disaster codes
+            probabilities: Array (n_paths, length) of transition probabilities
+            
+        Returns:
+            CascadePaths holding the same paths in the same order
+        """
+        path_codes = np.asarray(path_codes, dtype=np.int64)
+        n_paths, length = path_codes.shape
+        with np.errstate(divide="ignore"):
+            log_probs = np.log(np.asarray(probabilities, dtype=np.float64))
+        
+        codes, parents, node_log_probs = [], [], []
+        node_ids = np.full(n_paths, -1, dtype=np.int64)
+        n_nodes = 0
+        n_types = max(len(disaster_types), 1)
+        for step in range(length):
+            # Paths with the same parent node and code share a node
+            keys = (node_ids + 1) * n_types + path_codes[:, step]
+            unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            codes.append(path_codes[first, step])
+            parents.append(node_ids[first])
+            node_log_probs.append(log_probs[first, step])
+            node_ids = n_nodes + inverse.reshape(-1)
+            n_nodes += len(unique_keys)
+        
+        def stack(chunks, dtype):
+            return np.concatenate(chunks).astype(dtype) if chunks else np.empty(0, dtype=dtype)
+        
+        return cls(
+            disaster_types,
+            stack(codes, np.int16),
+            stack(parents, np.int32),
+            stack(node_log_probs, np.float64),
+            node_ids.astype(np.int32) if length else np.empty(0, dtype=np.int32),
+            length
+        )
+    
+    def __len__(self) -> int:
+        return len(self.leaves)
+    
+    def node_matrix(self) -> np.ndarray:
+        """Node index of every step of every path, shape (n_paths, length)"""
+        nodes = np.empty((len(self.leaves), self.length), dtype=np.int64)
+        current = self.leaves.astype(np.int64)
+        for step in range(self.length - 1, -1, -1):
+            nodes[:, step] = current
+            current = self.parents[current]
+        return nodes
+    
+    def path_codes(self) -> np.ndarray:
+        """Disaster codes of every path, shape (n_paths, length)"""
+        return self.codes[self.node_matrix()]
+    
+    def probabilities(self) -> np.ndarray:
+        """Transition probabilities of every path, shape (n_paths, length)"""
+        return np.exp(self.log_probs[self.node_matrix()])
+    
+    def log_probabilities(self) -> np.ndarray:
+        """Total log-probability of every path, shape (n_paths,)"""
+        return self.log_probs[self.node_matrix()].sum(axis=1)
+    
+    def to_dicts(self, log_probability: bool = False) -> List[Dict[str, Any]]:
+        """
+        Export the paths in the list-of-dictionaries format of predict_cascade
+        
+        Args:
+            log_probability: Also include the total log-probability of each path
+            
+        Returns:
+            List of dictionaries with path, probabilities and cumulative_probability
+        """
+        nodes = self.node_matrix()
+        codes = self.codes[nodes]
+        log_probs = self.log_probs[nodes]
+        total = log_probs.sum(axis=1)
+        paths = []
+        for path, step_log_probs, path_log_prob in zip(codes, log_probs, total):
+            path_info = {
+                "path": [self.disaster_types[code] for code in path],
+                "probabilities": np.exp(step_log_probs).tolist(),
+                "cumulative_probability": float(np.exp(path_log_prob))
+            }
+            if log_probability:
+                path_info["log_probability"] = float(path_log_prob)
+            paths.append(path_info)
+        return paths
+    
+    def to_records(self) -> np.ndarray:
+        """
+        Export one row per (path, step) as a NumPy structured array
+        
+        Returns:
+            Structured array with fields path, step, code, disaster, probability,
+            cumulative_probability (running product up to the step) and
+            path_probability (probability of the whole path)
+        """
+        nodes = self.node_matrix()
+        n_paths, length = nodes.shape
+        log_probs = self.log_probs[nodes]
+        name_width = max([len(name) for name in self.disaster_types] + [1])
+        records = np.empty(n_paths * length, dtype=[
+            ("path", np.int32),
+            ("step", np.int32),
+            ("code", np.int16),
+            ("disaster", f"U{name_width}"),
+            ("probability", np.float64),
+            ("cumulative_probability", np.float64),
+            ("path_probability", np.float64)
+        ])
+        codes = self.codes[nodes].ravel()
+        records["path"] = np.repeat(np.arange(n_paths), length)
+        records["step"] = np.tile(np.arange(length), n_paths)
+        records["code"] = codes
+        records["disaster"] = np.asarray(self.disaster_types, dtype=object)[codes] if codes.size else []
+        records["probability"] = np.exp(log_probs).ravel()
+        records["cumulative_probability"] = np.exp(np.cumsum(log_probs, axis=1)).ravel()
+        records["path_probability"] = np.repeat(np.exp(log_probs.sum(axis=1)), length)
+        return records
+    
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Export one row per (path, step) as a DataFrame (see to_records)
+        
+        Returns:
+            DataFrame with the columns of to_records
+        """
+        return pd.DataFrame(self.to_records())
+
+
+class _PathNode:
+    """A node of the exact search tree, sharing its prefix through the parent link"""
+    
+    __slots__ = ("parent", "code", "depth", "log_prob")
+    
+    def __init__(self, parent: Optional["_PathNode"], code: int, depth: int, log_prob: float):
+        self.parent = parent
+        self.code = code
+        self.depth = depth
+        self.log_prob = log_prob
+
+
 class DisasterCascadePredictor:
     """
     A class for predicting cascading disasters based on a Bayesian network model
     """
     
-    def __init__(self, bayesian_network_json_path: str):
+    # Process-wide memo of cascade results, shared by every predictor instance
+    # (every Streamlit session and page). Keys include the model fingerprint, so
+    # entries from a changed model file are never served and simply age out.
+    _memo = _LRUMemo(maxsize=4096)
+    
+    def __init__(self,
+                 bayesian_network_json_path: str,
+                 artifact_path: Optional[str] = None,
+                 use_artifact: bool = True):
         """
         Initialize the predictor with a Bayesian network model
         
+        When a compiled artifact (see compile_network_artifact) exists next to
+        the JSON file and is up to date, the model is memory-mapped from it
+        instead of parsing and compiling the JSON; otherwise the JSON is used.
+        
         Args:
             bayesian_network_json_path: Path to the JSON file containing the Bayesian network
+            artifact_path: Path to the compiled artifact (default: JSON path with ARTIFACT_SUFFIX)
+            use_artifact: Whether to try the compiled artifact at all
         """
+        self._json_path = bayesian_network_json_path
+        self._bayes_net = None
+        # Exact-search bounds, built on first use; the predictor is shared across sessions
+        self._bound_cache = None
+        self._bound_lock = threading.Lock()
+        
+        artifact = None
+        if use_artifact:
+            artifact = load_network_artifact(
+                artifact_path or default_artifact_path(bayesian_network_json_path),
+                bayesian_network_json_path
+            )
+        
+        if artifact is not None:
+            # Zero-copy load: arrays are views on a read-only memory map
+            header, arrays = artifact
+            self.model_fingerprint = header["source"]["sha256"]
+            self.disaster_types = header["metadata"]["disaster_types"]
+            self.metadata = header["metadata"]
+            self._type_names = header["type_names"]
+            self._type_codes = {name: i for i, name in enumerate(self._type_names)}
+            self._severity_levels = header["severity_levels"]
+            self._severity_codes = {s: i for i, s in enumerate(self._severity_levels)}
+            self._first_order = arrays["first_order"]
+            self._second_order = arrays["second_order"]
+            self._second_order_known = arrays["second_order_known"]
+            return
+        
         # Load the Bayesian network from JSON file
-        with open(bayesian_network_json_path, 'r') as f:
-            self.bayes_net = json.load(f)
+        with open(bayesian_network_json_path, 'rb') as f:
+            raw = f.read()
+        self._bayes_net = json.loads(raw)
+        
+        # Content hash of the model, used to key memoized results
+        self.model_fingerprint = hashlib.sha256(raw).hexdigest()
         
         # Validate the loaded network
         self._validate_network()
         
         # Extract disaster types for convenience
+        self.metadata = self.bayes_net['metadata']
         self.disaster_types = self.bayes_net['metadata']['disaster_types']
+        
+        # Compile the CPDs into integer-indexed arrays for the vectorized engine
+        self._compile_network()
+    
+    @property
+    def bayes_net(self) -> Dict[str, Any]:
+        """The Bayesian network as parsed JSON (loaded on first use when memory-mapped)"""
+        if self._bayes_net is None:
+            with open(self._json_path, 'r') as f:
+                self._bayes_net = json.load(f)
+        return self._bayes_net
     
     def _validate_network(self) -> None:
         """Validate that the loaded Bayesian network has the expected structure"""
@@ -31,6 +355,217 @@ class DisasterCascadePredictor:
             if key not in self.bayes_net:
                 raise ValueError(f"Bayesian network missing required key: {key}")
     
+    def _compile_network(self) -> None:
+        """
+        Compile the nested CPD dictionaries into integer-indexed NumPy arrays
+        
+        Builds:
+            - _type_codes: disaster type -> integer code (declared types first,
+              then any extra outcome that only appears inside a CPD)
+            - _severity_codes: severity level -> integer code ("all" included)
+            - _first_order: type x severity x type matrix of transition probabilities
+            - _second_order: type x type x type tensor of transition probabilities
+            - _second_order_known: type x type mask of pairs present in the JSON
+        
+        The dictionary fallbacks of the reference implementation are baked in:
+        a missing severity uses the "all" row, and a missing second-order pair
+        uses the first-order "all" row of the current disaster.
+        """
+        first_order = self.bayes_net["first_order_cpd"]
+        second_order = self.bayes_net["second_order_cpd"]
+        
+        # Build the type vocabulary
+        self._type_names = list(self.disaster_types)
+        self._type_codes = {name: i for i, name in enumerate(self._type_names)}
+        
+        def register(name: str) -> None:
+            if name not in self._type_codes:
+                self._type_codes[name] = len(self._type_names)
+                self._type_names.append(name)
+        
+        for disaster, cpds in first_order.items():
+            register(disaster)
+            for cpd in cpds.values():
+                for next_disaster in cpd:
+                    register(next_disaster)
+        for second_last, cpds in second_order.items():
+            register(second_last)
+            for last, cpd in cpds.items():
+                register(last)
+                for next_disaster in cpd:
+                    register(next_disaster)
+        
+        # Build the severity index ("all" is always the last level)
+        severities = list(self.bayes_net["metadata"].get("severity_categories", ["low", "medium", "high"]))
+        self._severity_levels = [s for s in severities if s != "all"] + ["all"]
+        self._severity_codes = {s: i for i, s in enumerate(self._severity_levels)}
+        all_code = self._severity_codes["all"]
+        
+        n_types = len(self._type_names)
+        n_severities = len(self._severity_levels)
+        codes = self._type_codes
+        
+        # First-order matrix: P(next | disaster, severity)
+        self._first_order = np.zeros((n_types, n_severities, n_types))
+        for disaster, cpds in first_order.items():
+            for severity, s in self._severity_codes.items():
+                cpd = cpds.get(severity, cpds.get("all", {}))
+                for next_disaster, prob in cpd.items():
+                    self._first_order[codes[disaster], s, codes[next_disaster]] = prob
+        
+        # Second-order tensor: P(next | second_last, last), defaulting to first-order "all"
+        self._second_order = np.broadcast_to(
+            self._first_order[None, :, all_code, :], (n_types, n_types, n_types)
+        ).copy()
+        self._second_order_known = np.zeros((n_types, n_types), dtype=bool)
+        for second_last, cpds in second_order.items():
+            for last, cpd in cpds.items():
+                row = np.zeros(n_types)
+                for next_disaster, prob in cpd.items():
+                    row[codes[next_disaster]] = prob
+                self._second_order[codes[second_last], codes[last]] = row
+                self._second_order_known[codes[second_last], codes[last]] = True
+    
+    def compiled_network(self) -> Dict[str, Any]:
+        """
+        The compiled, integer-indexed form of the network (arrays are shared, not copied)
+        
+        Returns:
+            Dictionary containing:
+                - disaster_types: Type vocabulary (array index -> disaster type)
+                - severity_levels: Severity vocabulary, "all" last
+                - first_order: Array (types, severities, types) of P(next | disaster, severity)
+                - second_order: Array (types, types, types) of P(next | second_last, last)
+                - second_order_known: Boolean array (types, types) of pairs present in the model
+        """
+        return {
+            "disaster_types": list(self._type_names),
+            "severity_levels": list(self._severity_levels),
+            "first_order": self._first_order,
+            "second_order": self._second_order,
+            "second_order_known": self._second_order_known
+        }
+    
+    def _validate_cascade_inputs(self, initial_disaster: str, initial_severity: str) -> None:
+        """Validate the initial disaster and severity of a cascade query"""
+        if initial_disaster not in self.disaster_types:
+            raise ValueError(f"Unknown disaster type: {initial_disaster}. "
+                           f"Must be one of {self.disaster_types}")
+        
+        if initial_severity not in ["low", "medium", "high", "all"]:
+            raise ValueError("Severity must be 'low', 'medium', 'high', or 'all'")
+    
+    def _beam_search(self,
+                     initial_codes: np.ndarray,
+                     severity_codes: np.ndarray,
+                     cascade_length: int,
+                     probability_threshold: float,
+                     beam_width: int) -> Tuple[List[Tuple[np.ndarray, np.ndarray, np.ndarray]], np.ndarray, np.ndarray]:
+        """
+        Run the cascade beam expansion as array operations for a batch of starts
+        
+        Every start keeps its own beam; all beams are expanded together. Paths are
+        never copied: each step only records, per beam slot, the slot of the
+        previous step it extends (a parent pointer), its code and its probability.
+        
+        Args:
+            initial_codes: Integer codes of the initial disasters, shape (n,)
+            severity_codes: Integer codes of the initial severities, shape (n,)
+            cascade_length: Maximum length of the cascade (including the initial disaster)
+            probability_threshold: Transitions with probability <= threshold are dropped
+            beam_width: Number of paths kept per start after each step
+            
+        Returns:
+            Tuple of (levels, cumulative_probabilities, alive). levels[t] holds
+            (parents, codes, probabilities) arrays of shape (n, width_t) for step t.
+            The last beam is sorted by descending cumulative probability; slots
+            where alive is False hold no path.
+        """
+        n_types = len(self._type_names)
+        n_starts = len(initial_codes)
+        last = np.asarray(initial_codes, dtype=np.intp).reshape(n_starts, 1)
+        second_last = last
+        levels = [(np.full((n_starts, 1), -1, dtype=np.intp), last, np.ones((n_starts, 1)))]
+        cum_probs = np.ones((n_starts, 1))
+        alive = np.ones((n_starts, 1), dtype=bool)
+        
+        for step in range(1, cascade_length):
+            # Transition rows for every path in every beam
+            if step == 1:
+                trans = self._first_order[initial_codes, severity_codes][:, None, :]
+            else:
+                trans = self._second_order[second_last, last]
+            
+            # Score every (path, next disaster) pair with an outer product, masking
+            # dead slots and transitions under the threshold
+            valid = alive[:, :, None] & (trans > probability_threshold)
+            scores = np.where(valid, cum_probs[:, :, None] * trans, -np.inf).reshape(n_starts, -1)
+            
+            # Keep the top of each beam without sorting every candidate
+            width = min(beam_width, scores.shape[1])
+            if scores.shape[1] > width:
+                candidates = self._top_candidates(scores, width)
+            else:
+                candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            scores = np.take_along_axis(scores, candidates, axis=1)
+            
+            # Sort by descending probability; ties by candidate index, i.e. parent slot
+            # then disaster code (the reference orders ties by each CPD's key order,
+            # so tied paths can be ranked differently)
+            order = np.lexsort((candidates, -scores), axis=1)
+            candidates = np.take_along_axis(candidates, order, axis=1)
+            scores = np.take_along_axis(scores, order, axis=1)
+            
+            rows, next_codes = np.divmod(candidates, n_types)
+            step_probs = np.take_along_axis(trans.reshape(n_starts, -1), candidates, axis=1)
+            levels.append((rows, next_codes, step_probs))
+            second_last, last = np.take_along_axis(last, rows, axis=1), next_codes
+            alive = np.isfinite(scores)
+            cum_probs = np.where(alive, scores, 0.0)
+        
+        return levels, cum_probs, alive
+    
+    @staticmethod
+    def _top_candidates(scores: np.ndarray, width: int) -> np.ndarray:
+        """
+        Columns of the width best scores of each row, in column order
+        
+        Scores tied with the width-th best are taken lowest column first, so the
+        beam does not depend on argpartition's arbitrary choice among ties.
+        """
+        partition = np.argpartition(-scores, width - 1, axis=1)[:, :width]
+        kth = np.take_along_axis(scores, partition, axis=1).min(axis=1, keepdims=True)
+        above = scores > kth
+        tied = scores == kth
+        needed = width - above.sum(axis=1, keepdims=True)
+        selected = above | (tied & (np.cumsum(tied, axis=1) <= needed))
+        # Exactly width columns are selected per row; nonzero lists them row by row
+        return np.nonzero(selected)[1].reshape(len(scores), width)
+    
+    @staticmethod
+    def _backtrack(levels: List[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+                   slots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Follow the parent pointers of the beam to build full paths for selected slots
+        
+        Args:
+            levels: Per-step (parents, codes, probabilities) from _beam_search
+            slots: Slots of the last step to build, shape (n, k)
+            
+        Returns:
+            Tuple of (codes, probabilities), each of shape (n, k, length)
+        """
+        n_starts, n_slots = slots.shape
+        codes = np.empty((n_starts, n_slots, len(levels)), dtype=np.intp)
+        probs = np.empty((n_starts, n_slots, len(levels)))
+        for step in range(len(levels) - 1, -1, -1):
+            parents, level_codes, level_probs = levels[step]
+            codes[:, :, step] = np.take_along_axis(level_codes, slots, axis=1)
+            probs[:, :, step] = np.take_along_axis(level_probs, slots, axis=1)
+            if step > 0:
+                slots = np.take_along_axis(parents, slots, axis=1)
+        return codes, probs
+    
     def predict_cascade(self, 
                         initial_disaster: str, 
                         initial_severity: str = "all", 
@@ -40,6 +575,377 @@ class DisasterCascadePredictor:
         """
         Predict the most likely cascade of disasters following the initial disaster
         
+        Args:
+            initial_disaster: The type of the initial disaster (e.g., "earthquake")
+            initial_severity: Severity of the initial disaster ("low", "medium", "high", or "all")
+            cascade_length: Maximum length of the cascade to predict (including the initial disaster)
+            probability_threshold: Minimum probability threshold for including a prediction
+            top_k: Number of top cascade paths to return
+            
+        Returns:
+            List of dictionaries representing the most likely cascade paths, each containing:
+                - path: List of disaster types in the cascade
+                - probabilities: List of individual transition probabilities
+                - cumulative_probability: Product of all transition probabilities
+        """
+        return self.predict_cascade_paths(
+            initial_disaster, initial_severity, cascade_length, probability_threshold, top_k
+        ).to_dicts()
+    
+    def predict_cascade_paths(self,
+                              initial_disaster: str,
+                              initial_severity: str = "all",
+                              cascade_length: int = 3,
+                              probability_threshold: float = 0.0,
+                              top_k: int = 3) -> CascadePaths:
+        """
+        Predict the most likely cascades as a compact, prefix-shared CascadePaths
+        
+        Takes the same arguments as predict_cascade. The result can be exported
+        with to_dicts(), to_records() or to_frame().
+        
+        Returns:
+            CascadePaths holding the top cascade paths, most likely first. The
+            result may be shared with other callers: its arrays are read-only.
+        """
+        # Serve repeated queries from the memo
+        key = ("predict_cascade_paths", self.model_fingerprint, initial_disaster, initial_severity,
+               cascade_length, probability_threshold, top_k)
+        found, cached = self._memo.get(key)
+        if found:
+            return cached
+        
+        # Validate inputs
+        self._validate_cascade_inputs(initial_disaster, initial_severity)
+        
+        if top_k <= 0:
+            result = CascadePaths.from_arrays(self._type_names, np.empty((0, 0)), np.empty((0, 0)))
+        else:
+            # Run the vectorized beam expansion (keep more than top_k to allow for diversity)
+            levels, _, alive = self._beam_search(
+                np.array([self._type_codes[initial_disaster]]),
+                np.array([self._severity_codes[initial_severity]]),
+                cascade_length,
+                probability_threshold,
+                beam_width=top_k * 5
+            )
+            
+            # Only the final top-k paths are built
+            n_paths = min(top_k, int(alive[0].sum()))
+            codes, probs = self._backtrack(levels, np.arange(n_paths)[None, :])
+            result = CascadePaths.from_arrays(self._type_names, codes[0], probs[0])
+        
+        # Memo hits hand out this same (read-only) object
+        self._memo.put(key, result)
+        return result
+    
+    def predict_cascade_many(self,
+                             initial_disasters: List[str],
+                             severities: Any = "all",
+                             cascade_length: int = 3,
+                             probability_threshold: float = 0.0,
+                             top_k: int = 3) -> Dict[str, Any]:
+        """
+        Predict cascades for many (disaster, severity) inputs in one vectorized pass
+        
+        Identical inputs are computed once; all unique inputs are expanded together.
+        Row i of every array matches predict_cascade(initial_disasters[i], severities[i], ...).
+        
+        Args:
+            initial_disasters: Initial disaster type per input (e.g., one per zone)
+            severities: A single severity for all inputs, or one severity per input
+            cascade_length: Maximum length of the cascade to predict (including the initial disaster)
+            probability_threshold: Minimum probability threshold for including a prediction
+            top_k: Number of top cascade paths to return per input
+            
+        Returns:
+            Dictionary of columnar results:
+                - disaster_types: Vocabulary used to decode path codes
+                - paths: int16 array (n, top_k, length) of disaster codes, -1 where there is no path
+                - probabilities: float array (n, top_k, length) of transition probabilities, NaN padded
+                - cumulative_probability: float array (n, top_k), NaN padded
+                - n_paths: int array (n,) of paths found per input
+        """
+        disasters = np.asarray(initial_disasters, dtype=object)
+        if np.ndim(severities) == 0:
+            severities = np.full(len(disasters), severities, dtype=object)
+        else:
+            severities = np.asarray(severities, dtype=object)
+        if len(severities) != len(disasters):
+            raise ValueError("severities must be a single value or match initial_disasters in length")
+        if top_k < 0:
+            raise ValueError(f"top_k must be non-negative, got {top_k}")
+        
+        # Factorize the inputs and validate each distinct value once
+        disaster_values, disaster_inverse = np.unique(disasters.astype(str), return_inverse=True)
+        severity_values, severity_inverse = np.unique(severities.astype(str), return_inverse=True)
+        for disaster in disaster_values:
+            self._validate_cascade_inputs(disaster, "all")
+        for severity in severity_values:
+            if severity not in ["low", "medium", "high", "all"]:
+                raise ValueError("Severity must be 'low', 'medium', 'high', or 'all'")
+        disaster_codes = np.array([self._type_codes[d] for d in disaster_values], dtype=np.intp)
+        severity_codes = np.array([self._severity_codes[s] for s in severity_values], dtype=np.intp)
+        
+        # Deduplicate (disaster, severity) pairs
+        keys = disaster_codes[disaster_inverse] * len(self._severity_levels) + severity_codes[severity_inverse]
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        unique_disasters, unique_severities = np.divmod(unique_keys, len(self._severity_levels))
+        
+        length = max(cascade_length, 1)
+        n_unique = len(unique_keys)
+        out_paths = np.full((n_unique, top_k, length), -1, dtype=np.int16)
+        out_probs = np.full((n_unique, top_k, length), np.nan)
+        out_cum = np.full((n_unique, top_k), np.nan)
+        n_paths = np.zeros(n_unique, dtype=int)
+        
+        if top_k > 0 and n_unique > 0:
+            levels, cum_probs, alive = self._beam_search(
+                unique_disasters, unique_severities, cascade_length,
+                probability_threshold, beam_width=top_k * 5
+            )
+            width = min(top_k, alive.shape[1])
+            paths, probs = self._backtrack(levels, np.broadcast_to(np.arange(width), (n_unique, width)))
+            keep = alive[:, :width]
+            out_paths[:, :width][keep] = paths[keep]
+            out_probs[:, :width][keep] = probs[keep]
+            out_cum[:, :width][keep] = cum_probs[:, :width][keep]
+            n_paths = keep.sum(axis=1)
+        
+        return {
+            "disaster_types": list(self._type_names),
+            "paths": out_paths[inverse],
+            "probabilities": out_probs[inverse],
+            "cumulative_probability": out_cum[inverse],
+            "n_paths": n_paths[inverse]
+        }
+    
+    def _completion_bounds(self,
+                           probability_threshold: float,
+                           max_remaining: int) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """
+        Log-space transition tensor and best-completion bounds for the exact search
+        
+        bounds[r][p, c] is the best log-probability of any r further transitions
+        from the state (second_last=p, last=c), i.e. the best remaining transition
+        per state chained r times. It never underestimates a completion, so it is
+        an admissible bound for best-first search. Results are cached per threshold
+        and extended on demand, under a lock since the predictor is shared.
+        
+        Args:
+            probability_threshold: Transitions with probability <= threshold are dropped
+            max_remaining: Largest number of remaining transitions needed
+            
+        Returns:
+            Tuple of (log_second_order, bounds)
+        """
+        n_types = len(self._type_names)
+        with self._bound_lock:
+            cached = self._bound_cache
+            if cached is None or cached[0] != probability_threshold:
+                with np.errstate(divide="ignore"):
+                    log_second = np.log(np.where(self._second_order > probability_threshold,
+                                                 self._second_order, 0.0))
+                cached = (probability_threshold, log_second, [np.zeros((n_types, n_types))])
+            
+            _, log_second, bounds = cached
+            # Extend a copy of the list so that callers holding the old one are unaffected
+            bounds = list(bounds)
+            # Process second_last types in blocks to keep the temporary tensor small
+            block = max(1, (1 << 22) // max(1, n_types * n_types))
+            while len(bounds) <= max_remaining:
+                previous = bounds[-1]
+                current = np.empty_like(previous)
+                for start in range(0, n_types, block):
+                    stop = min(start + block, n_types)
+                    current[start:stop] = np.max(log_second[start:stop] + previous[None, :, :], axis=2)
+                bounds.append(current)
+            self._bound_cache = (probability_threshold, log_second, bounds)
+        
+        return log_second, bounds
+    
+    def predict_cascade_exact(self,
+                              initial_disaster: str,
+                              initial_severity: str = "all",
+                              cascade_length: int = 3,
+                              probability_threshold: float = 0.0,
+                              top_k: int = 3,
+                              max_expansions: int = 100000,
+                              max_queue_size: int = 100000) -> Dict[str, Any]:
+        """
+        Find the exact top-k cascade paths with best-first search in log space
+        
+        Unlike predict_cascade, no candidate is dropped by a fixed beam: paths are
+        expanded in order of (log-probability so far + admissible bound on the
+        rest), so complete paths come off the priority queue in exact order.
+        
+        Args:
+            initial_disaster: The type of the initial disaster (e.g., "earthquake")
+            initial_severity: Severity of the initial disaster ("low", "medium", "high", or "all")
+            cascade_length: Length of the cascade to predict (including the initial disaster)
+            probability_threshold: Minimum probability threshold for including a prediction
+            top_k: Number of top cascade paths to return
+            max_expansions: Maximum number of nodes to expand before giving up
+            max_queue_size: Maximum number of open nodes kept in the priority queue;
+                the worst nodes are pruned beyond this
+            
+        Returns:
+            Dictionary containing:
+                - paths: Top cascade paths in the format of predict_cascade, with an
+                  extra log_probability entry per path
+                - cascade: The same paths as a CascadePaths
+                - nodes_expanded: Number of search nodes expanded
+                - proven_optimal: Whether the returned paths are proven to be the exact top-k
+        """
+        # Validate inputs
+        self._validate_cascade_inputs(initial_disaster, initial_severity)
+        if top_k < 0:
+            raise ValueError(f"top_k must be non-negative, got {top_k}")
+        
+        initial_code = self._type_codes[initial_disaster]
+        severity_code = self._severity_codes[initial_severity]
+        
+        if top_k == 0 or cascade_length <= 1:
+            codes = np.full((min(top_k, 1), 1), initial_code)
+            cascade = CascadePaths.from_arrays(self._type_names, codes, np.ones(codes.shape))
+            return {
+                "paths": cascade.to_dicts(log_probability=True),
+                "cascade": cascade,
+                "nodes_expanded": 0,
+                "proven_optimal": True
+            }
+        
+        log_second, bounds = self._completion_bounds(probability_threshold, cascade_length - 2)
+        first = self._first_order[initial_code, severity_code]
+        with np.errstate(divide="ignore"):
+            log_first = np.log(np.where(first > probability_threshold, first, 0.0))
+        
+        # Queue entries: (-upper bound, -depth, tie breaker, node); nodes share
+        # their prefix through parent links instead of copying the path
+        queue = [(0.0, -1, 0, _PathNode(None, initial_code, 1, 0.0))]
+        counter = 1
+        nodes_expanded = 0
+        pruned_bound = -np.inf
+        results = []
+        
+        while queue and len(results) < top_k and nodes_expanded < max_expansions:
+            node = heapq.heappop(queue)[3]
+            
+            # Complete paths come off the queue in order of exact log-probability
+            if node.depth == cascade_length:
+                results.append(node)
+                continue
+            
+            nodes_expanded += 1
+            # First transition uses the first-order CPD, later ones the second-order tensor
+            trans = log_first if node.depth == 1 else log_second[node.parent.code, node.code]
+            
+            # Each child (last, next) is scored with the bound on its remaining transitions
+            child_log_probs = node.log_prob + trans
+            child_bounds = child_log_probs + bounds[cascade_length - node.depth - 1][node.code]
+            for next_code in np.flatnonzero(np.isfinite(child_bounds)):
+                child = _PathNode(node, int(next_code), node.depth + 1, float(child_log_probs[next_code]))
+                heapq.heappush(queue, (-child_bounds[next_code], -child.depth, counter, child))
+                counter += 1
+            
+            # Bound memory by pruning the worst half of the queue, remembering the
+            # best bound that was thrown away
+            if len(queue) > max_queue_size:
+                queue.sort(key=lambda entry: entry[:3])
+                keep = max(1, max_queue_size // 2)
+                pruned_bound = max(pruned_bound, -queue[keep][0])
+                del queue[keep:]
+        
+        # Without pruning, an emptied queue means every path was found. After pruning,
+        # only a full top-k that beats every discarded bound is proven: a discarded
+        # node may have led to the paths still missing from a short result.
+        if pruned_bound == -np.inf:
+            proven_optimal = len(results) == top_k or not queue
+        else:
+            proven_optimal = len(results) == top_k and results[-1].log_prob >= pruned_bound
+        
+        # Build full paths for the results only
+        codes = np.empty((len(results), cascade_length), dtype=np.intp)
+        for row, node in enumerate(results):
+            while node is not None:
+                codes[row, node.depth - 1] = node.code
+                node = node.parent
+        probs = np.ones((len(results), cascade_length))
+        probs[:, 1] = first[codes[:, 1]]
+        probs[:, 2:] = self._second_order[codes[:, :-2], codes[:, 1:-1], codes[:, 2:]]
+        cascade = CascadePaths.from_arrays(self._type_names, codes, probs)
+        
+        return {
+            "paths": cascade.to_dicts(log_probability=True),
+            "cascade": cascade,
+            "nodes_expanded": nodes_expanded,
+            "proven_optimal": bool(proven_optimal)
+        }
+    
+    def predict_marginals(self,
+                          initial_disaster: str,
+                          initial_severity: str = "all",
+                          horizon: int = 3) -> Dict[str, Any]:
+        """
+        Predict the probability of each disaster type at every step of the cascade
+        
+        Rather than enumerating paths, the second-order CPD is treated as a
+        first-order Markov chain over (second_last, last) pairs and the joint
+        distribution over pairs is propagated one step at a time. Each step costs
+        O(N^3) for N disaster types, so the full horizon is O(horizon * N^3)
+        regardless of branching, and no probability mass is dropped.
+        
+        Args:
+            initial_disaster: The type of the initial disaster (e.g., "earthquake")
+            initial_severity: Severity of the initial disaster ("low", "medium", "high", or "all")
+            horizon: Number of follow-on events to propagate
+            
+        Returns:
+            Dictionary containing:
+                - disaster_types: Column labels of the arrays below
+                - marginals: Array (horizon + 1, N); row t is P(event t is each type),
+                  row 0 being the initial disaster
+                - expected_counts: Array (N,) of the expected number of follow-on
+                  events of each type across the horizon
+        """
+        # Validate inputs
+        self._validate_cascade_inputs(initial_disaster, initial_severity)
+        if horizon < 0:
+            raise ValueError("Horizon must be non-negative")
+        
+        n_types = len(self._type_names)
+        initial_code = self._type_codes[initial_disaster]
+        marginals = np.zeros((horizon + 1, n_types))
+        marginals[0, initial_code] = 1.0
+        
+        if horizon >= 1:
+            # Joint distribution over (second_last, last) after the first transition
+            joint = np.zeros((n_types, n_types))
+            joint[initial_code] = self._first_order[initial_code, self._severity_codes[initial_severity]]
+            marginals[1] = joint.sum(axis=0)
+            
+            for step in range(2, horizon + 1):
+                # P(last=c, next=n) = sum_p P(second_last=p, last=c) * P(n | p, c)
+                joint = np.einsum("pc,pcn->cn", joint, self._second_order)
+                marginals[step] = joint.sum(axis=0)
+        
+        return {
+            "disaster_types": list(self._type_names),
+            "marginals": marginals,
+            "expected_counts": marginals[1:].sum(axis=0)
+        }
+    
+    def predict_cascade_reference(self, 
+                                  initial_disaster: str, 
+                                  initial_severity: str = "all", 
+                                  cascade_length: int = 3, 
+                                  probability_threshold: float = 0.0,
+                                  top_k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Reference implementation of predict_cascade that walks the JSON dictionaries
+        directly. Kept to check the vectorized engine against; takes the same
+        arguments and returns the same structure as predict_cascade.
+        
         Args:
             initial_disaster: The type of the initial disaster (e.g., "earthquake")
             initial_severity: Severity of the initial disaster ("low", "medium", "high", or "all")
@@ -142,24 +1048,37 @@ class DisasterCascadePredictor:
         if severity_sequence is None:
             severity_sequence = ["all"] * len(disaster_sequence)
         
-        # Check if we have only one disaster or multiple
-        if len(disaster_sequence) == 1:
-            # Use first-order CPD
-            cpd = self.bayes_net["first_order_cpd"][disaster_sequence[0]][severity_sequence[0]]
+        # Use the second-order CPD for the last two disasters in the sequence, and the
+        # first-order CPD for a single disaster or when the pair is unknown
+        last_disaster = disaster_sequence[-1]
+        last = self._type_codes[last_disaster]
+        second_last_disaster = disaster_sequence[-2] if len(disaster_sequence) > 1 else None
+        second_last = self._type_codes.get(second_last_disaster)
+        
+        if second_last is not None and self._second_order_known[second_last, last]:
+            cpd = self._second_order[second_last, last]
+            cpd_keys = lambda: self.bayes_net["second_order_cpd"][second_last_disaster][last_disaster]
         else:
-            # Use second-order CPD for the last two disasters in the sequence
-            last_disaster = disaster_sequence[-1]
-            second_last_disaster = disaster_sequence[-2]
+            severity = severity_sequence[-1]
+            cpd = self._first_order[last, self._severity_codes[severity]]
             
-            try:
-                cpd = self.bayes_net["second_order_cpd"][second_last_disaster][last_disaster]
-            except KeyError:
-                # Fallback to first-order if second-order unavailable
-                cpd = self.bayes_net["first_order_cpd"][last_disaster][severity_sequence[-1]]
+            def cpd_keys():
+                cpds = self.bayes_net["first_order_cpd"].get(last_disaster, {})
+                return cpds.get(severity, cpds.get("all", {}))
         
         # Find the disaster with highest probability
-        most_likely = max(cpd.items(), key=lambda x: x[1])
-        return most_likely  # (disaster_type, probability)
+        best = int(np.argmax(cpd))
+        tied = np.flatnonzero(cpd == cpd[best])
+        if len(tied) == 1:
+            return self._type_names[best], float(cpd[best])  # (disaster_type, probability)
+        
+        # Ties (e.g. an all-zero row) go to the first tied outcome in CPD key order, as in the
+        # dictionary implementation; outcomes missing from the CPD only exist as zeros here
+        tied_names = {self._type_names[code] for code in tied}
+        for next_disaster in cpd_keys():
+            if next_disaster in tied_names:
+                return next_disaster, float(cpd[best])
+        raise ValueError(f"No transition probabilities for disaster: {last_disaster}")
     
     def generate_alert_message(self, 
                               initial_disaster: str, 
@@ -176,6 +1095,13 @@ class DisasterCascadePredictor:
         Returns:
             Alert message string
         """
+        # Serve repeated alerts from the memo
+        key = ("generate_alert_message", self.model_fingerprint, initial_disaster,
+               initial_severity, location)
+        found, cached = self._memo.get(key)
+        if found:
+            return cached
+        
         # Get the top 3 most likely cascade paths
         cascade_paths = self.predict_cascade(
             initial_disaster, 
@@ -212,7 +1138,182 @@ class DisasterCascadePredictor:
         message += "- Prepare emergency resources for potential secondary disasters\n"
         message += "- Evacuate vulnerable areas if necessary\n"
         
+        self._memo.put(key, message)
         return message
+    
+    @classmethod
+    def cache_info(cls) -> Dict[str, int]:
+        """
+        Counters of the shared result memo
+        
+        Returns:
+            Dictionary with hits, misses, evictions, size and maxsize
+        """
+        return cls._memo.info()
+    
+    @classmethod
+    def cache_clear(cls) -> None:
+        """Drop every memoized result and reset the counters"""
+        cls._memo.clear()
+    
+    @classmethod
+    def cache_resize(cls, maxsize: int) -> None:
+        """
+        Change the number of results kept in the shared memo
+        
+        Args:
+            maxsize: Maximum number of memoized results
+        """
+        cls._memo.resize(maxsize)
+
+
+# Compiled model artifact: a versioned binary file holding the type vocabulary,
+# severity index and dense tensors, laid out so that it can be memory-mapped.
+# Layout: magic, uint32 version, uint32 header length, JSON header, then each
+# array's raw bytes at a 64-byte aligned offset recorded in the header.
+ARTIFACT_MAGIC = b"ARKCPD\x00\x00"
+ARTIFACT_VERSION = 1
+ARTIFACT_SUFFIX = ".cpdbin"
+_ARTIFACT_ALIGNMENT = 64
+# Arrays the predictor reads from an artifact
+_ARTIFACT_ARRAYS = ("first_order", "second_order", "second_order_known")
+
+
+def default_artifact_path(json_path: str) -> str:
+    """Path of the compiled artifact that belongs to a CPD JSON file"""
+    return os.path.splitext(json_path)[0] + ARTIFACT_SUFFIX
+
+
+def compile_network_artifact(json_path: str, artifact_path: Optional[str] = None) -> str:
+    """
+    Compile a CPD JSON file into a memory-mappable binary artifact
+    
+    The file is written to a temporary name and atomically renamed, so
+    processes loading it concurrently never see a partial file.
+    
+    Args:
+        json_path: Path to the JSON file containing the Bayesian network
+        artifact_path: Output path (default: JSON path with ARTIFACT_SUFFIX)
+        
+    Returns:
+        Path of the written artifact
+    """
+    artifact_path = artifact_path or default_artifact_path(json_path)
+    predictor = DisasterCascadePredictor(json_path, use_artifact=False)
+    network = predictor.compiled_network()
+    stat = os.stat(json_path)
+    
+    arrays = {
+        "first_order": np.ascontiguousarray(network["first_order"], dtype=np.float64),
+        "second_order": np.ascontiguousarray(network["second_order"], dtype=np.float64),
+        "second_order_known": np.ascontiguousarray(network["second_order_known"], dtype=np.bool_)
+    }
+    header = {
+        "version": ARTIFACT_VERSION,
+        "source": {
+            "sha256": predictor.model_fingerprint,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns
+        },
+        "metadata": predictor.metadata,
+        "type_names": network["disaster_types"],
+        "severity_levels": network["severity_levels"],
+        "arrays": {}
+    }
+    
+    # Offsets depend on the header length, so lay out with a placeholder first
+    def layout(header_size: int) -> int:
+        offset = _align(len(ARTIFACT_MAGIC) + 8 + header_size)
+        for name, array in arrays.items():
+            header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset = _align(offset + array.nbytes)
+        return offset
+    
+    header_size = 0
+    while True:
+        layout(header_size)
+        encoded = json.dumps(header).encode("utf-8")
+        if len(encoded) <= header_size:
+            break
+        header_size = len(encoded) + 64
+    encoded = encoded.ljust(header_size)
+    
+    directory = os.path.dirname(os.path.abspath(artifact_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(ARTIFACT_MAGIC)
+            f.write(struct.pack("<II", ARTIFACT_VERSION, header_size))
+            f.write(encoded)
+            for name, array in arrays.items():
+                f.seek(header["arrays"][name]["offset"])
+                f.write(array.tobytes())
+        os.replace(tmp_path, artifact_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return artifact_path
+
+
+def load_network_artifact(artifact_path: str,
+                          json_path: Optional[str] = None) -> Optional[Tuple[Dict[str, Any], Dict[str, np.ndarray]]]:
+    """
+    Memory-map a compiled artifact if it exists, is readable and is up to date
+    
+    The arrays are read-only views on one shared mapping, so several processes
+    loading the same artifact share the same physical pages. The artifact is
+    stale when the JSON file's size/mtime changed and its content hash no
+    longer matches the one recorded at compile time.
+    
+    Args:
+        artifact_path: Path to the compiled artifact
+        json_path: Source JSON file to check staleness against (optional)
+        
+    Returns:
+        Tuple of (header, arrays), or None when the artifact is missing, stale,
+        of another version or unusable (truncated file, incomplete header)
+    """
+    try:
+        with open(artifact_path, "rb") as f:
+            magic = f.read(len(ARTIFACT_MAGIC))
+            version, header_size = struct.unpack("<II", f.read(8))
+            if magic != ARTIFACT_MAGIC or version != ARTIFACT_VERSION:
+                return None
+            header = json.loads(f.read(header_size))
+        
+        # Fields the predictor reads, so a usable artifact never fails later
+        source = header["source"]
+        if any(key not in header for key in ("type_names", "severity_levels")) \
+                or "disaster_types" not in header["metadata"]:
+            return None
+        
+        if json_path is not None and os.path.exists(json_path):
+            stat = os.stat(json_path)
+            if (stat.st_size, stat.st_mtime_ns) != (source["size"], source["mtime_ns"]):
+                with open(json_path, "rb") as f:
+                    if hashlib.sha256(f.read()).hexdigest() != source["sha256"]:
+                        return None
+        
+        buffer = np.memmap(artifact_path, dtype=np.uint8, mode="r")
+        arrays = {}
+        for name in _ARTIFACT_ARRAYS:
+            spec = header["arrays"][name]
+            dtype = np.dtype(spec["dtype"])
+            shape = tuple(int(n) for n in spec["shape"])
+            start = int(spec["offset"])
+            end = start + int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+            # A partially written or copied file ends before its last array
+            if start < 0 or end > len(buffer):
+                return None
+            arrays[name] = buffer[start:end].view(dtype).reshape(shape)
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        return None
+    return header, arrays
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ARTIFACT_ALIGNMENT) * _ARTIFACT_ALIGNMENT
 
 
 # Example usage
@@ -0,0 +1,219 @@
+# json_output.py
+#
+# Parsing, local repair and schema validation of JSON answers from the LLM.
+#
+# Models asked for JSON often wrap it in a code fence, add a sentence before
+# or after it, leave a trailing comma, or write "High" / "true" where the
+# schema wants "high" / true. These slips are fixed here without another
+# generation; only answers that are still invalid need a (targeted) re-ask.
+# Schemas are a small subset of JSON Schema: type, properties, required,
+# enum and items.
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Verdict of the tweet validation agent
+VERDICT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "tweet": {"type": "string"},
+        "fake": {"type": "boolean"},
+        "confidence": {"type": "string", "enum": ["high", "medium", "low"]},
+        "reason": {"type": "string"}
+    },
+    "required": ["fake", "confidence", "reason"]
+}
+
+_FENCE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)```", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_OPENING = re.compile(r"[{\[]")
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "integer": int,
+    "number": (int, float)
+}
+
+
+def strip_code_fences(text: str) -> str:
+    """Contents of the first ``` code fence, or the text itself if it has none"""
+    match = _FENCE.search(text)
+    return match.group(1) if match else text
+
+
+def json_values(text: str) -> List[Any]:
+    """
+    Every top-level JSON object or array in a text, in order
+
+    Surrounding prose is skipped. A fragment that does not decode is retried
+    without trailing commas, then skipped (the scan continues inside it, so
+    complete objects within a truncated array are still found).
+    """
+    decoder = json.JSONDecoder()
+    values = []
+    match = _OPENING.search(text)
+    while match:
+        position = match.start()
+        try:
+            value, end = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            value, end = _decode_without_trailing_commas(decoder, text, position)
+        if end is None:
+            match = _OPENING.search(text, position + 1)
+            continue
+        values.append(value)
+        match = _OPENING.search(text, end)
+    return values
+
+
+def _decode_without_trailing_commas(decoder: json.JSONDecoder, text: str, position: int) -> Tuple[Any, Optional[int]]:
+    # Only the balanced fragment starting at position is rewritten
+    end = _matching_bracket(text, position)
+    if end is None:
+        return None, None
+    fragment = _TRAILING_COMMA.sub(r"\1", text[position:end + 1])
+    try:
+        return decoder.decode(fragment), end + 1
+    except json.JSONDecodeError:
+        return None, None
+
+
+def _matching_bracket(text: str, position: int) -> Optional[int]:
+    depth, in_string, escaped = 0, False, False
+    for i in range(position, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return i
+    return None
+
+
+def coerce(value: Any, schema: Dict[str, Any]) -> Any:
+    """
+    Repair trivial type slips against a schema
+
+    Enum strings are matched case-insensitively, "true"/"false" strings become
+    booleans and numeric strings become numbers. Anything else is returned
+    unchanged (validate reports it).
+    """
+    expected = schema.get("type")
+    if expected == "object" and isinstance(value, dict):
+        properties = schema.get("properties", {})
+        return {key: coerce(item, properties[key]) if key in properties else item for key, item in value.items()}
+    if expected == "array" and isinstance(value, list) and "items" in schema:
+        return [coerce(item, schema["items"]) for item in value]
+    if isinstance(value, str):
+        text = value.strip()
+        if expected == "boolean" and text.lower() in ("true", "false"):
+            return text.lower() == "true"
+        if expected in ("number", "integer"):
+            try:
+                number = float(text)
+                return int(number) if expected == "integer" and number.is_integer() else number
+            except ValueError:
+                return value
+        if "enum" in schema:
+            for option in schema["enum"]:
+                if isinstance(option, str) and option.lower() == text.lower():
+                    return option
+    return value
+
+
+def validate(value: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """
+    Check a value against a schema
+
+    Returns:
+        List of error messages (empty if the value is valid)
+    """
+    expected = schema.get("type")
+    if expected is not None:
+        python_type = _TYPES[expected]
+        # bool is an int subclass, but not a JSON number
+        if not isinstance(value, python_type) or (isinstance(value, bool) and expected in ("integer", "number")):
+            return [f"{path} must be of type {expected}, got {json.dumps(value)[:60]}"]
+    if "enum" in schema and value not in schema["enum"]:
+        return [f"{path} must be one of {', '.join(json.dumps(option) for option in schema['enum'])}"]
+
+    errors = []
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}.{key} is missing")
+        for key, subschema in schema.get("properties", {}).items():
+            if key in value:
+                errors += validate(value[key], subschema, f"{path}.{key}")
+    if isinstance(value, list) and "items" in schema:
+        for i, item in enumerate(value):
+            errors += validate(item, schema["items"], f"{path}[{i}]")
+    return errors
+
+
+def parse_json_answer(text: str, schema: Optional[Dict[str, Any]] = None) -> Tuple[Any, List[str]]:
+    """
+    Extract, repair and validate the JSON value of an LLM answer
+
+    The first JSON value (inside a code fence if there is one) that satisfies
+    the schema after coercion is returned; if none does, the first value is
+    returned with its errors.
+
+    Args:
+        text: LLM answer
+        schema: Expected schema (no validation if None)
+
+    Returns:
+        Tuple (value, errors); value is None and errors is non-empty when the
+        answer holds no JSON
+    """
+    values = json_values(strip_code_fences(text)) or json_values(text)
+    if not values:
+        return None, ["the answer contains no JSON object"]
+    if schema is None:
+        return values[0], []
+
+    first = None
+    for value in values:
+        value = coerce(value, schema)
+        errors = validate(value, schema)
+        if not errors:
+            return value, []
+        if first is None:
+            first = (value, errors)
+    return first
+
+
+def reask_prompt(prompt: str, answer: str, errors: List[str], schema: Dict[str, Any]) -> str:
+    """
+    Prompt asking the model to correct an invalid JSON answer
+
+    The original prompt is kept so the model can fix the answer from the same
+    evidence; the errors tell it exactly what to change.
+    """
+    return f"""
+{prompt}
+
+Your previous answer was:
+{answer.strip()[:2000]}
+
+It is not valid:
+{chr(10).join(f"- {error}" for error in errors)}
+
+Respond again with only the corrected JSON, matching this JSON schema, and no other text:
+{json.dumps(schema)}
+""".strip()
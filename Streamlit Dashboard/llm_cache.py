@@ -0,0 +1,237 @@
+# llm_cache.py
+#
+# Persistent, content-addressed cache of LLM responses.
+#
+# Responses are keyed by the SHA-256 of the canonical request payload (model,
+# system prompt, prompt and options), so any change to the request is a
+# different entry. SQLite in WAL mode lets several Streamlit processes read
+# and write the same file concurrently.
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "llm_cache.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at);
+"""
+
+
+def payload_key(payload: Dict[str, Any]) -> str:
+    """
+    Content hash of a generate request
+
+    The "stream" flag is left out: it changes how the answer is delivered,
+    not the answer.
+    """
+    canonical = {k: v for k, v in payload.items() if k != "stream"}
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk LLM response cache with size- and age-based eviction
+
+    Entries older than max_age_seconds are never served. When the cache holds
+    more than max_entries entries or max_bytes of responses, the least recently
+    used entries are evicted. Cache errors (e.g. a locked or unwritable file)
+    never fail an LLM call: they count as misses.
+    """
+
+    def __init__(self,
+                 path: str = DEFAULT_CACHE_PATH,
+                 max_entries: int = 10_000,
+                 max_bytes: int = 100 * 1024 * 1024,
+                 max_age_seconds: float = 30 * 24 * 3600,
+                 evict_every: int = 64):
+        """
+        Open (or create) the cache file
+
+        Args:
+            path: SQLite database path
+            max_entries: Maximum number of cached responses
+            max_bytes: Maximum total size of cached responses (UTF-8 bytes)
+            max_age_seconds: Maximum age of a served response
+            evict_every: Run eviction after this many stores
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.evict_every = evict_every
+
+        # sqlite3 connections must stay on their thread: one per thread
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        self.evict()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, counter: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[counter] += n
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Cached response for a payload key, or None
+
+        Args:
+            key: Key from payload_key
+
+        Returns:
+            The cached response, or None on a miss (absent, expired or unreadable)
+        """
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at >= ?",
+                (key, now - self.max_age_seconds)
+            ).fetchone()
+            if row is not None:
+                with conn:
+                    conn.execute("UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                                 (now, key))
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM cache read failed: {str(e)}")
+            self._count("errors")
+            row = None
+
+        self._count("hits" if row is not None else "misses")
+        return row[0] if row is not None else None
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """
+        Store a response
+
+        Args:
+            key: Key from payload_key
+            model: Model name (kept for inspection)
+            response: Response text
+        """
+        now = time.time()
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, response, len(response.encode("utf-8")), now, now)
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM cache write failed: {str(e)}")
+            self._count("errors")
+            return
+
+        self._count("stores")
+        if self._counters["stores"] % self.evict_every == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove expired entries, then least recently used ones beyond the limits
+
+        Returns:
+            Number of entries removed
+        """
+        try:
+            conn = self._connection()
+            with conn:
+                removed = conn.execute("DELETE FROM responses WHERE created_at < ?",
+                                       (time.time() - self.max_age_seconds,)).rowcount
+                removed += conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                ).rowcount
+                removed += conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_access DESC) AS total "
+                    "FROM responses) WHERE total > ?)",
+                    (self.max_bytes,)
+                ).rowcount
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM cache eviction failed: {str(e)}")
+            self._count("errors")
+            return 0
+
+        self._count("evictions", removed)
+        return removed
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Cache metrics
+
+        Returns:
+            Dictionary containing:
+                - hits / misses / stores / evictions / errors: Counts in this process
+                - hit_rate: hits / (hits + misses) in this process
+                - entries: Entries in the cache file
+                - bytes: Total size of the cached responses
+                - total_hits: Hits served from the file by all processes
+        """
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+
+        entries, size, total_hits = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM responses"
+        ).fetchone()
+        counters.update({"entries": entries, "bytes": size, "total_hits": total_hits})
+        return counters
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(path: str = DEFAULT_CACHE_PATH, **options) -> ResponseCache:
+    """
+    Process-wide ResponseCache for a file (created on first use)
+
+    Args:
+        path: SQLite database path
+        **options: ResponseCache limits, used when the cache is first opened
+    """
+    path = os.path.abspath(path)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = ResponseCache(path, **options)
+            _caches[path] = cache
+        return cache
@@ -0,0 +1,268 @@
+# map_layers.py
+#
+# Sensor map layers built from columnar arrays.
+#
+# Instead of one marker (with its own HTML popup) per sensor row, the whole
+# sensor table becomes a single layer: one WebGL scatter trace for Plotly, or
+# one packed array of coordinates and colour levels that the browser turns
+# into clustered markers for Folium. Colours are mapped for all sensors at once, and markers
+# only carry their row position: the page looks up a sensor's details when
+# it is clicked.
+
+import base64
+import json
+import numpy as np
+import pandas as pd
+import folium
+import plotly.graph_objects as go
+from folium.plugins import FastMarkerCluster
+from folium.template import Template
+from typing import List, Optional, Sequence
+
+# Anomaly score thresholds and the colour of each level (normal, low, medium, high)
+ANOMALY_THRESHOLDS = (0.2, 0.5, 0.8)
+ANOMALY_COLORS = ("#00FF00", "#FFFF00", "#FFA500", "#FF0000")
+
+# Columns of a sensor grid cell shown on hover
+CELL_HOVER_COLUMNS = ["count", "anomaly_mean", "anomaly_max", "faulty_share"]
+
+# Sensor columns the layers are built from
+LAYER_COLUMNS = ["latitude", "longitude", "anomaly_score"]
+
+# Largest sensor table drawn as individual Folium markers; Leaflet creates one
+# marker object per sensor, so larger tables are shown as aggregated grid cells
+FOLIUM_MAX_SENSORS = 50_000
+
+# Sensor columns shown when a sensor is clicked
+DETAIL_COLUMNS = ["sensor_id", "sensor_type", "value", "anomaly_score", "status", "nearest_zone_name",
+                  "latitude", "longitude"]
+
+# Folium (Leaflet) marker factory, called in the browser with [lat, lon, colour level, row];
+# the popup text is only built when the popup opens
+SENSOR_MARKER_CALLBACK = """
+function (row) {
+    var colors = %s;
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 5, color: colors[row[2]], fill: true, fillOpacity: 0.8, weight: 0.3
+    });
+    marker.bindPopup(function () {
+        return "<b>Sensor row:</b> " + row[3] + "<br><i>Details are shown below the map</i>";
+    });
+    return marker;
+}
+""" % json.dumps(list(ANOMALY_COLORS))
+
+
+def anomaly_levels(scores) -> np.ndarray:
+    """
+    Colour level of each anomaly score (index into ANOMALY_COLORS)
+
+    Same bands as a per-row check: >= 0.8 high, >= 0.5 medium, >= 0.2 low,
+    otherwise (or missing) normal.
+    """
+    scores = np.asarray(scores, dtype=float)
+    levels = np.digitize(scores, ANOMALY_THRESHOLDS).astype(np.int8)
+    levels[np.isnan(scores)] = 0
+    return levels
+
+
+def anomaly_colors(scores) -> np.ndarray:
+    """Hex colour of each anomaly score"""
+    return np.asarray(ANOMALY_COLORS)[anomaly_levels(scores)]
+
+
+def _level_colorscale(colors: Sequence[str]) -> List[list]:
+    """Stepped colour scale mapping level i (with cmin=-0.5, cmax=n-0.5) to colors[i]"""
+    n = len(colors)
+    scale = []
+    for i, color in enumerate(colors):
+        scale += [[i / n, color], [(i + 1) / n, color]]
+    return scale
+
+
+def sensor_scatter_trace(sensors: pd.DataFrame, marker_size: int = 6, name: str = "Sensors") -> go.Scattermapbox:
+    """
+    All sensors as one WebGL scatter trace
+
+    Coordinates, colour levels and row positions are passed as typed arrays
+    (sent to the browser in binary); hover shows the row position, and the
+    page fetches the full details of clicked points.
+
+    Args:
+        sensors: Sensors with latitude, longitude and anomaly_score columns
+        marker_size: Marker size in pixels
+        name: Trace name
+
+    Returns:
+        Scattermapbox trace whose customdata is each point's row position
+    """
+    return go.Scattermapbox(
+        lat=sensors["latitude"].to_numpy(np.float32),
+        lon=sensors["longitude"].to_numpy(np.float32),
+        mode="markers",
+        marker=dict(
+            size=marker_size,
+            color=anomaly_levels(sensors["anomaly_score"]),
+            colorscale=_level_colorscale(ANOMALY_COLORS),
+            cmin=-0.5,
+            cmax=len(ANOMALY_COLORS) - 0.5,
+            opacity=0.8
+        ),
+        customdata=np.arange(len(sensors), dtype=np.int32),
+        hovertemplate="Sensor row %{customdata}<br>Click for details<extra></extra>",
+        name=name,
+        showlegend=False
+    )
+
+
+def sensor_marker_payload(sensors: pd.DataFrame) -> str:
+    """
+    Sensors packed for SensorMarkerCluster: base64 of float32 latitudes,
+    float32 longitudes and uint8 colour levels, one block after the other
+
+    float32 keeps coordinates to about half a metre at 9 bytes per sensor.
+    """
+    blocks = [
+        sensors["latitude"].to_numpy(np.float32),
+        sensors["longitude"].to_numpy(np.float32),
+        anomaly_levels(sensors["anomaly_score"]).astype(np.uint8)
+    ]
+    return base64.b64encode(b"".join(block.tobytes() for block in blocks)).decode("ascii")
+
+
+class SensorMarkerCluster(FastMarkerCluster):
+    """
+    FastMarkerCluster of all sensors, coloured by anomaly level
+
+    The sensors are embedded as one base64 string of typed arrays (see
+    sensor_marker_payload) and unpacked in the browser. FastMarkerCluster's own
+    list of rows is validated row by row in Python and goes through the
+    template engine as JSON, which takes several seconds for 1M sensors.
+    Leaflet still creates one marker per sensor in the browser: draw it on a
+    map created with prefer_canvas=True, and only up to FOLIUM_MAX_SENSORS
+    sensors (the Risk Map page shows aggregated cells above that).
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function(){
+                {{ this.callback }}
+
+                var n = {{ this.count }};
+                var bytes = Uint8Array.from(atob("{{ this.payload }}"), function (c) { return c.charCodeAt(0); });
+                var lat = new Float32Array(bytes.buffer, 0, n);
+                var lon = new Float32Array(bytes.buffer, 4 * n, n);
+                var level = new Uint8Array(bytes.buffer, 8 * n, n);
+
+                var markers = new Array(n);
+                for (var i = 0; i < n; i++) {
+                    markers[i] = callback([lat[i], lon[i], level[i], i]);
+                }
+                var cluster = L.markerClusterGroup({{ this.options|tojavascript }});
+                cluster.addLayers(markers);
+
+                cluster.addTo({{ this._parent.get_name() }});
+                return cluster;
+            })();
+        {% endmacro %}"""
+    )
+
+    def __init__(self, sensors: pd.DataFrame, name: str = "Sensors", **kwargs):
+        kwargs.setdefault("chunkedLoading", True)
+        super().__init__([], callback=SENSOR_MARKER_CALLBACK, name=name, **kwargs)
+        self.count = len(sensors)
+        self.payload = sensor_marker_payload(sensors)
+
+
+def cell_geojson(cells: pd.DataFrame) -> dict:
+    """
+    Sensor grid cells (see sensor_grid.SensorGrid.cells) as a GeoJSON FeatureCollection of rectangles
+
+    Feature ids are row positions; properties hold the cell aggregates and the
+    colour of its mean anomaly score.
+    """
+    colors = anomaly_colors(cells["anomaly_mean"])
+    columns = {column: cells[column].round(3).tolist() for column in CELL_HOVER_COLUMNS}
+    south, west, north, east = (cells[column].round(6).tolist() for column in ("south", "west", "north", "east"))
+    features = []
+    for i in range(len(cells)):
+        properties = {column: values[i] for column, values in columns.items()}
+        properties["color"] = colors[i]
+        features.append({
+            "type": "Feature",
+            "id": str(i),
+            "properties": properties,
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [[[west[i], south[i]], [east[i], south[i]], [east[i], north[i]],
+                                 [west[i], north[i]], [west[i], south[i]]]]
+            }
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def cell_trace(cells: pd.DataFrame, opacity: float = 0.5, name: str = "Sensor cells") -> go.Choroplethmapbox:
+    """
+    Sensor grid cells as one Plotly trace, coloured by mean anomaly score
+
+    Returns:
+        Choroplethmapbox trace whose customdata holds count, anomaly mean and
+        max and faulty share
+    """
+    return go.Choroplethmapbox(
+        geojson=cell_geojson(cells),
+        locations=[str(i) for i in range(len(cells))],
+        z=anomaly_levels(cells["anomaly_mean"]),
+        colorscale=_level_colorscale(ANOMALY_COLORS),
+        zmin=-0.5,
+        zmax=len(ANOMALY_COLORS) - 0.5,
+        marker_opacity=opacity,
+        marker_line_width=0,
+        showscale=False,
+        customdata=cells[CELL_HOVER_COLUMNS].to_numpy(float),
+        hovertemplate=("Sensors: %{customdata[0]:.0f}<br>Mean score: %{customdata[1]:.2f}<br>"
+                       "Max score: %{customdata[2]:.2f}<br>Faulty: %{customdata[3]:.0%}<extra></extra>"),
+        name=name
+    )
+
+
+def cell_layer(cells: pd.DataFrame, opacity: float = 0.5, name: str = "Sensor cells") -> folium.GeoJson:
+    """Sensor grid cells as one Folium GeoJSON layer, coloured by mean anomaly score"""
+    return folium.GeoJson(
+        cell_geojson(cells),
+        name=name,
+        style_function=lambda feature: {
+            "fillColor": feature["properties"]["color"],
+            "color": feature["properties"]["color"],
+            "weight": 0.5,
+            "fillOpacity": opacity
+        },
+        tooltip=folium.GeoJsonTooltip(
+            fields=CELL_HOVER_COLUMNS,
+            aliases=["Sensors", "Mean score", "Max score", "Faulty share"]
+        )
+    )
+
+
+def nearest_sensor(sensors: pd.DataFrame, latitude: float, longitude: float,
+                   max_distance_deg: float = 1e-4) -> Optional[int]:
+    """
+    Row position of the sensor at a clicked location
+
+    Returns:
+        The position of the closest sensor, or None if none is within
+        max_distance_deg (e.g. the click was on a zone, not a sensor)
+    """
+    if sensors.empty:
+        return None
+    distance = np.hypot(sensors["latitude"].to_numpy(float) - latitude,
+                        sensors["longitude"].to_numpy(float) - longitude)
+    position = int(np.argmin(distance))
+    return position if distance[position] <= max_distance_deg else None
+
+
+def sensor_details(sensors: pd.DataFrame, positions: Sequence[int]) -> pd.DataFrame:
+    """Detail rows of the sensors at some row positions"""
+    columns = [c for c in DETAIL_COLUMNS if c in sensors.columns]
+    return sensors.iloc[list(positions)][columns]
@@ -1,11 +1,9 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import numpy as np
 from constants import FOOTER
-# --- Load Data ---
-ZONE_STRESS_PATH = "data/zone_stress_index.csv"
-SENSOR_DATA_PATH = "data/sensor_anomaly_scored.csv"
+from data_access import zones, live_zones
+from zone_stream import HIGH_STRESS_THRESHOLD, ZONE_COLUMNS
+
+LIVE_REFRESH_SECONDS = 5
 
 # --- Streamlit UI ---
 st.set_page_config(
@@ -25,16 +23,35 @@ st.markdown("""
 This page displays zones under high stress and provides detailed metrics for each zone.
 """)
 
-# Load data
-zone_df = pd.read_csv(ZONE_STRESS_PATH)
-sensor_df = pd.read_csv(SENSOR_DATA_PATH)
+# Load data: the streaming aggregator's latest snapshot when one is published, else the batch index
+use_live = st.sidebar.checkbox("Live Stream", value=True,
+                               help="Use the zone stress published by the streaming aggregator (zone_stream.py)")
+
+def current_zones():
+    live_df = live_zones() if use_live else None
+    return live_df if live_df is not None and not live_df.empty else None
+
+live_df = current_zones()
+live = live_df is not None
+zone_df = live_df[ZONE_COLUMNS] if live else zones()
 
 # Filter high stress zones
-high_stress_zones = zone_df[zone_df["zone_stress"] > 0.6]
+high_stress_zones = zone_df[zone_df["zone_stress"] > HIGH_STRESS_THRESHOLD]
 
-# Display high stress zones table
+# Display high stress zones table (refreshed every few seconds from the live snapshot)
 st.subheader("High Alert Zones Table")
-st.dataframe(high_stress_zones.sort_values("zone_stress", ascending=False))
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS if live else None)
+def high_alert_table():
+    table = current_zones() if live else None
+    if table is None:
+        table = zone_df
+    else:
+        st.caption(f"🟢 Live: readings up to {table['watermark'].iloc[0]}, published {table['published_at'].iloc[0]}")
+    high_stress = table[table["zone_stress"] > HIGH_STRESS_THRESHOLD]
+    st.dataframe(high_stress.sort_values("zone_stress", ascending=False))
+
+high_alert_table()
 
 # Create a zone selector
 st.subheader("Select Zone to Analyze")
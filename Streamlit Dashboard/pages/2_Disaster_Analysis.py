@@ -2,13 +2,10 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
-from disaster import DisasterCascadePredictor
+from copilot_response import stream_zone_summary
+from agent import ollama_status
 from constants import FOOTER
-
-# --- Load Data ---
-ZONE_STRESS_PATH = "data/zone_stress_index.csv"
-SENSOR_DATA_PATH = "data/sensor_anomaly_scored.csv"
-BN_JSON_PATH = "data/cascade-disaster-cpd.json"
+from data_access import zones, sensors, cascade_predictor
 
 # --- Streamlit UI ---
 st.set_page_config(
@@ -20,6 +17,7 @@ st.set_page_config(
 # Sidebar navigation
 st.sidebar.title("Navigation")
 st.sidebar.markdown("---")
+st.sidebar.caption(ollama_status()["label"])
 
 # Main content
 st.title("Disaster Analysis")
@@ -29,9 +27,9 @@ This page analyzes disaster types in high-stress zones and predicts potential ca
 """)
 
 # Load data
-zone_df = pd.read_csv(ZONE_STRESS_PATH)
-sensor_df = pd.read_csv(SENSOR_DATA_PATH)
-predictor = DisasterCascadePredictor(BN_JSON_PATH)
+zone_df = zones()
+sensor_df = sensors(["nearest_zone_name", "sensor_type"])
+predictor = cascade_predictor()
 
 # Filter high stress zones
 high_stress_zones = zone_df[zone_df["zone_stress"] > 0.6]
@@ -58,34 +56,25 @@ st.markdown(f"In Zone **{zone_choice}**, dominant sensor type suggests a **{disa
 # Predict cascading disaster chain
 st.subheader("🔗 Cascading Risk Chain Prediction")
 with st.spinner("Predicting cascading disasters..."):
-    cascade_paths = predictor.predict_cascade(
+    cascade = predictor.predict_cascade_paths(
         initial_disaster=disaster_type, 
         initial_severity="high", 
         cascade_length=3, 
         top_k=3
     )
+    cascade_paths = cascade.to_dicts()
 
 # Create a better visualization for the scenarios
 if cascade_paths:
-    # Create a DataFrame for the scenarios
-    scenario_data = []
-    
-    for i, path_info in enumerate(cascade_paths, 1):
-        path = path_info["path"]
-        probs = path_info["probabilities"]
-        cum_prob = path_info["cumulative_probability"]
-        
-        # Add each step in the path
-        for j, (disaster, prob) in enumerate(zip(path, probs)):
-            scenario_data.append({
-                "Scenario": f"Scenario {i}",
-                "Step": j + 1,
-                "Disaster": disaster.upper(),
-                "Probability": prob * 100,  # Convert to percentage
-                "Cumulative Risk": cum_prob * 100  # Convert to percentage
-            })
-    
-    scenario_df = pd.DataFrame(scenario_data)
+    # Create a DataFrame for the scenarios (one row per scenario step)
+    steps = cascade.to_frame()
+    scenario_df = pd.DataFrame({
+        "Scenario": "Scenario " + (steps["path"] + 1).astype(str),
+        "Step": steps["step"] + 1,
+        "Disaster": steps["disaster"].str.upper(),
+        "Probability": steps["probability"] * 100,  # Convert to percentage
+        "Cumulative Risk": steps["path_probability"] * 100  # Convert to percentage
+    })
     
     # Create a color map for disaster types
     disaster_colors = {
@@ -356,6 +345,29 @@ with col2:
     # </div>
     # """, unsafe_allow_html=True)
 
+# AI Copilot summary, rendered as it is generated
+if cascade_paths:
+    st.subheader("🧠 Copilot Summary")
+    if st.button("Generate Copilot summary"):
+        top_scenario = cascade_paths[0]
+        try:
+            summary = stream_zone_summary(
+                zone_name=zone_choice,
+                disaster_type=disaster_type,
+                alert_message=alert,
+                cascade_path=top_scenario["path"],
+                cumulative_probability=top_scenario["cumulative_probability"]
+            )
+            st.write_stream(summary)
+            metrics = summary.metrics
+            if metrics["cached"]:
+                st.caption("Served from the response cache")
+            elif metrics["tokens_per_second"]:
+                st.caption(f"First token after {metrics['ttft_seconds']:.2f}s · "
+                           f"{metrics['tokens_per_second']:.1f} tokens/s")
+        except Exception as e:
+            st.error(f"Copilot failed: {str(e)}")
+
 # Footer
 st.markdown("---")
 st.markdown(FOOTER) 
\ No newline at end of file
@@ -1,12 +1,8 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import numpy as np
 from constants import FOOTER
-# --- Load Data ---
-ZONE_STRESS_PATH = "data/zone_stress_index.csv"
-SENSOR_DATA_PATH = "data/sensor_anomaly_scored.csv"
+from data_access import zones
 
 # --- Streamlit UI ---
 st.set_page_config(
@@ -27,8 +23,7 @@ This page provides interactive visualizations of zone and sensor data.
 """)
 
 # Load data
-zone_df = pd.read_csv(ZONE_STRESS_PATH)
-sensor_df = pd.read_csv(SENSOR_DATA_PATH)
+zone_df = zones()
 
 # Visualization options
 viz_type = st.radio(
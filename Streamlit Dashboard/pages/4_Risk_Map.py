@@ -2,15 +2,14 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import folium
-from folium.plugins import MarkerCluster
-from streamlit_folium import folium_static
+from streamlit_folium import st_folium
 import plotly.express as px
 import plotly.graph_objects as go
 from constants import FOOTER
-
-# --- Load Data ---
-ZONE_STRESS_PATH = "data/zone_stress_index.csv"
-SENSOR_DATA_PATH = "data/sensor_anomaly_scored.csv"
+from data_access import zones, sensors, zone_geometry, sensor_grid
+from sensor_grid import view_bounds
+from map_layers import (DETAIL_COLUMNS, FOLIUM_MAX_SENSORS, LAYER_COLUMNS, SensorMarkerCluster, cell_layer, cell_trace,
+                        nearest_sensor, sensor_details, sensor_scatter_trace)
 
 # --- Streamlit UI ---
 st.set_page_config(
@@ -30,8 +29,8 @@ This page displays a geographical map showing the distribution of risks across z
 """)
 
 # Load data
-zone_df = pd.read_csv(ZONE_STRESS_PATH)
-sensor_df = pd.read_csv(SENSOR_DATA_PATH)
+zone_df = zones()
+geometry_df = zone_geometry()
 
 # Map options
 st.sidebar.subheader("Map Options")
@@ -41,6 +40,22 @@ map_type = st.sidebar.selectbox(
     index=0
 )
 show_sensors = st.sidebar.checkbox("Show Sensors", value=False)
+sensor_layer = st.sidebar.radio(
+    "Sensor Layer",
+    options=["Aggregated Cells", "Individual Sensors"],
+    index=0,
+    disabled=not show_sensors,
+    help="Aggregated cells follow the map zoom and stay a few thousand; individual sensors sends every point"
+)
+aggregate_sensors = show_sensors and sensor_layer == "Aggregated Cells"
+map_zoom = st.sidebar.slider("Map Zoom (Streamlit Map)", 8, 16, 11)
+
+# Individual sensors only need positions and scores; details are read when a sensor is clicked
+sensor_df = sensors(LAYER_COLUMNS) if show_sensors and not aggregate_sensors else None
+if sensor_df is not None and map_type == "Folium Map (Original)" and len(sensor_df) > FOLIUM_MAX_SENSORS:
+    st.sidebar.info(f"{len(sensor_df):,} sensors are too many for individual Folium markers; "
+                    "showing aggregated cells (use the Streamlit map for individual sensors)")
+    aggregate_sensors, sensor_df = True, None
 show_zones = st.sidebar.checkbox("Show Zones", value=True)
 show_legend = st.sidebar.checkbox("Show Legend", value=True)
 show_zone_labels = st.sidebar.checkbox("Show Zone Labels", value=True)
@@ -50,15 +65,26 @@ st.sidebar.subheader("Filter Options")
 min_stress = st.sidebar.slider("Minimum Zone Stress", 0.0, 1.0, 0.0, 0.1)
 filtered_zones = zone_df[zone_df["zone_stress"] >= min_stress]
 
+# Zone centroids come from the precomputed zone geometry table (zones without sensors drop out)
+zone_points = filtered_zones.merge(
+    geometry_df[["nearest_zone_name", "centroid_lat", "centroid_lon"]], on="nearest_zone_name"
+)
+map_center = [
+    np.average(geometry_df["centroid_lat"], weights=geometry_df["sensor_count"]),
+    np.average(geometry_df["centroid_lon"], weights=geometry_df["sensor_count"])
+]
+
 # Create map
 st.subheader("Geographical Risk Distribution")
 
 # --- Helper ---
-def score_color(score):
-    if score >= 0.8: return "#FF0000"  # Red
-    elif score >= 0.5: return "#FFA500"  # Orange
-    elif score >= 0.2: return "#FFFF00"  # Yellow
-    else: return "#00FF00"  # Green
+def folium_view_bounds(view):
+    """(south, west, north, east) of the map view last reported by st_folium, if any"""
+    bounds = (view or {}).get("bounds") or {}
+    south_west, north_east = bounds.get("_southWest"), bounds.get("_northEast")
+    if not south_west or not north_east or south_west.get("lat") is None:
+        return None
+    return (south_west["lat"], south_west["lng"], north_east["lat"], north_east["lng"])
 
 def zone_color(stress):
     if stress > 0.68: return "#FF0000"  # Red
@@ -72,84 +98,101 @@ if map_type == "Streamlit Map (Recommended)":
 
     # Add zones if enabled
     if show_zones:
-        for _, row in filtered_zones.iterrows():
-            zone_sensors = sensor_df[sensor_df["nearest_zone_name"] == row["nearest_zone_name"]]
-            if not zone_sensors.empty:
-                lat, lon = zone_sensors["latitude"].mean(), zone_sensors["longitude"].mean()
-                map_data.append({
-                    'lat': lat,
-                    'lon': lon,
-                    'name': f"Zone {row['nearest_zone_name']}",
-                    'stress': row['zone_stress'],
-                    'color': zone_color(row['zone_stress']),
-                    'size': 15
-                })
-                
-                # Add zone label as a separate point
-                if show_zone_labels:
-                    # Offset the label slightly to the right of the zone center
-                    map_data.append({
-                        'lat': lat,
-                        'lon': lon + 0.005,  # Small offset to the right
-                        'name': f"Zone {row['nearest_zone_name']}",
-                        'stress': row['zone_stress'],
-                        'color': '#000000',  # Black text
-                        'size': 0,  # No circle, just text
-                        'text': f"Zone {row['nearest_zone_name']}"  # Text to display
-                    })
-
-    # Add sensors if enabled
-    if show_sensors:
-        for _, row in sensor_df.iterrows():
+        for row in zone_points.itertuples(index=False):
             map_data.append({
-                'lat': row['latitude'],
-                'lon': row['longitude'],
-                'name': f"Sensor {row['sensor_id']}",
-                'score': row['anomaly_score'],
-                'color': score_color(row['anomaly_score']),
-                'size': 8
+                'lat': row.centroid_lat,
+                'lon': row.centroid_lon,
+                'name': f"Zone {row.nearest_zone_name}",
+                'stress': row.zone_stress,
+                'color': zone_color(row.zone_stress),
+                'size': 15
             })
 
+            # Add zone label as a separate point
+            if show_zone_labels:
+                # Offset the label slightly to the right of the zone center
+                map_data.append({
+                    'lat': row.centroid_lat,
+                    'lon': row.centroid_lon + 0.005,  # Small offset to the right
+                    'name': f"Zone {row.nearest_zone_name}",
+                    'stress': row.zone_stress,
+                    'color': '#000000',  # Black text
+                    'size': 0,  # No circle, just text
+                    'text': f"Zone {row.nearest_zone_name}"  # Text to display
+                })
+
     # Convert to DataFrame
     map_df = pd.DataFrame(map_data)
 
     # Display the Streamlit map
-    if not map_df.empty:
-        circle_df = map_df[map_df['size'] > 0]
-        label_df = map_df[(map_df['size'] == 0) & (map_df['text'].notnull())]
-        # Create a map with the data
-        # st.map(
-        #     map_df,
-        #     latitude='lat',
-        #     longitude='lon',
-        #     size='size',
-        #     color='color',
-        #     zoom=11,
-        #     use_container_width=True
-        # )
-        fig = px.scatter_mapbox(
-            circle_df,
-            lat="lat",
-            lon="lon",
-            color="color",
-            size="size",
-            hover_name="name",
-            zoom=11,
-            height=600
-        )
-        for _, row in label_df.iterrows():
-            fig.add_trace(
-                go.Scattermapbox(
-                    lat=[row['lat']],
-                    lon=[row['lon']],
-                    mode='text',
-                    text=[row['text']],
-                    textfont=dict(size=14, color="black", family="Arial Black"),
-                    textposition="top right",
-                    hoverinfo='skip'
-                )
+    if not map_df.empty or show_sensors:
+        if not map_df.empty:
+            circle_df = map_df[map_df['size'] > 0]
+            label_df = map_df[(map_df['size'] == 0) & (map_df['text'].notnull())]
+            # Create a map with the data
+            # st.map(
+            #     map_df,
+            #     latitude='lat',
+            #     longitude='lon',
+            #     size='size',
+            #     color='color',
+            #     zoom=11,
+            #     use_container_width=True
+            # )
+            fig = px.scatter_mapbox(
+                circle_df,
+                lat="lat",
+                lon="lon",
+                color="color",
+                size="size",
+                hover_name="name",
+                zoom=11,
+                height=600
             )
-        
+            for _, row in label_df.iterrows():
+                fig.add_trace(
+                    go.Scattermapbox(
+                        lat=[row['lat']],
+                        lon=[row['lon']],
+                        mode='text',
+                        text=[row['text']],
+                        textfont=dict(size=14, color="black", family="Arial Black"),
+                        textposition="top right",
+                        hoverinfo='skip'
+                    )
+                )
+        else:
+            fig = go.Figure()
+            fig.update_layout(height=600)
+
+        # Sensors aggregated at the grid level matching the zoom, or all sensors as a
+        # single WebGL trace (details are fetched for the points clicked)
+        if aggregate_sensors:
+            # Plotly does not report the view, so bound it from the center and zoom (Mapbox GL
+            # tiles are 512 pixels; the chart is 600 pixels high and at most ~1600 wide)
+            bounds = view_bounds(map_center[0], map_center[1], map_zoom, 1600, 600, tile_pixels=512)
+            level, cells = sensor_grid().view(map_zoom, bounds)
+            fig.add_trace(cell_trace(cells))
+            st.caption(f"Sensors aggregated into {len(cells)} cells (grid level {level})")
+        elif show_sensors:
+            fig.add_trace(sensor_scatter_trace(sensor_df))
+        fig.update_layout(
+            mapbox_style="open-street-map",
+            mapbox_center=dict(lat=map_center[0], lon=map_center[1]),
+            mapbox_zoom=map_zoom,
+            margin=dict(l=0, r=0, t=0, b=0)
+        )
+
+        event = st.plotly_chart(fig, use_container_width=True, on_select="rerun",
+                                selection_mode="points", key="risk_map")
+        if show_sensors and not aggregate_sensors:
+            sensor_trace = len(fig.data) - 1
+            selected = [point["point_index"] for point in event.selection.points
+                        if point.get("curve_number") == sensor_trace]
+            if selected:
+                st.markdown("**Selected sensors**")
+                st.dataframe(sensor_details(sensors(DETAIL_COLUMNS), selected))
+
         # Add a legend
         st.markdown("""
         **Legend:**
@@ -157,7 +200,7 @@ if map_type == "Streamlit Map (Recommended)":
             - 🔴 High Stress (≥ 0.6)
             - 🟠 Moderate Stress (≥ 0.4)
             - 🟢 Normal Stress (< 0.4)
-        - **Sensors**:
+        - **Sensors** (cells: mean score):
             - 🔴 High Anomaly (≥ 0.8)
             - 🟠 Medium Anomaly (≥ 0.5)
             - 🟡 Low Anomaly (≥ 0.2)
@@ -169,82 +212,75 @@ if map_type == "Streamlit Map (Recommended)":
 else:  # Folium Map (Original)
     # Create Folium map
     m = folium.Map(
-        location=[sensor_df["latitude"].mean(), sensor_df["longitude"].mean()], 
+        location=map_center,
         zoom_start=12, 
-        tiles='cartodbpositron'
+        tiles='cartodbpositron',
+        prefer_canvas=True
     )
 
     # --- Plot sensors ---
-    if show_sensors:
-        for _, row in sensor_df.iterrows():
-            folium.CircleMarker(
-                location=[row["latitude"], row["longitude"]],
-                radius=5,
-                color=score_color(row["anomaly_score"]),
-                fill=True,
-                fill_opacity=0.8,
-                weight=0.3,
-                popup=folium.Popup(f"""
-                    <b>ID:</b> {row['sensor_id']}<br>
-                    <b>Type:</b> {row.get('sensor_type', 'N/A')}<br>
-                    <b>Value:</b> {row['value']}<br>
-                    <b>Score:</b> {row['anomaly_score']:.2f}<br>
-                    <b>Status:</b> {row['status']}<br>
-                    <b>Zone:</b> {row['nearest_zone_name']}<br>
-                """, max_width=300)
-            ).add_to(m)
+    # Aggregated cells for the current view are sent as a separate layer, so zooming and
+    # panning only replace the cells; individual sensors are one clustered layer built in
+    # the browser, and details are looked up for the sensor clicked
+    sensor_cells = None
+    if aggregate_sensors:
+        view = st.session_state.get("risk_map_folium")
+        level, cells = sensor_grid().view((view or {}).get("zoom") or 12, folium_view_bounds(view))
+        sensor_cells = folium.FeatureGroup(name="Sensor cells")
+        cell_layer(cells).add_to(sensor_cells)
+        st.caption(f"Sensors in view aggregated into {len(cells)} cells (grid level {level})")
+    elif show_sensors:
+        SensorMarkerCluster(sensor_df, disableClusteringAtZoom=16).add_to(m)
 
     # --- Plot zones ---
     if show_zones:
-        for _, row in filtered_zones.iterrows():
-            zone_data = sensor_df[sensor_df["nearest_zone_name"] == row["nearest_zone_name"]]
-            if not zone_data.empty:
-                lat, lon = zone_data["latitude"].mean(), zone_data["longitude"].mean()
-                color = "red" if row["zone_stress"] > 0.6 else "orange" if row["zone_stress"] > 0.4 else "green"
+        for _, row in zone_points.iterrows():
+            lat, lon = row["centroid_lat"], row["centroid_lon"]
+            color = "red" if row["zone_stress"] > 0.6 else "orange" if row["zone_stress"] > 0.4 else "green"
+            
+            # Create the zone circle
+            folium.Circle(
+                location=[lat, lon],
+                radius=3000,
+                color=color,
+                fill=True,
+                fill_opacity=0.15,
+                popup=f"Zone {row['nearest_zone_name']} - Stress: {row['zone_stress']:.2f}"
+            ).add_to(m)
+            
+            # Add zone label outside the circle
+            # if show_zone_labels:
+            #     # Calculate offset to position label outside the circle
+            #     # Using a small offset to the northeast of the circle center
+            #     label_lat = lat + 0.01
+            #     label_lon = lon + 0.01
                 
-                # Create the zone circle
-                folium.Circle(
-                    location=[lat, lon],
-                    radius=3000,
-                    color=color,
-                    fill=True,
-                    fill_opacity=0.15,
-                    popup=f"Zone {row['nearest_zone_name']} - Stress: {row['zone_stress']:.2f}"
+            #     # Create a label with the zone name
+            #     folium.map.Marker(
+            #         [label_lat, label_lon],
+            #         icon=folium.DivIcon(
+            #             html=f'<div style="font-size: 12px; font-weight: bold; color: black; background-color: white; padding: 2px; border-radius: 3px; border: 1px solid {color};">Zone {row["nearest_zone_name"]}</div>'
+            #         )
+            #     ).add_to(m)
+            if show_zone_labels:
+                folium.map.Marker(
+                    [lat, lon],
+                    icon=folium.DivIcon(
+                        html=f'''
+                                    <div style="
+                                        font-size: 14px;
+                                        font-weight: 600;
+                                        color: black;
+                                        border-radius: 6px;
+                                        white-space: nowrap;
+                                        text-align: center;
+                                        transform: translate(-50%, -50%);
+                                    ">
+                                Zone {row["nearest_zone_name"]}
+                            </div>
+                        '''
+                    )
                 ).add_to(m)
-                
-                # Add zone label outside the circle
-                # if show_zone_labels:
-                #     # Calculate offset to position label outside the circle
-                #     # Using a small offset to the northeast of the circle center
-                #     label_lat = lat + 0.01
-                #     label_lon = lon + 0.01
-                    
-                #     # Create a label with the zone name
-                #     folium.map.Marker(
-                #         [label_lat, label_lon],
-                #         icon=folium.DivIcon(
-                #             html=f'<div style="font-size: 12px; font-weight: bold; color: black; background-color: white; padding: 2px; border-radius: 3px; border: 1px solid {color};">Zone {row["nearest_zone_name"]}</div>'
-                #         )
-                #     ).add_to(m)
-                if show_zone_labels:
-                    folium.map.Marker(
-                        [lat, lon],
-                        icon=folium.DivIcon(
-                            html=f'''
-                                        <div style="
-                                            font-size: 14px;
-                                            font-weight: 600;
-                                            color: black;
-                                            border-radius: 6px;
-                                            white-space: nowrap;
-                                            text-align: center;
-                                            transform: translate(-50%, -50%);
-                                        ">
-                                    Zone {row["nearest_zone_name"]}
-                                </div>
-                            '''
-                        )
-                    ).add_to(m)
 
     # --- Legend ---
     if show_legend:
@@ -260,7 +296,15 @@ else:  # Folium Map (Original)
         m.get_root().html.add_child(folium.Element(legend_html))
 
     # Display map
-    folium_static(m)
+    clicked = st_folium(m, height=500, use_container_width=True, key="risk_map_folium",
+                        feature_group_to_add=sensor_cells,
+                        returned_objects=["last_object_clicked", "zoom", "bounds"])
+    if show_sensors and not aggregate_sensors and clicked and clicked.get("last_object_clicked"):
+        point = clicked["last_object_clicked"]
+        position = nearest_sensor(sensor_df, point["lat"], point["lng"])
+        if position is not None:
+            st.markdown("**Selected sensor**")
+            st.dataframe(sensor_details(sensors(DETAIL_COLUMNS), [position]))
 
 # Zone stress summary
 st.subheader("Zone Stress Summary")
@@ -1,10 +1,12 @@
 # 5_🕵️_Tweet_Validator.py
 
 import streamlit as st
-import pandas as pd
-import json
-from agent import OllamaLLM, extract_tweet_and_sensor_payload
+from agent import get_llm, tweet_sensor_payload, ollama_status, OllamaError
+from tweet_rules import screen_tweets, verdict
+from tweet_validation import single_tweet_prompt, validate_tweets_batched
+from json_output import VERDICT_SCHEMA
 from constants import FOOTER
+from data_access import tweets, sensor_index
 # --- Page Config ---
 st.set_page_config(
     page_title="Tweet Validator | Crisis Command Copilot",
@@ -15,15 +17,40 @@ st.set_page_config(
 st.title("🕵️ Tweet Trust Validator")
 st.markdown("Analyze the **latest 5 tweets** from a selected zone using real-time sensors + AI.")
 
-# --- Load tweet data ---
-@st.cache_data
-def load_tweets():
-    return pd.read_csv("data/tweets_with_hdbscan_clusters.csv", parse_dates=["timestamp"])
+# Circuit breaker state of the Ollama server (calls fail fast while it is down)
+st.sidebar.caption(ollama_status()["label"])
 
-tweets_df = load_tweets()
+# --- Load tweet data ---
+tweets_df = tweets()
+
+# --- Verdict rendering ---
+def error_result(tweet_text, error):
+    return {
+        "tweet": tweet_text,
+        "confidence": "error",
+        "reason": f"Agent failed: {str(error)}"
+    }
+
+def render_verdict(slot, res):
+    confidence = res.get("confidence", "error").capitalize()
+    reason = res.get("reason", "No explanation available.")
+
+    # Badge color
+    badge = {
+        "High": "🟩",
+        "Medium": "🟨",
+        "Low": "🟥",
+        "Error": "⚪"
+    }.get(confidence, "⚪")
+
+    with slot.container():
+        st.markdown(f"**Trust Score:** {badge} {confidence}")
+        with st.expander("ℹ️ AI Explanation"):
+            st.write(reason)
 
 # --- Select Zone ---
 st.subheader("📍 Select a Zone")
+batch_mode = st.checkbox("Validate ambiguous tweets in one batched prompt", value=True)
 zone_options = sorted(tweets_df["hdbscan_cluster"].dropna().unique())
 selected_zone = st.selectbox("Choose HDBSCAN Cluster (Zone)", zone_options)
 
@@ -35,80 +62,72 @@ if top_tweets.empty:
     st.warning("No tweets available for this zone.")
 else:
     st.subheader("🤖 Agent Analysis of Latest 5 Tweets")
-    with st.spinner("Running AI agent on tweets..."):
+    with st.spinner("Screening tweets against sensor data..."):
 
-        llm = OllamaLLM(model="mistral:latest")
-        results = []
+        results = [None] * len(top_tweets)
+        evidence = {}
 
-        for _, row in top_tweets.iterrows():
-            timestamp = row["timestamp"].strftime("%Y-%m-%d %H:%M:%S")
-            cluster = row["hdbscan_cluster"]
+        # Settle mechanical cases with the rule engine; only ambiguous tweets go to the LLM
+        index = sensor_index()  # built once per process, shared by every rerun and session
+        screening = screen_tweets(top_tweets, index)
 
-            try:
-                tweet_payload, sensor_block = extract_tweet_and_sensor_payload(
-                    tweet_csv_path="data/tweets_with_hdbscan_clusters.csv",
-                    sensor_csv_path="data/sensor_with_clusters_fast.csv",
-                    cluster_number=cluster,
-                    target_timestamp=timestamp
-                )
-
-                # Build prompt
-                prompt = f"""
-You are the AI brain of a Smart City, responsible for validating tweets during a multi-disaster crisis using real-time sensor data.
-
-Evaluate the tweet and determine if it's fake or real using these rules:
-- Sensor `reading_value` indicates risk from 0–100
-- Use sensors within ±10min and 5km and keep the clusters in mind
-- Risk > 85 → High Confidence
-- Risk 70–85 → Medium
-- Else → Low
-
-Respond with JSON:
-{{
-  "tweet": "...",
-  "fake": true/false,
-  "confidence": "high/medium/low",
-  "reason": "..."
-}}
-
-TWEET DATA:
-{tweet_payload}
-
-SENSOR DATA:
-{sensor_block}
-""".strip()
-
-                response = llm(prompt)
-                result = json.loads(response)
-                results.append(result)
+        for i, (_, row) in enumerate(top_tweets.iterrows()):
+            if not screening.iloc[i]["needs_llm"]:
+                results[i] = verdict(screening.iloc[i])
+                continue
 
+            try:
+                evidence[i] = tweet_sensor_payload(row, index)
             except Exception as e:
-                results.append({
-                    "tweet": row["text"],
-                    "confidence": "error",
-                    "reason": f"Agent failed: {str(e)}"
-                })
+                results[i] = error_result(row["text"], e)
 
     # --- Display Results ---
-    for i, res in enumerate(results, 1):
-        tweet = res.get("tweet", "N/A")
-        confidence = res.get("confidence", "error").capitalize()
-        reason = res.get("reason", "No explanation available.")
-
-        # Badge color
-        badge = {
-            "High": "🟩",
-            "Medium": "🟨",
-            "Low": "🟥",
-            "Error": "⚪"
-        }.get(confidence, "⚪")
-
+    # One card per tweet; verdicts fill in as the agent streams them
+    slots = []
+    for i, (_, row) in enumerate(top_tweets.iterrows(), 1):
         with st.container():
             st.markdown(f"### Tweet #{i}")
-            st.markdown(f"> {tweet}")
-            st.markdown(f"**Trust Score:** {badge} {confidence}")
-            with st.expander("ℹ️ AI Explanation"):
-                st.write(reason)
-
+            st.markdown(f"> {row['text']}")
+            slots.append(st.empty())
             st.markdown("---")
+
+    for i, res in enumerate(results):
+        if res is not None:
+            render_verdict(slots[i], res)
+
+    # Validate the ambiguous tweets with the LLM
+    if evidence:
+        try:
+            llm = get_llm("mistral:latest")
+        except OllamaError as e:
+            st.error(str(e))
+            st.stop()
+
+    if batch_mode and len(evidence) > 1:
+        # Several tweets per prompt; only missing or malformed items are asked again
+        items = [{"id": i, "tweet_payload": payload, "sensor_block": block}
+                 for i, (payload, block) in evidence.items()]
+        with st.spinner("Running AI agent on tweets..."):
+            verdicts = validate_tweets_batched(llm, items)
+        for i, res in verdicts.items():
+            render_verdict(slots[i], res)
+    elif evidence:
+        # One prompt per tweet, streamed concurrently and rendered as it arrives
+        indices = list(evidence)
+        prompts = [single_tweet_prompt(payload, block) for payload, block in evidence.values()]
+        partial = {i: "" for i in indices}
+        for k, kind, value in llm.stream_many(prompts, format="json"):
+            i = indices[k]
+            if kind == "token":
+                partial[i] += value
+                slots[i].code(partial[i], language="json")
+            elif kind == "done":
+                # Formatting slips are repaired locally; only invalid verdicts are re-asked
+                try:
+                    render_verdict(slots[i], llm.resolve_json(prompts[k], value.text, VERDICT_SCHEMA))
+                except Exception as e:
+                    render_verdict(slots[i], error_result(top_tweets.iloc[i]["text"], e))
+            else:
+                render_verdict(slots[i], error_result(top_tweets.iloc[i]["text"], value))
+
 st.markdown(FOOTER)
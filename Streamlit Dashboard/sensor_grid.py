@@ -0,0 +1,233 @@
+# sensor_grid.py
+#
+# Multi-resolution (quadtree) aggregation of sensors for zoom-aware maps.
+#
+# Cells are Web Mercator map tiles: level L splits the world into 2^L x 2^L
+# cells, so a level-L cell covers exactly one map tile at zoom L and 1/8 of a
+# tile (32 pixels) at zoom L - 3. Sensors are binned once at the finest level;
+# each coarser level merges 2 x 2 cells of the level below. Every cell keeps
+# its sensor count, anomaly score mean and max, faulty share and mean position,
+# so a map can draw the level matching its zoom: a few thousand cells whatever
+# the number of sensors.
+
+import math
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple
+
+MAX_MERCATOR_LATITUDE = 85.05112878
+DEFAULT_MAX_LEVEL = 17
+DEFAULT_CELL_PIXELS = 32
+DEFAULT_MAX_CELLS = 5000
+TILE_PIXELS = 256
+
+# Columns of the sensor table the grid is built from
+SOURCE_COLUMNS = ["latitude", "longitude", "anomaly_score", "status"]
+
+# (south, west, north, east) in degrees
+Bounds = Tuple[float, float, float, float]
+
+
+def mercator(latitude, longitude) -> Tuple[np.ndarray, np.ndarray]:
+    """Web Mercator x, y in [0, 1] (x eastwards from -180°, y southwards from the north edge)"""
+    lat = np.radians(np.clip(np.asarray(latitude, dtype=float), -MAX_MERCATOR_LATITUDE, MAX_MERCATOR_LATITUDE))
+    x = (np.asarray(longitude, dtype=float) + 180.0) / 360.0
+    y = (1.0 - np.arcsinh(np.tan(lat)) / math.pi) / 2.0
+    return x, y
+
+
+def mercator_latitude(y) -> np.ndarray:
+    """Latitude of a Web Mercator y"""
+    return np.degrees(np.arctan(np.sinh(math.pi * (1.0 - 2.0 * np.asarray(y, dtype=float)))))
+
+
+def view_bounds(latitude: float, longitude: float, zoom: float, width: int, height: int,
+                tile_pixels: int = TILE_PIXELS) -> Bounds:
+    """
+    (south, west, north, east) visible on a map of width x height pixels
+
+    Args:
+        latitude / longitude: Map center
+        zoom: Map zoom
+        width / height: Map size in pixels (an overestimate only adds cells)
+        tile_pixels: Tile size the zoom refers to (256 for Leaflet, 512 for Mapbox GL / Plotly)
+
+    Returns:
+        Bounds; longitudes are not wrapped, so west may be below -180 or east above 180
+    """
+    world = tile_pixels * 2.0 ** zoom
+    x, y = mercator(latitude, longitude)
+    half_width, half_height = width / 2 / world, height / 2 / world
+    south, north = mercator_latitude(np.clip([y + half_height, y - half_height], 0.0, 1.0))
+    return (float(south), float((x - half_width) * 360.0 - 180.0),
+            float(north), float((x + half_width) * 360.0 - 180.0))
+
+
+class SensorGrid:
+    """
+    Quadtree of per-cell sensor aggregates, from level 0 (the world) to max_level
+
+    Build it once per sensor table (see data_access.sensor_grid) and query it
+    on every map render.
+    """
+
+    def __init__(self, sensors: pd.DataFrame, max_level: int = DEFAULT_MAX_LEVEL):
+        """
+        Bin the sensors and aggregate every level
+
+        Args:
+            sensors: Sensors with latitude, longitude, anomaly_score and
+                (optionally) status columns; rows without coordinates are skipped
+            max_level: Finest level (level 17 cells are ~300 m wide at 40°N)
+        """
+        self.max_level = max_level
+        sensors = sensors.dropna(subset=["latitude", "longitude"])
+        x, y = mercator(sensors["latitude"].to_numpy(float), sensors["longitude"].to_numpy(float))
+        scale = 1 << max_level
+        scores = sensors["anomaly_score"].to_numpy(float)
+        scored = ~np.isnan(scores)
+        if "status" in sensors.columns:
+            faulty = (sensors["status"].astype(str).str.lower() == "faulty").to_numpy()
+        else:
+            faulty = np.zeros(len(sensors), dtype=bool)
+
+        finest = pd.DataFrame({
+            "cell_x": np.minimum((x * scale).astype(np.int64), scale - 1),
+            "cell_y": np.minimum((y * scale).astype(np.int64), scale - 1),
+            "count": np.ones(len(sensors), dtype=np.int64),
+            "scored": scored.astype(np.int64),
+            "anomaly_sum": np.where(scored, scores, 0.0),
+            "anomaly_max": scores,
+            "faulty": faulty.astype(np.int64),
+            "latitude_sum": sensors["latitude"].to_numpy(float),
+            "longitude_sum": sensors["longitude"].to_numpy(float)
+        })
+
+        # Sums add up and maxima combine, so each level is built from the (much smaller) one below
+        self._levels: Dict[int, pd.DataFrame] = {}
+        cells = finest
+        for level in range(max_level, -1, -1):
+            cells = self._merge(cells)
+            self._levels[level] = cells
+            cells = cells.assign(cell_x=cells["cell_x"] // 2, cell_y=cells["cell_y"] // 2)
+
+    @staticmethod
+    def _merge(cells: pd.DataFrame) -> pd.DataFrame:
+        return cells.groupby(["cell_x", "cell_y"], sort=True).agg(
+            count=("count", "sum"),
+            scored=("scored", "sum"),
+            anomaly_sum=("anomaly_sum", "sum"),
+            anomaly_max=("anomaly_max", "max"),
+            faulty=("faulty", "sum"),
+            latitude_sum=("latitude_sum", "sum"),
+            longitude_sum=("longitude_sum", "sum")
+        ).reset_index()
+
+    def level_for_zoom(self, zoom: float, cell_pixels: int = DEFAULT_CELL_PIXELS) -> int:
+        """Level whose cells are about cell_pixels wide on a map at this zoom"""
+        level = round(zoom + math.log2(TILE_PIXELS / cell_pixels))
+        return int(min(max(level, 0), self.max_level))
+
+    def cell_count(self, level: int, bounds: Optional[Bounds] = None) -> int:
+        """Number of non-empty cells of a level (within bounds, if given)"""
+        return int(self._in_bounds(level, bounds).sum())
+
+    def cells(self, level: int, bounds: Optional[Bounds] = None) -> pd.DataFrame:
+        """
+        Non-empty cells of a level
+
+        Args:
+            level: Level, 0 to max_level
+            bounds: Only cells intersecting (south, west, north, east), if given
+
+        Returns:
+            DataFrame with one row per cell and columns:
+                - level / cell_x / cell_y: Cell (map tile) coordinates
+                - count: Number of sensors
+                - anomaly_mean / anomaly_max: Anomaly score statistics (NaN if no sensor is scored)
+                - faulty_share: Share of sensors with status "faulty"
+                - latitude / longitude: Mean sensor position
+                - south / west / north / east: Cell bounds in degrees
+        """
+        raw = self._levels[level]
+        raw = raw[self._in_bounds(level, bounds)]
+        scale = 1 << level
+        count = raw["count"].to_numpy(float)
+        scored = raw["scored"].to_numpy(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            anomaly_mean = np.where(scored > 0, raw["anomaly_sum"].to_numpy() / scored, np.nan)
+        return pd.DataFrame({
+            "level": level,
+            "cell_x": raw["cell_x"].to_numpy(),
+            "cell_y": raw["cell_y"].to_numpy(),
+            "count": raw["count"].to_numpy(),
+            "anomaly_mean": anomaly_mean,
+            "anomaly_max": raw["anomaly_max"].to_numpy(),
+            "faulty_share": raw["faulty"].to_numpy() / count,
+            "latitude": raw["latitude_sum"].to_numpy() / count,
+            "longitude": raw["longitude_sum"].to_numpy() / count,
+            "south": mercator_latitude((raw["cell_y"].to_numpy() + 1) / scale),
+            "west": raw["cell_x"].to_numpy() / scale * 360.0 - 180.0,
+            "north": mercator_latitude(raw["cell_y"].to_numpy() / scale),
+            "east": (raw["cell_x"].to_numpy() + 1) / scale * 360.0 - 180.0
+        })
+
+    def view(self, zoom: float, bounds: Optional[Bounds] = None, max_cells: int = DEFAULT_MAX_CELLS,
+             cell_pixels: int = DEFAULT_CELL_PIXELS) -> Tuple[int, pd.DataFrame]:
+        """
+        Cells to draw for a map view
+
+        The level matching the zoom is used, or the finest coarser level with
+        at most max_cells cells in view (e.g. when the bounds are unknown).
+
+        Args:
+            zoom: Map zoom
+            bounds: Visible (south, west, north, east), or None for all cells
+            max_cells: Upper bound on the cells returned
+            cell_pixels: Target cell width on screen
+
+        Returns:
+            Tuple (level, cells) with cells as returned by cells()
+        """
+        level = self.level_for_zoom(zoom, cell_pixels)
+        while level > 0 and self.cell_count(level, bounds) > max_cells:
+            level -= 1
+        return level, self.cells(level, bounds)
+
+    def _in_bounds(self, level: int, bounds: Optional[Bounds]) -> np.ndarray:
+        raw = self._levels[level]
+        if bounds is None:
+            return np.ones(len(raw), dtype=bool)
+        south, west, north, east = bounds
+        scale = 1 << level
+        cell_x, cell_y = raw["cell_x"].to_numpy(), raw["cell_y"].to_numpy()
+        _, (y0, y1) = mercator([north, south], [0.0, 0.0])
+        y0, y1 = np.floor(np.array([y0, y1]) * scale)
+        in_bounds = (cell_y >= y0) & (cell_y <= y1)
+        if east - west >= 360.0:
+            return in_bounds
+
+        # Wrap west into [-180, 180) and east into (-180, 180]; a view crossing the
+        # antimeridian then has west > east and covers two ranges of columns
+        west = (west + 180.0) % 360.0 - 180.0
+        east = 180.0 - (180.0 - east) % 360.0
+        (x0, x1), _ = mercator([0.0, 0.0], [west, east])
+        x0, x1 = np.floor(np.array([x0, x1]) * scale)
+        if x0 <= x1:
+            return in_bounds & (cell_x >= x0) & (cell_x <= x1)
+        return in_bounds & ((cell_x >= x0) | (cell_x <= x1))
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+    from data_store import load_table
+
+    sensors = load_table("sensor_scores", columns=SOURCE_COLUMNS)
+    start = time.perf_counter()
+    grid = SensorGrid(sensors)
+    print(f"✅ Built grid over {len(sensors)} sensors in {time.perf_counter() - start:.2f} s")
+    for zoom in (8, 11, 14):
+        level, cells = grid.view(zoom)
+        print(f"Zoom {zoom}: level {level}, {len(cells)} cells")
+    print(cells.head())
@@ -0,0 +1,181 @@
+# sensor_index.py
+#
+# In-memory spatiotemporal index of sensor readings.
+#
+# Readings are bucketed in a 3D grid over the unit sphere (cells of cell_km)
+# and sorted by time within each cell. A query "readings within Δt and radius
+# of (lat, lon, ts)" visits the few cells around the point and binary-searches
+# each cell's time range, then filters by exact haversine distance. Queries
+# for a whole batch of points run as one set of array operations.
+
+import math
+import numpy as np
+import pandas as pd
+from typing import Optional, List, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+_CELL_BITS = 21
+_CELL_OFFSET = 1 << (_CELL_BITS - 1)
+
+
+def _unit_vectors(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def _pack_cells(cells: np.ndarray) -> np.ndarray:
+    cells = cells + _CELL_OFFSET
+    return (cells[:, 0] << (2 * _CELL_BITS)) | (cells[:, 1] << _CELL_BITS) | cells[:, 2]
+
+
+def _to_seconds(timestamps) -> np.ndarray:
+    """Timestamps (datetime64 arrays, Timestamps or strings) as int64 seconds"""
+    values = np.atleast_1d(np.asarray(timestamps))
+    if values.dtype.kind != "M":
+        values = pd.to_datetime(values.ravel()).to_numpy()
+    return values.astype("datetime64[s]").astype(np.int64)
+
+
+def _neighbour_offsets(reach: int) -> np.ndarray:
+    steps = np.arange(-reach, reach + 1)
+    return np.array(np.meshgrid(steps, steps, steps, indexing="ij")).reshape(3, -1).T
+
+
+def _chord(distance_km: float) -> float:
+    """Straight-line distance on the unit sphere for a great-circle distance"""
+    return 2.0 * math.sin(min(distance_km / (2.0 * EARTH_RADIUS_KM), math.pi / 2))
+
+
+class SensorIndex:
+    """
+    Spatiotemporal index over a sensor readings table
+
+    Build it once (e.g. with st.cache_resource) and query it for every tweet.
+    """
+
+    def __init__(self, sensors: pd.DataFrame, cell_km: float = 5.0, time_column: str = "timestamp"):
+        """
+        Build the index
+
+        Args:
+            sensors: Readings with timestamp, latitude and longitude columns (other
+                columns are kept and returned with the matches)
+            cell_km: Grid cell size; queries with a radius up to cell_km visit 27 cells
+            time_column: Column with reading timestamps
+        """
+        self.sensors = sensors.reset_index(drop=True)
+        self.cell_km = cell_km
+        self._cell_chord = _chord(cell_km)
+
+        seconds = pd.to_datetime(self.sensors[time_column]).to_numpy("datetime64[s]").astype(np.int64)
+        xyz = _unit_vectors(self.sensors["latitude"].to_numpy(float), self.sensors["longitude"].to_numpy(float))
+        cells = _pack_cells(np.floor(xyz / self._cell_chord).astype(np.int64))
+
+        # Sort by (cell, time): each cell's readings are one time-sorted run
+        self._t0 = int(seconds.min()) if len(seconds) else 0
+        self._span = int(seconds.max()) - self._t0 + 1 if len(seconds) else 1
+        self._cells, cell_rank = np.unique(cells, return_inverse=True)
+        composite = cell_rank.astype(np.int64) * self._span + (seconds - self._t0)
+        self._order = np.argsort(composite, kind="stable")
+        self._composite = composite[self._order]
+        self._xyz = xyz
+        self._offsets = {}
+
+    def __len__(self) -> int:
+        return len(self.sensors)
+
+    def query_many(self,
+                   latitudes: np.ndarray,
+                   longitudes: np.ndarray,
+                   timestamps,
+                   window_minutes: float = 10,
+                   radius_km: float = 5) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Find the readings near each of a batch of query points
+
+        Args:
+            latitudes: Query latitudes
+            longitudes: Query longitudes
+            timestamps: Query times (anything pd.to_datetime accepts)
+            window_minutes: Maximum time difference (either direction)
+            radius_km: Maximum great-circle distance
+
+        Returns:
+            Tuple (query indices, sensor row positions, distances in km), one
+            entry per match, sorted by query index
+        """
+        latitudes = np.atleast_1d(np.asarray(latitudes, dtype=float))
+        longitudes = np.atleast_1d(np.asarray(longitudes, dtype=float))
+        seconds = _to_seconds(timestamps)
+        empty = np.empty(0, dtype=np.int64)
+        if len(self) == 0 or len(seconds) == 0:
+            return empty, empty, np.empty(0)
+
+        window = int(round(window_minutes * 60))
+        max_chord = _chord(radius_km)
+        xyz = _unit_vectors(latitudes, longitudes)
+        reach = int(math.ceil(max_chord / self._cell_chord))
+        offsets = self._offsets.get(reach)
+        if offsets is None:
+            offsets = self._offsets.setdefault(reach, _neighbour_offsets(reach))
+
+        # Candidate (query, cell) pairs, restricted to cells that hold readings
+        base = np.floor(xyz / self._cell_chord).astype(np.int64)
+        cells = _pack_cells((base[:, None, :] + offsets[None, :, :]).reshape(-1, 3))
+        query = np.repeat(np.arange(len(seconds)), len(offsets))
+        position = np.minimum(np.searchsorted(self._cells, cells), len(self._cells) - 1)
+        exists = self._cells[position] == cells
+        query, rank = query[exists], position[exists].astype(np.int64)
+
+        # Time range of each candidate cell, by binary search on (cell, time)
+        relative = seconds[query] - self._t0
+        lo = np.searchsorted(self._composite, rank * self._span + np.maximum(relative - window, 0), side="left")
+        hi = np.searchsorted(self._composite, rank * self._span + np.minimum(relative + window, self._span - 1),
+                             side="right")
+        hi = np.maximum(hi, lo)
+        lengths = hi - lo
+        repeat = np.repeat(np.arange(len(lo)), lengths)
+        within = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        rows = self._order[lo[repeat] + within]
+        query = query[repeat]
+
+        # Exact distance filter (chord length is monotonic in great-circle distance)
+        delta = self._xyz[rows] - xyz[query]
+        chord = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+        close = chord <= max_chord
+        query, rows, chord = query[close], rows[close], chord[close]
+        distance = 2.0 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2.0, 1.0))
+
+        order = np.argsort(query, kind="stable")
+        return query[order], rows[order], distance[order]
+
+    def query(self,
+              latitude: float,
+              longitude: float,
+              timestamp,
+              window_minutes: float = 10,
+              radius_km: float = 5,
+              sensor_types: Optional[List[str]] = None,
+              exclude_faulty: bool = True) -> pd.DataFrame:
+        """
+        Readings within window_minutes and radius_km of one point
+
+        Args:
+            latitude: Query latitude
+            longitude: Query longitude
+            timestamp: Query time
+            window_minutes: Maximum time difference (either direction)
+            radius_km: Maximum great-circle distance
+            sensor_types: Keep only these sensor types (optional)
+            exclude_faulty: Drop readings whose status is "faulty"
+
+        Returns:
+            Matching rows of the sensors table, with distance_km added, closest first
+        """
+        _, rows, distance = self.query_many([latitude], [longitude], [timestamp], window_minutes, radius_km)
+        matches = self.sensors.iloc[rows].assign(distance_km=distance)
+        if sensor_types is not None:
+            matches = matches[matches["sensor_type"].str.lower().isin([t.lower() for t in sensor_types])]
+        if exclude_faulty and "status" in matches.columns:
+            matches = matches[matches["status"].astype(str).str.lower() != "faulty"]
+        return matches.sort_values("distance_km")
@@ -0,0 +1,237 @@
+# test_agent.py
+#
+# Tests for the Ollama client's failure handling: error classification, the
+# circuit breaker, stalled streams and JSON answer repair. A local HTTP server
+# stands in for Ollama.
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+import urllib3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agent
+from agent import (OllamaLLM, OllamaOutputError, OllamaTimeoutError, OllamaUnavailableError,
+                   _CircuitBreaker, _is_read_timeout, _is_server_failure)
+from json_output import VERDICT_SCHEMA
+
+MODEL = "llama3"
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """Minimal /api/tags and /api/generate; behaviour is set on the server object"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.server.tags_status != 200:
+            return self._send(self.server.tags_status)
+        self._send(200, json.dumps({"models": [{"name": MODEL}]}).encode())
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.generate_calls += 1
+        mode = self.server.generate_mode
+        if mode == "error":
+            return self._send(500)
+        if not payload.get("stream"):
+            return self._send(200, json.dumps({"response": "ok", "done": True}).encode())
+
+        # Streamed answer, chunked like Ollama's; "stall" stops sending after two chunks
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for word in ("hello", " world"):
+            self._send_chunk({"response": word, "done": False})
+        if mode == "stall":
+            time.sleep(2.0)
+            return
+        self._send_chunk({"response": "", "done": True, "eval_count": 2})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_chunk(self, message):
+        line = (json.dumps(message) + "\n").encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+@pytest.fixture
+def server(monkeypatch):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    httpd.daemon_threads = True
+    httpd.tags_status = 200
+    httpd.generate_mode = "ok"
+    httpd.generate_calls = 0
+    httpd.base_url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    # Fresh breakers and health checks for every test
+    monkeypatch.setattr(agent, "_breakers", {})
+    agent._health.invalidate()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(response=response)
+
+
+def test_error_classification():
+    body_timeout = requests.exceptions.ConnectionError(
+        urllib3.exceptions.ReadTimeoutError(None, "http://localhost:11434", "Read timed out.")
+    )
+    assert _is_read_timeout(body_timeout)
+    assert not _is_server_failure(body_timeout)
+    assert _is_read_timeout(requests.exceptions.ReadTimeout())
+    assert not _is_server_failure(requests.exceptions.ReadTimeout())
+
+    assert _is_server_failure(requests.exceptions.ConnectionError("refused"))
+    assert _is_server_failure(requests.exceptions.ConnectTimeout())
+    assert _is_server_failure(requests.exceptions.ChunkedEncodingError())
+    assert _is_server_failure(http_error(503))
+    assert not _is_server_failure(http_error(404))
+    assert not _is_server_failure(requests.exceptions.InvalidJSONError())
+    assert not _is_read_timeout(requests.exceptions.ConnectionError("refused"))
+
+
+def test_breaker_opens_probes_and_closes(server):
+    breaker = _CircuitBreaker(server.base_url, failure_threshold=2, probe_interval=0.05)
+    server.tags_status = 503
+
+    breaker.record_failure(ConnectionError("down"))
+    assert breaker.state == "closed"
+    breaker.check()
+    breaker.record_failure(ConnectionError("down"))
+    assert breaker.state == "open"
+    with pytest.raises(OllamaUnavailableError):
+        breaker.check()
+
+    # Probes keep failing while the server is down
+    time.sleep(0.2)
+    assert breaker.state == "open"
+    server.tags_status = 200
+    wait_for(lambda: breaker.state == "half_open")
+    breaker.check()
+
+    # A failure in half_open reopens at once; a success closes
+    breaker.record_failure(ConnectionError("down again"))
+    assert breaker.state == "open"
+    wait_for(lambda: breaker.state == "half_open")
+    breaker.record_success()
+    assert breaker.status()["state"] == "closed"
+    assert breaker.status()["failures"] == 0
+
+
+def test_server_errors_open_the_breaker(server):
+    llm = OllamaLLM(MODEL, base_url=server.base_url, max_retries=5, retry_delay=0, cache=False)
+    server.generate_mode = "error"
+
+    with pytest.raises(OllamaUnavailableError):
+        llm("hello")
+    assert server.generate_calls == 3
+    assert agent.ollama_status(server.base_url)["state"] == "open"
+
+    # Further calls fail fast without reaching the server
+    with pytest.raises(OllamaUnavailableError):
+        llm("hello")
+    assert server.generate_calls == 3
+
+
+def test_streamed_answer(server):
+    llm = OllamaLLM(MODEL, base_url=server.base_url, stream=True, cache=False)
+    assert llm("hello") == "hello world"
+    assert llm.call_metrics[-1]["tokens"] == 2
+
+
+def test_stalled_stream_is_a_timeout(server):
+    llm = OllamaLLM(MODEL, base_url=server.base_url, stream=True, read_timeout=0.3,
+                    retry_delay=0, cache=False)
+    server.generate_mode = "stall"
+
+    chunks = []
+    with pytest.raises(OllamaTimeoutError):
+        for chunk in llm.generate_stream("hello"):
+            chunks.append(chunk)
+    assert chunks == ["hello", " world"]
+
+    # Not retried after chunks were consumed, and counted once against the breaker
+    assert server.generate_calls == 1
+    status = agent.ollama_status(server.base_url)
+    assert (status["state"], status["failures"]) == ("closed", 1)
+
+
+class ScriptedLLM(OllamaLLM):
+    """Answers re-asks from a list instead of calling the server"""
+
+    def __init__(self, answers):
+        super().__init__(MODEL, cache=False)
+        self.answers = list(answers)
+        self.prompts = []
+
+    def __call__(self, prompt, use_cache=None, format=None):
+        self.prompts.append(prompt)
+        return self.answers.pop(0)
+
+
+@pytest.fixture
+def scripted(monkeypatch):
+    monkeypatch.setattr(agent._health, "models", lambda base_url: [MODEL])
+    return ScriptedLLM
+
+
+def test_resolve_json_repairs_locally(scripted):
+    llm = scripted([])
+    assert llm.resolve_json("p", '{"fake": false, "confidence": "high", "reason": "ok"}',
+                            VERDICT_SCHEMA) == {"fake": False, "confidence": "high", "reason": "ok"}
+
+    answer = 'Sure:\n```json\n{"fake": "True", "confidence": "Medium", "reason": "no sensor",}\n```'
+    assert llm.resolve_json("p", answer, VERDICT_SCHEMA) == \
+        {"fake": True, "confidence": "medium", "reason": "no sensor"}
+    assert llm.prompts == []
+    assert llm.json_stats == {"valid": 1, "repaired": 1, "reasked": 0, "failed": 0}
+
+
+def test_resolve_json_reasks_with_errors(scripted):
+    llm = scripted(['{"fake": false, "confidence": "high", "reason": "fixed"}'])
+    value = llm.resolve_json("classify", '{"fake": false, "confidence": "certain"}', VERDICT_SCHEMA)
+
+    assert value["reason"] == "fixed"
+    assert len(llm.prompts) == 1
+    assert "classify" in llm.prompts[0] and "confidence" in llm.prompts[0]
+    assert llm.json_stats["reasked"] == 1
+
+
+def test_resolve_json_gives_up(scripted):
+    llm = scripted(["still not JSON", "nope"])
+    with pytest.raises(OllamaOutputError) as raised:
+        llm.resolve_json("classify", "no JSON here", VERDICT_SCHEMA, max_reasks=2)
+    assert raised.value.text == "nope"
+    assert raised.value.errors
+    assert llm.json_stats["failed"] == 1
@@ -0,0 +1,65 @@
+# test_cascade_simulator.py
+#
+# Tests for the Monte Carlo cascade simulator: reproducibility and agreement
+# with the predictor's exact marginals.
+
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_cascade import generate_synthetic_network
+from cascade_simulator import CascadeSimulator
+from disaster import DisasterCascadePredictor
+
+
+@pytest.fixture
+def simulator(tmp_path):
+    json_path = str(tmp_path / "network.json")
+    with open(json_path, "w") as f:
+        json.dump(generate_synthetic_network(5, density=0.6, max_second_order_rows=15, seed=4), f)
+    return CascadeSimulator(DisasterCascadePredictor(json_path, use_artifact=False))
+
+
+def assert_same_results(result, expected):
+    assert result.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, dict):
+            assert_same_results(result[key], value)
+        elif isinstance(value, np.ndarray):
+            np.testing.assert_array_equal(result[key], value)
+        else:
+            assert result[key] == value
+
+
+def test_fixed_seed_is_reproducible(simulator):
+    initial = simulator.disaster_types[0]
+    kwargs = dict(horizon=3, n_trajectories=20_000, shard_size=3_000, seed=11)
+    first = simulator.simulate(initial, "high", **kwargs)
+
+    assert_same_results(simulator.simulate(initial, "high", **kwargs), first)
+    assert_same_results(simulator.simulate(initial, "high", n_workers=2, **kwargs), first)
+    other = simulator.simulate(initial, "high", **dict(kwargs, seed=12))
+    assert not np.array_equal(other["expected_counts"], first["expected_counts"])
+
+
+def test_expected_counts_match_marginals(simulator):
+    initial = simulator.disaster_types[1]
+    result = simulator.simulate(initial, "medium", horizon=3, n_trajectories=200_000, seed=0)
+    exact = simulator.predictor.predict_marginals(initial, "medium", horizon=3)
+
+    assert result["n_trajectories"] == 200_000
+    tolerance = 5 * np.maximum(result["standard_error"]["expected_counts"], 1e-3)
+    assert np.all(np.abs(result["expected_counts"] - exact["expected_counts"]) <= tolerance)
+
+
+def test_stops_early_at_target_standard_error(simulator):
+    initial = simulator.disaster_types[0]
+    result = simulator.simulate(initial, "all", n_trajectories=1_000_000, shard_size=10_000,
+                                target_standard_error=0.01)
+    assert result["converged"] is True
+    assert result["n_trajectories"] < 1_000_000
@@ -0,0 +1,131 @@
+# test_cpd_fitter.py
+#
+# Tests for the streaming CPD fitter: chunked fitting against a single pass and
+# against brute-force pair counting, and fitter state round-trips.
+
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cpd_fitter import EARTH_RADIUS_KM, CascadeCPDFitter
+
+TYPES = ["fire", "flood", "earthquake", "landslide"]
+SEVERITIES = ["low", "medium", "high"]
+
+
+@pytest.fixture
+def events():
+    rng = np.random.default_rng(7)
+    n = 400
+    seconds = np.sort(rng.choice(30 * 24 * 3600, size=n, replace=False))
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(seconds, unit="s"),
+        "latitude": 40.0 + rng.uniform(0, 1.0, n),
+        "longitude": -120.0 + rng.uniform(0, 1.0, n),
+        "disaster_type": rng.choice(TYPES, n),
+        "severity": rng.choice(SEVERITIES + ["extreme"], n)
+    })
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h))
+
+
+def brute_force_counts(events, window_hours, distance_km):
+    seconds = events["timestamp"].to_numpy("datetime64[s]").astype(np.int64)
+    lat, lon = events["latitude"].to_numpy(), events["longitude"].to_numpy()
+    types, severities = events["disaster_type"].to_numpy(), events["severity"].to_numpy()
+    window = window_hours * 3600
+
+    predecessors = {}
+    for b in range(len(events)):
+        close = haversine_km(lat, lon, lat[b], lon[b]) <= distance_km
+        timely = (seconds >= seconds[b] - window) & (seconds < seconds[b])
+        predecessors[b] = np.flatnonzero(close & timely)
+
+    first, second = Counter(), Counter()
+    for b, pairs in predecessors.items():
+        for a in pairs:
+            first[types[a], severities[a], types[b]] += 1
+            first[types[a], "all", types[b]] += 1
+            for p in predecessors[a]:
+                second[types[p], types[a], types[b]] += 1
+    return first, second
+
+
+def normalize(counts, row_of):
+    totals = Counter()
+    for key, count in counts.items():
+        totals[row_of(key)] += count
+    return {key: count / totals[row_of(key)] for key, count in counts.items()}
+
+
+def flatten(cpd, depth):
+    if depth == 0:
+        return {(): cpd}
+    return {(key,) + rest: value for key, nested in cpd.items()
+            for rest, value in flatten(nested, depth - 1).items()}
+
+
+def test_chunked_fit_matches_single_pass(events):
+    single = CascadeCPDFitter(time_window_hours=24, distance_threshold_km=30).partial_fit(events).to_network()
+
+    chunked = CascadeCPDFitter(time_window_hours=24, distance_threshold_km=30)
+    for start in range(0, len(events), 37):
+        chunked.partial_fit(events.iloc[start:start + 37])
+    network = chunked.to_network()
+
+    assert chunked.n_events == len(events)
+    assert network["metadata"]["disaster_types"] == single["metadata"]["disaster_types"]
+    for name, depth in (("first_order_cpd", 3), ("second_order_cpd", 3)):
+        assert flatten(network[name], depth) == pytest.approx(flatten(single[name], depth))
+
+
+def test_fit_matches_brute_force_counts(events):
+    fitter = CascadeCPDFitter(time_window_hours=24, distance_threshold_km=30, severity_categories=SEVERITIES)
+    network = fitter.partial_fit(events).to_network()
+    first, second = brute_force_counts(events, 24, 30)
+
+    # Unrecognised severities only count towards "all"
+    expected_first = normalize({k: v for k, v in first.items() if k[1] != "extreme"}, lambda k: k[:2])
+    expected_second = normalize(second, lambda k: k[:2])
+
+    actual_first = flatten(network["first_order_cpd"], 3)
+    actual_second = flatten(network["second_order_cpd"], 3)
+    assert actual_first == pytest.approx(expected_first)
+    assert actual_second == pytest.approx(expected_second)
+
+
+def test_out_of_order_chunk_is_rejected(events):
+    fitter = CascadeCPDFitter().partial_fit(events.iloc[200:])
+    with pytest.raises(ValueError):
+        fitter.partial_fit(events.iloc[:200])
+
+
+def test_state_round_trip(tmp_path, events):
+    fitter = CascadeCPDFitter(time_window_hours=24, distance_threshold_km=30).partial_fit(events.iloc[:250])
+    state_path = str(tmp_path / "fitter_state.npz")
+    fitter.save_state(state_path)
+
+    restored = CascadeCPDFitter.load_state(state_path).partial_fit(events.iloc[250:])
+    fitter.partial_fit(events.iloc[250:])
+    assert restored.to_network() == fitter.to_network()
+
+
+def test_fit_csv_matches_partial_fit(tmp_path, events):
+    csv_path = str(tmp_path / "disaster_events.csv")
+    events.to_csv(csv_path, index=False)
+
+    expected = CascadeCPDFitter().partial_fit(events).to_network()
+    network = CascadeCPDFitter().fit_csv(csv_path, chunksize=50).to_network()
+    assert network["metadata"] == expected["metadata"]
+    for name in ("first_order_cpd", "second_order_cpd"):
+        assert flatten(network[name], 3) == pytest.approx(flatten(expected[name], 3))
@@ -0,0 +1,143 @@
+# test_data_store.py
+#
+# Tests for the Parquet store: CSV ingestion round-trips, projections,
+# filters and time ranges, with and without an ingested dataset.
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_store import (csv_path, dataset_path, ingest_table, is_ingested, load_table, source_files,
+                        source_stat, source_version, write_atomic)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    rng = np.random.default_rng(5)
+    n = 3000
+    readings = pd.DataFrame({
+        "sensor_id": [f"s{i}" for i in rng.integers(0, 50, n)],
+        "timestamp": pd.Timestamp("2024-05-01") + pd.to_timedelta(rng.integers(0, 4 * 86400, n), unit="s"),
+        "latitude": rng.uniform(40, 41, n),
+        "longitude": rng.uniform(-74, -73, n),
+        "sensor_type": rng.choice(["fire", "flood", "seismic"], n),
+        "reading_value": rng.uniform(0, 100, n),
+        "status": rng.choice(["ok", "faulty"], n),
+        "assigned_cluster": rng.integers(0, 8, n),
+        "distance_km_to_cluster": rng.uniform(0, 5, n)
+    })
+    scores = pd.DataFrame({
+        "sensor_id": [f"s{i}" for i in range(200)],
+        "latitude": rng.uniform(40, 41, 200),
+        "longitude": rng.uniform(-74, -73, 200),
+        "sensor_type": rng.choice(["fire", "flood"], 200),
+        "value": rng.uniform(0, 100, 200),
+        "anomaly_score": rng.uniform(0, 1, 200),
+        "status": rng.choice(["ok", "faulty"], 200),
+        "nearest_zone_name": rng.integers(0, 6, 200)
+    })
+    readings.to_csv(tmp_path / "sensor_with_clusters_fast.csv", index=False)
+    scores.to_csv(tmp_path / "sensor_anomaly_scored.csv", index=False)
+    return str(tmp_path)
+
+
+def read_source(name, data_dir, **kwargs):
+    return pd.read_csv(csv_path(name, data_dir), **kwargs)
+
+
+def sort(df, columns):
+    return df.sort_values(columns, ignore_index=True)
+
+
+@pytest.mark.parametrize("ingested", [False, True])
+def test_load_table_round_trip(data_dir, ingested):
+    source = read_source("sensor_readings", data_dir, parse_dates=["timestamp"])
+    if ingested:
+        stats = ingest_table("sensor_readings", data_dir, rows_per_group=256)
+        assert stats["rows"] == len(source)
+        assert stats["files"] == 4  # one per day
+    assert is_ingested("sensor_readings", data_dir) == ingested
+
+    loaded = load_table("sensor_readings", data_dir=data_dir)
+    assert list(loaded.columns) == list(source.columns)
+    pd.testing.assert_frame_equal(sort(loaded, ["timestamp", "sensor_id", "reading_value"]),
+                                  sort(source, ["timestamp", "sensor_id", "reading_value"]),
+                                  check_dtype=False)
+
+
+@pytest.mark.parametrize("ingested", [False, True])
+def test_load_table_filters_and_time_range(data_dir, ingested):
+    if ingested:
+        ingest_table("sensor_readings", data_dir, rows_per_group=256)
+    source = read_source("sensor_readings", data_dir, parse_dates=["timestamp"])
+    start, end = pd.Timestamp("2024-05-02 06:00"), pd.Timestamp("2024-05-03 12:00")
+
+    loaded = load_table("sensor_readings", columns=["timestamp", "sensor_type", "reading_value"],
+                        filters=[("sensor_type", "in", ["fire", "flood"]), ("reading_value", ">=", 50)],
+                        start=start, end=end, data_dir=data_dir)
+    expected = source[(source["timestamp"] >= start) & (source["timestamp"] < end)
+                      & source["sensor_type"].isin(["fire", "flood"]) & (source["reading_value"] >= 50)]
+
+    assert list(loaded.columns) == ["timestamp", "sensor_type", "reading_value"]
+    pd.testing.assert_frame_equal(sort(loaded, ["timestamp", "reading_value"]),
+                                  sort(expected[list(loaded.columns)], ["timestamp", "reading_value"]),
+                                  check_dtype=False)
+
+
+def test_partition_filter_on_zone(data_dir):
+    ingest_table("sensor_scores", data_dir)
+    source = read_source("sensor_scores", data_dir)
+    loaded = load_table("sensor_scores", columns=["sensor_id", "nearest_zone_name"],
+                        filters=[("nearest_zone_name", "==", 3)], data_dir=data_dir)
+    assert sorted(loaded["sensor_id"]) == sorted(source.loc[source["nearest_zone_name"] == 3, "sensor_id"])
+    assert set(loaded["nearest_zone_name"]) == {3}
+
+
+def test_newer_csv_takes_over_and_changes_version(data_dir):
+    ingest_table("sensor_scores", data_dir)
+    version, stat = source_version("sensor_scores", data_dir), source_stat("sensor_scores", data_dir)
+    dataset = dataset_path("sensor_scores", data_dir)
+    assert all(path.startswith(dataset) for path in source_files("sensor_scores", data_dir))
+
+    # A CSV edited after ingestion is read instead of the stale dataset
+    path = csv_path("sensor_scores", data_dir)
+    source = pd.read_csv(path)
+    source.loc[0, "anomaly_score"] = 0.123
+    source.to_csv(path, index=False)
+    later = os.path.getmtime(dataset) + 10
+    os.utime(path, (later, later))
+
+    assert not is_ingested("sensor_scores", data_dir)
+    assert source_files("sensor_scores", data_dir) == [path]
+    assert source_version("sensor_scores", data_dir) != version
+    assert source_stat("sensor_scores", data_dir) != stat
+    loaded = load_table("sensor_scores", filters=[("sensor_id", "==", "s0")], data_dir=data_dir)
+    assert loaded["anomaly_score"].tolist() == [0.123]
+
+
+def test_unknown_table(data_dir):
+    with pytest.raises(KeyError):
+        load_table("sensors", data_dir=data_dir)
+
+
+def test_write_atomic_keeps_previous_version_on_failure(tmp_path):
+    path = str(tmp_path / "table.csv")
+
+    def write(staging, fail=False):
+        with open(staging, "w") as f:
+            f.write("partial" if fail else "v1")
+        if fail:
+            raise RuntimeError("interrupted")
+
+    write_atomic(path, write)
+
+    with pytest.raises(RuntimeError):
+        write_atomic(path, lambda staging: write(staging, fail=True))
+    with open(path) as f:
+        assert f.read() == "v1"
+    assert os.listdir(tmp_path) == ["table.csv"]
@@ -0,0 +1,236 @@
+# test_disaster.py
+#
+# Regression tests for the cascade predictor: the vectorized engine against the
+# dictionary reference, batched and memoized queries, marginals, path exports
+# and the compiled network artifact.
+
+import itertools
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_cascade import generate_synthetic_network
+from disaster import (CascadePaths, DisasterCascadePredictor, compile_network_artifact,
+                      default_artifact_path, load_network_artifact)
+
+BN_JSON_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "data", "cascade-disaster-cpd.json")
+SEVERITIES = ["low", "medium", "high", "all"]
+
+
+def write_network(path, network):
+    with open(path, "w") as f:
+        json.dump(network, f)
+    return str(path)
+
+
+@pytest.fixture
+def network_path(tmp_path):
+    # Sparse rows and missing second-order pairs exercise the fallbacks
+    network = generate_synthetic_network(6, density=0.5, max_second_order_rows=20, seed=1)
+    return write_network(tmp_path / "network.json", network)
+
+
+@pytest.fixture
+def predictor(network_path):
+    DisasterCascadePredictor.cache_clear()
+    return DisasterCascadePredictor(network_path, use_artifact=False)
+
+
+def assert_same_paths(paths, expected):
+    assert [p["path"] for p in paths] == [p["path"] for p in expected]
+    for path, reference in zip(paths, expected):
+        np.testing.assert_allclose(path["probabilities"], reference["probabilities"])
+        assert path["cumulative_probability"] == pytest.approx(reference["cumulative_probability"])
+
+
+def test_exact_search_not_proven_after_pruning_with_short_result():
+    predictor = DisasterCascadePredictor(BN_JSON_PATH, use_artifact=False)
+    pruned = predictor.predict_cascade_exact("fire", "high", 4, 0.0, top_k=50, max_queue_size=4)
+    assert len(pruned["paths"]) < 50
+    assert pruned["proven_optimal"] is False
+
+
+def test_exact_search_proven_without_pruning():
+    predictor = DisasterCascadePredictor(BN_JSON_PATH, use_artifact=False)
+    result = predictor.predict_cascade_exact("fire", "high", 4, 0.0, top_k=3)
+    assert len(result["paths"]) == 3
+    assert result["proven_optimal"] is True
+
+
+@pytest.mark.parametrize("cascade_length", [1, 2, 3, 4])
+@pytest.mark.parametrize("top_k", [1, 3, 10])
+def test_beam_search_matches_reference(predictor, cascade_length, top_k):
+    for disaster, severity in itertools.product(predictor.disaster_types, SEVERITIES):
+        for threshold in (0.0, 0.1):
+            args = (disaster, severity, cascade_length, threshold, top_k)
+            assert_same_paths(predictor.predict_cascade(*args), predictor.predict_cascade_reference(*args))
+
+
+def test_cascade_many_matches_single_queries(predictor):
+    disasters = predictor.disaster_types * 2
+    severities = [SEVERITIES[i % len(SEVERITIES)] for i in range(len(disasters))]
+    result = predictor.predict_cascade_many(disasters, severities, cascade_length=3, top_k=4)
+
+    types = result["disaster_types"]
+    for i, (disaster, severity) in enumerate(zip(disasters, severities)):
+        expected = predictor.predict_cascade(disaster, severity, 3, 0.0, 4)
+        n = result["n_paths"][i]
+        assert n == len(expected)
+        paths = [{
+            "path": [types[code] for code in result["paths"][i, j]],
+            "probabilities": list(result["probabilities"][i, j]),
+            "cumulative_probability": result["cumulative_probability"][i, j]
+        } for j in range(n)]
+        assert_same_paths(paths, expected)
+        assert (result["paths"][i, n:] == -1).all()
+        assert np.isnan(result["cumulative_probability"][i, n:]).all()
+
+
+def test_negative_top_k_is_rejected(predictor):
+    disaster = predictor.disaster_types[0]
+    with pytest.raises(ValueError):
+        predictor.predict_cascade_many([disaster], top_k=-1)
+    with pytest.raises(ValueError):
+        predictor.predict_cascade_exact(disaster, "all", 3, 0.0, top_k=-1)
+
+
+def test_memo_hits_and_read_only_results(predictor):
+    disaster = predictor.disaster_types[0]
+    first = predictor.predict_cascade_paths(disaster, "high", 3, 0.0, 3)
+    hits = DisasterCascadePredictor.cache_info()["hits"]
+    second = predictor.predict_cascade_paths(disaster, "high", 3, 0.0, 3)
+
+    assert second is first
+    assert DisasterCascadePredictor.cache_info()["hits"] == hits + 1
+    for array in (first.codes, first.parents, first.log_probs, first.leaves):
+        assert not array.flags.writeable
+        with pytest.raises(ValueError):
+            array[...] = 0
+
+
+def test_memo_is_keyed_by_model(tmp_path, predictor, network_path):
+    disaster = predictor.disaster_types[0]
+    before = predictor.predict_cascade(disaster, "all", 3, 0.0, 3)
+
+    # Same path, different network: the new predictor must not see the old results
+    changed = generate_synthetic_network(6, density=0.5, max_second_order_rows=20, seed=2)
+    write_network(network_path, changed)
+    reloaded = DisasterCascadePredictor(network_path, use_artifact=False)
+    after = reloaded.predict_cascade(disaster, "all", 3, 0.0, 3)
+
+    assert reloaded.model_fingerprint != predictor.model_fingerprint
+    assert_same_paths(after, reloaded.predict_cascade_reference(disaster, "all", 3, 0.0, 3))
+    assert [p["path"] for p in after] != [p["path"] for p in before]
+
+
+def brute_force_marginals(bayes_net, initial_disaster, severity, horizon):
+    types = bayes_net["metadata"]["disaster_types"]
+    index = {name: i for i, name in enumerate(types)}
+    first_order = bayes_net["first_order_cpd"]
+    second_order = bayes_net["second_order_cpd"]
+    marginals = np.zeros((horizon + 1, len(types)))
+
+    def walk(path, prob):
+        marginals[len(path) - 1, index[path[-1]]] += prob
+        if len(path) > horizon:
+            return
+        if len(path) == 1:
+            cpd = first_order[path[-1]].get(severity, first_order[path[-1]]["all"])
+        else:
+            cpd = second_order.get(path[-2], {}).get(path[-1], first_order[path[-1]]["all"])
+        for next_disaster, p in cpd.items():
+            walk(path + [next_disaster], prob * p)
+
+    walk([initial_disaster], 1.0)
+    return marginals
+
+
+@pytest.mark.parametrize("severity", SEVERITIES)
+def test_marginals_match_path_enumeration(predictor, severity):
+    for disaster in predictor.disaster_types:
+        result = predictor.predict_marginals(disaster, severity, horizon=3)
+        expected = brute_force_marginals(predictor.bayes_net, disaster, severity, 3)
+        np.testing.assert_allclose(result["marginals"], expected, atol=1e-12)
+        np.testing.assert_allclose(result["expected_counts"], expected[1:].sum(axis=0), atol=1e-12)
+
+
+def test_most_likely_next_event_falls_back_to_first_order(predictor):
+    net = predictor.bayes_net
+    second_order = net["second_order_cpd"]
+    known = next((a, b) for a in second_order for b in second_order[a])
+    unknown = next((a, b) for a in predictor.disaster_types for b in predictor.disaster_types
+                   if b not in second_order.get(a, {}))
+
+    cpd = second_order[known[0]][known[1]]
+    assert predictor.predict_most_likely_next_event(list(known)) == \
+        (max(cpd, key=cpd.get), pytest.approx(max(cpd.values())))
+
+    cpd = net["first_order_cpd"][unknown[1]]["high"]
+    assert predictor.predict_most_likely_next_event(list(unknown), ["low", "high"]) == \
+        (max(cpd, key=cpd.get), pytest.approx(max(cpd.values())))
+
+    # A second-to-last disaster outside the network also uses the first-order CPD
+    cpd = net["first_order_cpd"][unknown[1]]["all"]
+    assert predictor.predict_most_likely_next_event(["unknown", unknown[1]])[0] == max(cpd, key=cpd.get)
+
+
+def test_cascade_paths_round_trip(predictor):
+    disaster = predictor.disaster_types[0]
+    paths = predictor.predict_cascade_paths(disaster, "medium", 4, 0.0, 8)
+    expected = predictor.predict_cascade(disaster, "medium", 4, 0.0, 8)
+
+    rebuilt = CascadePaths.from_arrays(paths.disaster_types, paths.path_codes(), paths.probabilities())
+    assert len(rebuilt) == len(paths) == len(expected)
+    assert_same_paths(rebuilt.to_dicts(), expected)
+    np.testing.assert_array_equal(rebuilt.path_codes(), paths.path_codes())
+    np.testing.assert_allclose(rebuilt.log_probabilities(), np.log(paths.probabilities()).sum(axis=1))
+
+    records = rebuilt.to_records()
+    last_steps = records[records["step"] == paths.length - 1]
+    assert len(records) == len(expected) * paths.length
+    assert [list(records["disaster"][records["path"] == i]) for i in range(len(expected))] == \
+        [p["path"] for p in expected]
+    np.testing.assert_allclose(last_steps["cumulative_probability"],
+                               [p["cumulative_probability"] for p in expected])
+    assert rebuilt.to_frame().equals(paths.to_frame())
+
+
+def test_artifact_matches_json(predictor, network_path):
+    artifact_path = compile_network_artifact(network_path)
+    assert artifact_path == default_artifact_path(network_path)
+
+    loaded = DisasterCascadePredictor(network_path)
+    assert loaded._bayes_net is None
+    assert loaded.model_fingerprint == predictor.model_fingerprint
+    for disaster in predictor.disaster_types:
+        assert_same_paths(loaded.predict_cascade(disaster, "high", 3, 0.0, 5),
+                          predictor.predict_cascade(disaster, "high", 3, 0.0, 5))
+
+
+def test_stale_artifact_falls_back_to_json(network_path):
+    artifact_path = compile_network_artifact(network_path)
+    network = generate_synthetic_network(6, density=0.5, max_second_order_rows=20, seed=3)
+    write_network(network_path, network)
+
+    assert load_network_artifact(artifact_path, network_path) is None
+    predictor = DisasterCascadePredictor(network_path)
+    assert predictor._bayes_net is not None
+    assert predictor.bayes_net == network
+
+
+def test_truncated_artifact_falls_back_to_json(network_path):
+    artifact_path = compile_network_artifact(network_path)
+    with open(artifact_path, "rb") as f:
+        data = f.read()
+
+    for size in (0, 4, 12, 64, len(data) // 2, len(data) - 1):
+        with open(artifact_path, "wb") as f:
+            f.write(data[:size])
+        assert load_network_artifact(artifact_path, network_path) is None
+        assert DisasterCascadePredictor(network_path)._bayes_net is not None
@@ -0,0 +1,64 @@
+# test_json_output.py
+#
+# Tests for the local repair and validation of JSON answers.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_output import (VERDICT_SCHEMA, coerce, json_values, parse_json_answer, reask_prompt,
+                         strip_code_fences, validate)
+
+VERDICT = {"fake": False, "confidence": "high", "reason": "sensor agrees"}
+
+
+def test_strip_code_fences():
+    assert strip_code_fences('Here:\n```json\n{"a": 1}\n```\nDone') == '{"a": 1}\n'
+    assert strip_code_fences('{"a": 1}') == '{"a": 1}'
+
+
+def test_json_values_skip_prose_and_repair_trailing_commas():
+    text = 'First {"a": 1,} then [1, 2,] and {broken then {"b": [true]}'
+    assert json_values(text) == [{"a": 1}, [1, 2], {"b": [True]}]
+
+
+def test_json_values_keep_complete_items_of_truncated_array():
+    assert json_values('[{"id": 1}, {"id": 2}, {"id"') == [{"id": 1}, {"id": 2}]
+
+
+def test_coerce_repairs_type_slips():
+    value = coerce({"fake": " TRUE ", "confidence": "Medium", "reason": "x", "extra": "1"}, VERDICT_SCHEMA)
+    assert value == {"fake": True, "confidence": "medium", "reason": "x", "extra": "1"}
+    assert coerce("3", {"type": "integer"}) == 3
+    assert coerce("2.5", {"type": "number"}) == 2.5
+    assert coerce("maybe", {"type": "boolean"}) == "maybe"
+
+
+def test_validate_reports_paths():
+    errors = validate({"fake": "no", "confidence": "certain"}, VERDICT_SCHEMA)
+    assert len(errors) == 3
+    assert any("fake" in e for e in errors)
+    assert any("confidence" in e for e in errors)
+    assert any("reason" in e for e in errors)
+    assert validate(VERDICT, VERDICT_SCHEMA) == []
+
+
+def test_parse_json_answer():
+    answer = 'Verdict below.\n```\n{"fake": "false", "confidence": "HIGH", "reason": "sensor agrees",}\n```'
+    assert parse_json_answer(answer, VERDICT_SCHEMA) == (VERDICT, [])
+
+    # The first valid value wins over an earlier invalid one
+    answer = '{"fake": false} or rather {"fake": false, "confidence": "high", "reason": "sensor agrees"}'
+    assert parse_json_answer(answer, VERDICT_SCHEMA) == (VERDICT, [])
+
+    value, errors = parse_json_answer('{"fake": false}', VERDICT_SCHEMA)
+    assert value == {"fake": False} and errors
+    assert parse_json_answer("no JSON at all", VERDICT_SCHEMA)[0] is None
+
+
+def test_reask_prompt_embeds_answer_and_errors():
+    prompt = reask_prompt("Classify this tweet", '{"fake": "no"}', ["$.fake: expected boolean"], VERDICT_SCHEMA)
+    assert "Classify this tweet" in prompt
+    assert '{"fake": "no"}' in prompt
+    assert "$.fake: expected boolean" in prompt
@@ -0,0 +1,91 @@
+# test_llm_cache.py
+#
+# Tests for the persistent LLM response cache: keys, expiry and LRU eviction.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_cache
+from llm_cache import ResponseCache, payload_key
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return clock
+
+
+def fill(cache, clock, keys, response="x" * 10):
+    for key in keys:
+        clock.now += 1
+        cache.put(key, "llama3", response)
+
+
+def test_payload_key_ignores_stream():
+    payload = {"model": "llama3", "prompt": "hi", "options": {"temperature": 0.1}}
+    assert payload_key(dict(payload, stream=True)) == payload_key(dict(payload, stream=False))
+    assert payload_key(payload) != payload_key(dict(payload, prompt="hello"))
+
+
+def test_hit_and_miss(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    cache.put("a", "llama3", "answer")
+    assert cache.get("a") == "answer"
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stores"], stats["entries"]) == (1, 1, 1, 1)
+
+
+def test_lru_eviction_by_entries(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=3, evict_every=1000)
+    fill(cache, clock, ["a", "b", "c"])
+    clock.now += 1
+    assert cache.get("a") is not None  # "b" is now the least recently used
+
+    fill(cache, clock, ["d"])
+    assert cache.evict() == 1
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in ("a", "c", "d"))
+
+
+def test_eviction_by_bytes(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=25, evict_every=1000)
+    fill(cache, clock, ["a", "b", "c"])
+    assert cache.evict() == 1
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 20
+
+
+def test_expired_entries_are_not_served(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_age_seconds=60, evict_every=1000)
+    fill(cache, clock, ["a"])
+    clock.now += 30
+    fill(cache, clock, ["b"])
+    clock.now += 40
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.evict() == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_eviction_runs_every_n_stores(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2, evict_every=4)
+    fill(cache, clock, ["a", "b", "c"])
+    assert cache.stats()["entries"] == 3
+    fill(cache, clock, ["d"])
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 2
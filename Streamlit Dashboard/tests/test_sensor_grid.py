@@ -0,0 +1,84 @@
+# test_sensor_grid.py
+#
+# Tests for the zoom-aware sensor grid: level aggregation and view bounds,
+# including views across the antimeridian.
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sensor_grid import SensorGrid, mercator, view_bounds
+
+
+def sensors(latitudes, longitudes, scores=None, statuses=None):
+    n = len(latitudes)
+    return pd.DataFrame({
+        "latitude": latitudes,
+        "longitude": longitudes,
+        "anomaly_score": scores if scores is not None else np.linspace(0, 1, n),
+        "status": statuses if statuses is not None else ["ok"] * n
+    })
+
+
+@pytest.fixture
+def grid():
+    rng = np.random.default_rng(3)
+    n = 2000
+    return SensorGrid(sensors(rng.uniform(-60, 60, n), rng.uniform(-180, 180, n),
+                              rng.uniform(0, 1, n), rng.choice(["ok", "faulty"], n, p=[0.9, 0.1])),
+                      max_level=10)
+
+
+def test_levels_preserve_totals(grid):
+    finest = grid.cells(10)
+    for level in range(11):
+        cells = grid.cells(level)
+        assert cells["count"].sum() == 2000
+        faulty = cells["faulty_share"].mul(cells["count"]).sum()
+        assert faulty == pytest.approx(finest["faulty_share"].mul(finest["count"]).sum())
+        assert cells["anomaly_max"].max() == pytest.approx(finest["anomaly_max"].max())
+        assert not cells.duplicated(["cell_x", "cell_y"]).any()
+    assert len(grid.cells(0)) == 1
+
+
+def test_cells_match_mercator_binning(grid):
+    cells = grid.cells(6)
+    x, y = mercator(cells["latitude"], cells["longitude"])
+    # A cell's mean position lies inside it
+    assert np.all(np.floor(x * 64) == cells["cell_x"])
+    assert np.all(np.floor(y * 64) == cells["cell_y"])
+    assert np.all((cells["south"] <= cells["latitude"]) & (cells["latitude"] <= cells["north"]))
+
+
+def test_antimeridian_bounds():
+    grid = SensorGrid(sensors([40.5] * 4, [175.0, -175.0, 0.0, 179.99]), max_level=10)
+    crossing = (40.0, 170.0, 41.0, -170.0)
+    assert grid.cell_count(10, crossing) == 3
+    assert set(grid.cells(10, crossing)["longitude"].round(2)) == {175.0, -175.0, 179.99}
+
+    # The same view with unwrapped longitudes, and the whole world
+    assert grid.cell_count(10, (40.0, 170.0, 41.0, 190.0)) == 3
+    assert grid.cell_count(10, (40.0, -190.0, 41.0, -170.0)) == 3
+    assert grid.cell_count(10, (40.0, -200.0, 41.0, 200.0)) == 4
+    assert grid.cell_count(10, (40.0, -10.0, 41.0, 10.0)) == 1
+
+
+def test_view_bounds_across_antimeridian():
+    south, west, north, east = view_bounds(40.5, 179.0, zoom=6, width=1024, height=512)
+    assert south < 40.5 < north
+    assert west < 179.0 < 180.0 < east
+
+    grid = SensorGrid(sensors([40.5] * 3, [178.0, -178.0, 0.0]), max_level=10)
+    assert grid.cell_count(8, (south, west, north, east)) == 2
+
+
+def test_view_coarsens_to_max_cells(grid):
+    level, cells = grid.view(zoom=7, max_cells=100)
+    assert level < grid.level_for_zoom(7)
+    assert len(cells) <= 100
+    assert grid.cell_count(level + 1) > 100
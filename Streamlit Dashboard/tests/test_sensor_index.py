@@ -0,0 +1,80 @@
+# test_sensor_index.py
+#
+# Tests for the spatiotemporal sensor index against brute-force search.
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sensor_index import EARTH_RADIUS_KM, SensorIndex
+
+START = pd.Timestamp("2024-05-01")
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h))
+
+
+def random_points(rng, n, center):
+    return pd.DataFrame({
+        "timestamp": START + pd.to_timedelta(rng.integers(0, 6 * 3600, n), unit="s"),
+        "latitude": center[0] + rng.uniform(-0.3, 0.3, n),
+        "longitude": center[1] + rng.uniform(-0.3, 0.3, n)
+    })
+
+
+# A mid-latitude city, the antimeridian and the north pole
+@pytest.mark.parametrize("center", [(40.7, -74.0), (-17.0, 179.9), (89.9, 0.0)])
+@pytest.mark.parametrize("radius_km, cell_km", [(5, 5.0), (12, 5.0), (3, 10.0)])
+def test_query_many_matches_brute_force(center, radius_km, cell_km):
+    rng = np.random.default_rng(0)
+    sensors = random_points(rng, 3000, center)
+    sensors["sensor_id"] = np.arange(len(sensors))
+    queries = random_points(rng, 200, center)
+    index = SensorIndex(sensors, cell_km=cell_km)
+
+    t, rows, distance = index.query_many(queries["latitude"], queries["longitude"], queries["timestamp"],
+                                         window_minutes=30, radius_km=radius_km)
+    assert np.all(np.diff(t) >= 0)
+
+    found = set(zip(t, rows))
+    expected = set()
+    for q, query in queries.iterrows():
+        near = haversine_km(query["latitude"], query["longitude"], sensors["latitude"], sensors["longitude"])
+        timely = (sensors["timestamp"] - query["timestamp"]).abs() <= pd.Timedelta(minutes=30)
+        expected |= {(q, row) for row in np.flatnonzero((near <= radius_km) & timely)}
+    assert found == expected
+
+    np.testing.assert_allclose(distance, haversine_km(queries["latitude"].to_numpy()[t],
+                                                      queries["longitude"].to_numpy()[t],
+                                                      sensors["latitude"].to_numpy()[rows],
+                                                      sensors["longitude"].to_numpy()[rows]), atol=1e-6)
+
+
+def test_query_filters_and_sorts():
+    sensors = pd.DataFrame({
+        "timestamp": [START] * 4,
+        "latitude": [10.0, 10.01, 10.02, 10.03],
+        "longitude": [20.0] * 4,
+        "sensor_type": ["fire", "flood", "fire", "fire"],
+        "status": ["ok", "ok", "faulty", "ok"]
+    })
+    index = SensorIndex(sensors)
+    result = index.query(10.035, 20.0, START + pd.Timedelta(minutes=5), radius_km=5, sensor_types=["fire"])
+
+    assert list(result["latitude"]) == [10.03, 10.0]
+    assert result["distance_km"].is_monotonic_increasing
+    assert len(index.query(10.035, 20.0, START + pd.Timedelta(minutes=11))) == 0
+
+
+def test_empty_index():
+    sensors = pd.DataFrame({"timestamp": pd.to_datetime([]), "latitude": [], "longitude": []})
+    t, rows, distance = SensorIndex(sensors).query_many([10.0], [20.0], [START])
+    assert len(t) == len(rows) == len(distance) == 0
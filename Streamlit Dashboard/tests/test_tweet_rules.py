@@ -0,0 +1,95 @@
+# test_tweet_rules.py
+#
+# Tests for the rule-based tweet pre-screening.
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tweet_rules import screen_tweets, verdict
+
+NOW = pd.Timestamp("2024-05-01 12:00:00")
+KM_PER_DEGREE = 111.2
+
+
+def scenario(text, readings=()):
+    """One tweet and its nearby readings as (sensor_type, risk, status, km north, minutes later)"""
+    return text, list(readings)
+
+
+SCENARIOS = [
+    scenario("Huge fire near the park", [("fire", 90, "ok", 1.0, 2)]),
+    scenario("Flooding downtown, water everywhere", [("flood", 75, "ok", 2.0, -5)]),
+    scenario("Earthquake just now!", [("seismic", 20, "ok", 0.5, 0)]),
+    scenario("Nice weather today", [("fire", 95, "ok", 0.0, 0)]),
+    scenario("Smoke everywhere", [("air_quality", 80, "ok", 1.0, 0), ("air_quality", 10, "ok", 1.5, 0)]),
+    scenario("Fire on main street", [("fire", 95, "faulty", 0.5, 0)]),
+    scenario("Wildfire spreading", [("fire", 95, "ok", 0.5, -20)]),
+    scenario("Blaze by the river", [("fire", 95, "ok", 10.0, 0)]),
+    scenario("Earthquake and fire", [("seismic", 40, "ok", 1.0, 0), ("co2", 88, "ok", 3.0, 0)]),
+    scenario("Flood warning", [("fire", 95, "ok", 0.5, 0)])
+]
+
+
+def build(scenarios):
+    tweets, sensors = [], []
+    for i, (text, readings) in enumerate(scenarios):
+        # Scenarios are far apart so that their readings never mix
+        lat, lon = 10.0 + i, 20.0
+        tweets.append({"text": text, "timestamp": NOW, "latitude": lat, "longitude": lon})
+        for j, (sensor_type, risk, status, km, minutes) in enumerate(readings):
+            sensors.append({
+                "sensor_id": f"s{i}_{j}",
+                "timestamp": NOW + pd.Timedelta(minutes=minutes),
+                "latitude": lat + km / KM_PER_DEGREE,
+                "longitude": lon,
+                "sensor_type": sensor_type,
+                "reading_value": float(risk),
+                "status": status
+            })
+    return pd.DataFrame(tweets), pd.DataFrame(sensors)
+
+
+def test_screen_tweets_applies_the_rules():
+    tweets, sensors = build(SCENARIOS)
+    result = screen_tweets(tweets, sensors)
+
+    assert list(result["needs_llm"]) == [False, False, False, True, True, False, False, False, False, False]
+    assert list(result["fake"]) == [False, False, True, None, None, True, True, True, False, True]
+    confidence = [None if pd.isna(c) else c for c in result["confidence"]]
+    assert confidence == ["high", "medium", "low", None, None, "low", "low", "low", "high", "low"]
+    assert list(result["matched_sensors"]) == [1, 1, 1, 0, 2, 0, 0, 0, 2, 0]
+    np.testing.assert_array_equal(result["max_risk"], [90, 75, 20, np.nan, 80, np.nan, np.nan, np.nan, 88, np.nan])
+    assert result.loc[8, "disasters"] == "earthquake, fire"
+    assert result.loc[3, "disasters"] == ""
+    assert "Conflicting" in result.loc[4, "reason"]
+    assert "no working" in result.loc[5, "reason"]
+
+
+def test_screen_tweets_keeps_the_index_and_thresholds():
+    tweets, sensors = build(SCENARIOS[:2])
+    tweets.index = [101, 205]
+    result = screen_tweets(tweets, sensors, real_threshold=80)
+
+    assert list(result.index) == [101, 205]
+    assert list(result["fake"]) == [False, True]
+    assert verdict(result.loc[101]) == {
+        "tweet": "Huge fire near the park",
+        "fake": False,
+        "confidence": "high",
+        "reason": result.loc[101, "reason"]
+    }
+
+
+def test_screen_tweets_without_sensors():
+    tweets, _ = build(SCENARIOS[:1])
+    sensors = pd.DataFrame(columns=["sensor_id", "timestamp", "latitude", "longitude", "sensor_type",
+                                    "reading_value", "status"])
+    sensors["timestamp"] = pd.to_datetime(sensors["timestamp"])
+    result = screen_tweets(tweets, sensors)
+    assert list(result["fake"]) == [True]
+    assert list(result["matched_sensors"]) == [0]
@@ -0,0 +1,114 @@
+# test_tweet_validation.py
+#
+# Tests for batched LLM tweet validation: batch planning, verdict parsing and
+# re-asking for missing items.
+
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tweet_validation import (ANSWER_TOKENS_PER_TWEET, _batch_header, _batch_item, estimate_tokens,
+                              parse_verdicts, plan_batches, validate_tweets_batched)
+
+
+def make_item(item_id, evidence_chars=100):
+    return {
+        "id": item_id,
+        "tweet_payload": {"tweet": f"Fire near block {item_id}"},
+        "sensor_block": "x" * evidence_chars
+    }
+
+
+def cost(item):
+    return estimate_tokens(_batch_item(item["id"], item["tweet_payload"], item["sensor_block"])) \
+        + ANSWER_TOKENS_PER_TWEET
+
+
+def verdict(item_id, fake=False, **fields):
+    return dict({"id": item_id, "tweet": f"Fire near block {item_id}", "fake": fake,
+                 "confidence": "high", "reason": "sensor agrees"}, **fields)
+
+
+def test_plan_batches_respects_budget_and_size():
+    items = [make_item(i, evidence_chars=100 + 50 * i) for i in range(20)]
+    header = estimate_tokens(_batch_header())
+    budget = header + 4 * cost(items[0])
+    batches = plan_batches(items, budget, max_batch_size=3)
+
+    assert [item for batch in batches for item in batch] == items
+    for batch in batches:
+        assert len(batch) <= 3
+        assert len(batch) == 1 or header + sum(cost(item) for item in batch) <= budget
+    # Greedy: the next item would not have fitted in the previous batch
+    for batch, following in zip(batches, batches[1:]):
+        assert len(batch) == 3 or header + sum(cost(item) for item in batch + following[:1]) > budget
+
+
+def test_plan_batches_gives_oversized_items_their_own_batch():
+    items = [make_item(0), make_item(1, evidence_chars=10_000), make_item(2)]
+    batches = plan_batches(items, token_budget=1000, max_batch_size=8)
+    assert [[item["id"] for item in batch] for batch in batches] == [[0], [1], [2]]
+
+
+def test_parse_verdicts_item_by_item():
+    answer = "Here you go:\n```json\n" + json.dumps({"verdicts": [
+        verdict(1),
+        verdict(2, fake="True", confidence="Low"),
+        verdict(3, confidence="certain"),
+        verdict(99)
+    ]}) + "\n```"
+    verdicts = parse_verdicts(answer, [1, 2, 3])
+
+    assert set(verdicts) == {1, 2}
+    assert verdicts[2]["fake"] is True and verdicts[2]["confidence"] == "low"
+    assert "id" not in verdicts[1]
+
+
+def test_parse_verdicts_truncated_and_single_answers():
+    answer = '[' + json.dumps(verdict("a")) + ', ' + json.dumps(verdict("b"))[:30]
+    assert set(parse_verdicts(answer, ["a", "b"])) == {"a"}
+
+    # String ids in the answer map back to the caller's ids
+    assert set(parse_verdicts(json.dumps([verdict("7")]), [7])) == {7}
+
+    single = {k: v for k, v in verdict(5).items() if k != "id"}
+    assert set(parse_verdicts(json.dumps(single), [5])) == {5}
+    assert parse_verdicts(json.dumps(single), [5, 6]) == {}
+
+
+class ScriptedLLM:
+    """Answers every tweet of a prompt except those listed in drop (once each)"""
+
+    def __init__(self, drop=(), fail_always=()):
+        self.drop = set(drop)
+        self.fail_always = set(fail_always)
+        self.rounds = []
+
+    def map(self, prompts, return_exceptions=False, use_cache=None, format=None):
+        self.rounds.append((len(prompts), use_cache))
+        answers = []
+        for prompt in prompts:
+            ids = [int(i) for i in re.findall(r"Fire near block (\d+)", prompt)]
+            keep = [i for i in ids if i not in self.drop and i not in self.fail_always]
+            self.drop -= set(ids)
+            if len(ids) == 1 and "### Tweet id" not in prompt:
+                answers.append(json.dumps({k: v for k, v in verdict(ids[0]).items() if k != "id"})
+                               if keep else "not JSON")
+            else:
+                answers.append(json.dumps({"verdicts": [verdict(i) for i in keep]}))
+        return answers
+
+
+def test_validate_tweets_batched_reasks_missing_items():
+    items = [make_item(i) for i in range(10)]
+    llm = ScriptedLLM(drop=[3, 7], fail_always=[9])
+    verdicts = validate_tweets_batched(llm, items, token_budget=100_000, max_batch_size=4, max_rounds=3)
+
+    assert set(verdicts) == set(range(10))
+    assert all(verdicts[i]["confidence"] == "high" for i in range(9))
+    assert verdicts[9]["confidence"] == "error"
+    # First round: 3 prompts, cached; then only the missing items, uncached
+    assert llm.rounds == [(3, None), (2, False), (1, False)]
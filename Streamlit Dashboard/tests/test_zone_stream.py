@@ -0,0 +1,140 @@
+# test_zone_stream.py
+#
+# Tests for the streaming zone stress aggregation against batch recomputation.
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zone_stream import RunningStats, ZoneStressAggregator, publish_snapshot, read_snapshot, zone_stress
+
+
+def stream(n=2000, n_sensors=60, n_zones=5, seed=0):
+    """Time-ordered readings, every sensor staying in its zone"""
+    rng = np.random.default_rng(seed)
+    sensor = rng.integers(0, n_sensors, n)
+    return pd.DataFrame({
+        "sensor_id": [f"s{i}" for i in sensor],
+        "nearest_zone_name": sensor % n_zones,
+        "timestamp": pd.Timestamp("2024-05-01") + pd.to_timedelta(np.sort(rng.uniform(0, 3600, n)), unit="s"),
+        "anomaly_score": rng.uniform(0, 1, n),
+        "status": rng.choice(["ok", "faulty"], n, p=[0.8, 0.2])
+    })
+
+
+def batch_zones(readings):
+    readings = readings.assign(faulty=readings["status"].eq("faulty").astype(float))
+    zones = readings.groupby("nearest_zone_name").agg(
+        avg_anomaly_score=("anomaly_score", "mean"),
+        faulty_rate=("faulty", "mean"),
+        sensor_count=("sensor_id", "size")
+    ).reset_index()
+    zones["zone_stress"] = zone_stress(zones["avg_anomaly_score"], zones["faulty_rate"])
+    return zones
+
+
+def assert_zones_equal(actual, expected, prefix=""):
+    actual = actual.set_index("nearest_zone_name").sort_index()
+    expected = expected.set_index("nearest_zone_name").sort_index()
+    assert list(actual.index) == list(expected.index)
+    for column in ("avg_anomaly_score", "faulty_rate", "sensor_count", "zone_stress"):
+        name = prefix + column if column != "sensor_count" or not prefix else "window_readings"
+        np.testing.assert_allclose(actual[name].to_numpy(float), expected[column].to_numpy(float), atol=1e-9)
+
+
+def test_running_stats_add_remove_matches_numpy():
+    rng = np.random.default_rng(1)
+    scores = rng.uniform(0, 1, 500)
+    faulty = rng.random(500) < 0.3
+    stats = RunningStats()
+    for score, bad in zip(scores, faulty):
+        stats.add(score, bad)
+    removed = rng.choice(500, size=400, replace=False)
+    for i in removed:
+        stats.remove(scores[i], faulty[i])
+
+    kept = np.setdiff1d(np.arange(500), removed)
+    assert stats.count == len(kept)
+    assert stats.mean == pytest.approx(scores[kept].mean())
+    assert stats.std == pytest.approx(scores[kept].std(ddof=1))
+    assert stats.faulty_rate == pytest.approx(faulty[kept].mean())
+    assert stats.stress == pytest.approx(zone_stress(scores[kept].mean(), faulty[kept].mean()))
+
+    for i in kept:
+        stats.remove(scores[i], faulty[i])
+    assert (stats.count, stats.mean, stats.std, stats.faulty_rate) == (0, 0.0, 0.0, 0.0)
+
+
+def test_current_state_and_window_match_batch():
+    readings = stream()
+    aggregator = ZoneStressAggregator(sensor_ttl=10_000, window_seconds=300)
+    aggregator.update_many(readings)
+    snapshot = aggregator.snapshot()
+
+    latest = readings.groupby("sensor_id").tail(1)
+    assert_zones_equal(snapshot["zones"], batch_zones(latest))
+
+    cutoff = readings["timestamp"].max() - pd.Timedelta(seconds=300)
+    window = readings[readings["timestamp"] >= cutoff]
+    zones = snapshot["zones"][snapshot["zones"]["window_readings"] > 0]
+    assert_zones_equal(zones, batch_zones(window), prefix="window_")
+
+    expected_high = sorted(batch_zones(latest).query("zone_stress > 0.6")["nearest_zone_name"])
+    assert snapshot["high_stress_zones"] == expected_high
+    # The watermark is kept as float seconds
+    assert abs(snapshot["watermark"] - readings["timestamp"].max()) < pd.Timedelta(milliseconds=1)
+
+
+def test_late_readings_are_ignored_everywhere():
+    aggregator = ZoneStressAggregator(window_seconds=300, tumbling_seconds=60)
+    aggregator.update("s1", 1, 100, 0.9)
+    aggregator.update("s2", 1, 130, 0.5)
+    aggregator.update("s1", 1, 90, 0.1)  # older than s1's latest reading
+
+    snapshot = aggregator.snapshot()
+    zone = snapshot["zones"].iloc[0]
+    assert snapshot["stats"]["late_readings"] == 1
+    assert zone["sensor_count"] == 2
+    assert zone["avg_anomaly_score"] == pytest.approx(0.7)
+    assert zone["window_readings"] == 2
+    assert zone["window_avg_anomaly_score"] == pytest.approx(0.7)
+
+    aggregator.update("s3", 1, 200, 0.3)  # closes the [60, 120) and [120, 180) tumbling windows
+    tumbling = aggregator.snapshot()["tumbling"]
+    assert list(tumbling["window_start"]) == list(pd.to_datetime([60, 120], unit="s"))
+    assert list(tumbling["sensor_count"]) == [1, 1]
+    np.testing.assert_allclose(tumbling["avg_anomaly_score"], [0.9, 0.5])
+
+
+def test_sensor_expiry_and_invalid_readings():
+    aggregator = ZoneStressAggregator(sensor_ttl=60, window_seconds=30)
+    aggregator.update("s1", 1, 0, 0.9, faulty=True)
+    aggregator.update("s2", 2, 10, 0.2)
+    aggregator.update("s3", 2, float("nan"), 0.2)
+    assert aggregator.high_stress_zones == [1]
+
+    assert aggregator.expire(now=65) == 1
+    snapshot = aggregator.snapshot()
+    assert list(snapshot["zones"]["nearest_zone_name"]) == [2]
+    assert snapshot["high_stress_zones"] == []
+    assert snapshot["stats"]["expired_sensors"] == 1
+    assert snapshot["stats"]["invalid_readings"] == 1
+
+
+def test_publish_and_read_snapshot(tmp_path):
+    aggregator = ZoneStressAggregator()
+    aggregator.update_many(stream(n=200))
+    snapshot = aggregator.snapshot()
+    path = str(tmp_path / "zone_stress_live.csv")
+
+    assert read_snapshot(path) is None
+    publish_snapshot(snapshot, path)
+    table = read_snapshot(path)
+    assert list(table["nearest_zone_name"]) == list(snapshot["zones"]["nearest_zone_name"])
+    np.testing.assert_allclose(table["zone_stress"], snapshot["zones"]["zone_stress"])
+    assert (table["watermark"] == snapshot["watermark"]).all()
@@ -0,0 +1,170 @@
+# tweet_rules.py
+#
+# Deterministic pre-screening of disaster tweets against sensor readings.
+#
+# Applies the crisis agent's evaluation rules to a whole batch of tweets at
+# once: disaster -> sensor type mapping, sensors within ±10 minutes and 5 km,
+# faulty sensors ignored, risk > 70 means real (> 85 high confidence). Only
+# tweets the rules cannot settle (no recognised disaster, or conflicting
+# sensors) need the LLM.
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Union
+
+from sensor_index import SensorIndex
+
+# Sensor types that can confirm each disaster
+DISASTER_SENSOR_MAP = {
+    "earthquake": ["seismic"],
+    "fire": ["fire", "air_quality", "co2"],
+    "flood": ["flood"],
+    "heatwave": ["temperature"],
+    "humidity": ["humidity"]
+}
+
+# Words in a tweet that mention each disaster (regular expressions)
+DISASTER_KEYWORDS = {
+    "earthquake": r"earthquake|quake|tremor|seismic|aftershock",
+    "fire": r"fire|smoke|blaze|burning|flames|wildfire",
+    "flood": r"flood|flooding|inundat|submerged|water level",
+    "heatwave": r"heatwave|heat wave|heatstroke|scorching|extreme heat",
+    "humidity": r"humidity|humid|muggy"
+}
+
+
+def _mentions(texts: pd.Series, disasters: List[str]) -> np.ndarray:
+    """Bit mask per tweet of the disasters it mentions (bit i = disasters[i])"""
+    lowered = texts.fillna("").astype(str).str.lower()
+    bits = np.zeros(len(texts), dtype=np.int64)
+    for i, disaster in enumerate(disasters):
+        bits |= lowered.str.contains(DISASTER_KEYWORDS[disaster], regex=True).to_numpy().astype(np.int64) << i
+    return bits
+
+
+def _sensor_bits(sensor_types: pd.Series, disasters: List[str]) -> np.ndarray:
+    """Bit mask per sensor of the disasters its type can confirm"""
+    lookup: Dict[str, int] = {}
+    for i, disaster in enumerate(disasters):
+        for sensor_type in DISASTER_SENSOR_MAP[disaster]:
+            lookup[sensor_type] = lookup.get(sensor_type, 0) | (1 << i)
+    return sensor_types.astype(str).str.lower().map(lookup).fillna(0).to_numpy().astype(np.int64)
+
+
+def screen_tweets(tweets: pd.DataFrame,
+                  sensors: Union[pd.DataFrame, SensorIndex],
+                  time_window_minutes: float = 10,
+                  radius_km: float = 5,
+                  real_threshold: float = 70,
+                  high_threshold: float = 85,
+                  conflict_threshold: float = 30) -> pd.DataFrame:
+    """
+    Apply the tweet validation rules to a batch of tweets
+
+    Args:
+        tweets: Tweets with text, timestamp, latitude and longitude columns
+        sensors: SensorIndex (or table to index) of readings with timestamp, latitude,
+            longitude, sensor_type, reading_value and status columns
+        time_window_minutes: Maximum time between tweet and sensor reading
+        radius_km: Maximum distance between tweet and sensor
+        real_threshold: Risk above which a relevant sensor confirms the tweet
+        high_threshold: Risk above which the confirmation has high confidence
+        conflict_threshold: Risk below which a sensor contradicts a confirming sensor of the same type
+
+    Returns:
+        DataFrame with the tweets' index and columns:
+            - tweet: Tweet text
+            - fake: Verdict (None when the LLM must decide)
+            - confidence: "high", "medium" or "low" (None when the LLM must decide)
+            - reason: Explanation of the verdict, or why the tweet needs the LLM
+            - needs_llm: Whether the rules could not settle the tweet
+            - disasters: Disasters mentioned in the tweet
+            - matched_sensors: Relevant, non-faulty sensors within the window and radius
+            - max_risk: Highest risk among them (NaN if none)
+    """
+    disasters = list(DISASTER_SENSOR_MAP)
+    n = len(tweets)
+    tweet_bits = _mentions(tweets["text"], disasters)
+
+    # Readings within the window and radius of each tweet
+    index = sensors if isinstance(sensors, SensorIndex) else SensorIndex(sensors)
+    t, rows, distance = index.query_many(
+        tweets["latitude"].to_numpy(float), tweets["longitude"].to_numpy(float),
+        tweets["timestamp"].to_numpy(), time_window_minutes, radius_km
+    )
+    matches = index.sensors.iloc[rows]
+
+    # Only working sensors relevant to a disaster the tweet mentions count as evidence
+    relevant = (_sensor_bits(matches["sensor_type"], disasters) & tweet_bits[t]) != 0
+    relevant &= (matches["status"].astype(str).str.lower() != "faulty").to_numpy()
+    t, distance = t[relevant], distance[relevant]
+    risk = matches["reading_value"].to_numpy(float)[relevant]
+    sensor_type = matches["sensor_type"].astype(str).to_numpy()[relevant]
+    type_names, type_codes = np.unique(sensor_type, return_inverse=True)
+
+    matched = np.bincount(t, minlength=n)
+    confirming = np.bincount(t[risk > real_threshold], minlength=n)
+    contradicting = np.bincount(t[risk < conflict_threshold], minlength=n)
+
+    # Conflict: sensors of the same type near the same tweet disagree
+    tweet_type = t * len(type_names) + type_codes
+    disagreeing = np.intersect1d(tweet_type[risk > real_threshold], tweet_type[risk < conflict_threshold])
+    conflict = np.zeros(n, dtype=bool)
+    conflict[disagreeing // max(len(type_names), 1)] = True
+
+    # Strongest piece of evidence per tweet: last pair after sorting by (tweet, risk)
+    order = np.lexsort((risk, t))
+    last = order[np.r_[t[order][1:] != t[order][:-1], True]] if len(order) else order
+    max_risk = np.full(n, np.nan)
+    max_risk[t[last]] = risk[last]
+    best_type = np.full(n, "", dtype=object)
+    best_type[t[last]] = sensor_type[last]
+    best_distance = np.full(n, np.nan)
+    best_distance[t[last]] = distance[last]
+
+    no_disaster = tweet_bits == 0
+    needs_llm = no_disaster | conflict
+    real = ~needs_llm & (max_risk > real_threshold)
+    confidence = np.where(max_risk > high_threshold, "high", np.where(real, "medium", "low"))
+
+    mentioned = [", ".join(d for i, d in enumerate(disasters) if bits >> i & 1) for bits in tweet_bits]
+    expected = [" / ".join(sensor for i, d in enumerate(disasters) if bits >> i & 1 for sensor in DISASTER_SENSOR_MAP[d])
+                for bits in tweet_bits]
+    window = f"{radius_km:g} km and ±{time_window_minutes:g} min"
+
+    reasons = []
+    for i in range(n):
+        if no_disaster[i]:
+            reasons.append("No recognised disaster keyword in the tweet.")
+        elif conflict[i]:
+            reasons.append(f"Conflicting {expected[i]} sensors within {window}: {confirming[i]} report risk "
+                           f"> {real_threshold:g}, {contradicting[i]} report risk < {conflict_threshold:g}.")
+        elif matched[i] == 0:
+            reasons.append(f"Tweet reports {mentioned[i]}, but no working {expected[i]} sensor is within "
+                           f"{window} of it.")
+        else:
+            verdict = "confirms" if real[i] else "does not confirm"
+            reasons.append(f"Tweet reports {mentioned[i]}; a {best_type[i]} sensor {best_distance[i]:.1f} km away "
+                           f"reports risk {max_risk[i]:.0f}, which {verdict} it "
+                           f"({matched[i]} relevant sensor(s) within {window}).")
+
+    return pd.DataFrame({
+        "tweet": tweets["text"].to_numpy(),
+        "fake": np.where(needs_llm, None, ~real).astype(object),
+        "confidence": np.where(needs_llm, None, confidence).astype(object),
+        "reason": reasons,
+        "needs_llm": needs_llm,
+        "disasters": mentioned,
+        "matched_sensors": matched,
+        "max_risk": max_risk
+    }, index=tweets.index)
+
+
+def verdict(row: pd.Series) -> Dict[str, object]:
+    """A screened tweet as the agent's JSON verdict (tweet, fake, confidence, reason)"""
+    return {
+        "tweet": row["tweet"],
+        "fake": bool(row["fake"]),
+        "confidence": row["confidence"],
+        "reason": row["reason"]
+    }
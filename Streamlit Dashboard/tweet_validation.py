@@ -0,0 +1,234 @@
+# tweet_validation.py
+#
+# LLM prompts for tweet validation, one tweet per prompt or several per prompt.
+#
+# Batched validation states the rules once and packs several tweets, each with
+# its own sensor evidence, into one prompt asking for a JSON array. Verdicts
+# are parsed item by item, so a truncated or partly malformed answer still
+# yields the valid items; only missing items are asked again, in smaller
+# batches. Every prompt asks the server for JSON output, and formatting slips
+# are repaired locally (json_output) before an item counts as missing.
+
+from typing import Any, Dict, List, Optional
+
+from json_output import VERDICT_SCHEMA, coerce, json_values, validate
+
+RULES = """
+Evaluate the tweet and determine if it's fake or real using these rules:
+- Sensor `reading_value` indicates risk from 0–100
+- Use sensors within ±10min and 5km and keep the clusters in mind
+- Risk > 85 → High Confidence
+- Risk 70–85 → Medium
+- Else → Low
+""".strip()
+
+# Rough token estimate (characters per token) and expected answer size per tweet
+CHARS_PER_TOKEN = 4
+ANSWER_TOKENS_PER_TWEET = 120
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of tokens of a text"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def single_tweet_prompt(tweet_payload: Dict[str, Any], sensor_block: str) -> str:
+    """Prompt validating one tweet (answer: one JSON object)"""
+    return f"""
+You are the AI brain of a Smart City, responsible for validating tweets during a multi-disaster crisis using real-time sensor data.
+
+{RULES}
+
+Respond with JSON:
+{{
+  "tweet": "...",
+  "fake": true/false,
+  "confidence": "high/medium/low",
+  "reason": "..."
+}}
+
+TWEET DATA:
+{tweet_payload}
+
+SENSOR DATA:
+{sensor_block}
+""".strip()
+
+
+def _batch_header() -> str:
+    return f"""
+You are the AI brain of a Smart City, responsible for validating tweets during a multi-disaster crisis using real-time sensor data.
+
+Validate EACH tweet below independently, using only its own sensor data.
+
+{RULES}
+
+Respond with a JSON object whose "verdicts" array holds one object per tweet:
+{{
+  "verdicts": [
+    {{
+      "id": <the tweet's id>,
+      "tweet": "...",
+      "fake": true/false,
+      "confidence": "high/medium/low",
+      "reason": "..."
+    }}
+  ]
+}}
+""".strip()
+
+
+def _batch_item(item_id: Any, tweet_payload: Dict[str, Any], sensor_block: str) -> str:
+    return f"""
+### Tweet id {item_id}
+TWEET DATA:
+{tweet_payload}
+
+SENSOR DATA:
+{sensor_block}
+""".strip()
+
+
+def batch_prompt(items: List[Dict[str, Any]]) -> str:
+    """
+    Prompt validating several tweets (answer: JSON object with a "verdicts" array)
+
+    Args:
+        items: Dictionaries with id, tweet_payload and sensor_block
+    """
+    blocks = [_batch_item(item["id"], item["tweet_payload"], item["sensor_block"]) for item in items]
+    return _batch_header() + "\n\n" + "\n\n".join(blocks)
+
+
+def plan_batches(items: List[Dict[str, Any]], token_budget: int, max_batch_size: int) -> List[List[Dict[str, Any]]]:
+    """
+    Greedily pack items into batches that fit the token budget
+
+    A batch's cost is the shared instructions plus, per item, its evidence and
+    its expected answer. An item that does not fit even alone gets a batch of
+    its own.
+
+    Args:
+        items: Dictionaries with id, tweet_payload and sensor_block
+        token_budget: Tokens available per call (prompt and answer)
+        max_batch_size: Maximum items per batch
+    """
+    header_tokens = estimate_tokens(_batch_header())
+    batches, current, used = [], [], header_tokens
+    for item in items:
+        cost = estimate_tokens(_batch_item(item["id"], item["tweet_payload"], item["sensor_block"])) \
+            + ANSWER_TOKENS_PER_TWEET
+        if current and (used + cost > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current, used = [], header_tokens
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _candidates(value: Any) -> List[Any]:
+    """Verdict-like objects in a decoded value (a verdict, a list, or a {"verdicts": [...]} wrapper)"""
+    if isinstance(value, list):
+        return [item for element in value for item in _candidates(element)]
+    if isinstance(value, dict) and isinstance(value.get("verdicts"), list):
+        return _candidates(value["verdicts"])
+    return [value]
+
+
+def parse_verdicts(text: str, expected_ids: List[Any]) -> Dict[Any, Dict[str, Any]]:
+    """
+    Extract the valid verdicts from a batch answer, item by item
+
+    Every JSON value in the text is decoded on its own and each verdict is
+    repaired and validated against VERDICT_SCHEMA separately, so code fences,
+    surrounding prose, a truncated array or one malformed item do not lose
+    the other items. With a single expected id, an object without "id" (the
+    single-tweet answer format) is accepted for it.
+
+    Args:
+        text: LLM answer
+        expected_ids: Ids of the tweets in the batch
+
+    Returns:
+        Dictionary id -> verdict (tweet, fake, confidence, reason) for valid items only
+    """
+    by_key = {str(item_id): item_id for item_id in expected_ids}
+    verdicts = {}
+    for value in (candidate for decoded in json_values(text) for candidate in _candidates(decoded)):
+        if not isinstance(value, dict):
+            continue
+        if len(expected_ids) == 1 and "id" not in value:
+            value = dict(value, id=expected_ids[0])
+        value = coerce(value, VERDICT_SCHEMA)
+        if not validate(value, VERDICT_SCHEMA) and str(value.get("id")) in by_key:
+            item_id = by_key[str(value["id"])]
+            verdicts.setdefault(item_id, {
+                "tweet": value.get("tweet", ""),
+                "fake": value["fake"],
+                "confidence": value["confidence"],
+                "reason": value["reason"]
+            })
+    return verdicts
+
+
+def validate_tweets_batched(llm,
+                            items: List[Dict[str, Any]],
+                            token_budget: int = 4096,
+                            max_batch_size: int = 8,
+                            max_rounds: int = 3,
+                            use_cache: Optional[bool] = None) -> Dict[Any, Dict[str, Any]]:
+    """
+    Validate tweets with batched prompts, re-asking only for missing items
+
+    Each round sends its batches concurrently (llm.map), asking the server for
+    JSON output. Items missing or malformed (after local repair) in an answer
+    are retried in the next round with half the batch
+    size; the last round asks for them one per prompt.
+
+    Args:
+        llm: OllamaLLM client
+        items: Dictionaries with id, tweet_payload and sensor_block
+        token_budget: Tokens per call (the model's context window)
+        max_batch_size: Maximum tweets per prompt in the first round
+        max_rounds: Number of rounds, including the first
+        use_cache: Response cache setting (see OllamaLLM.__call__)
+
+    Returns:
+        Dictionary id -> verdict; tweets still unanswered get a verdict with
+        confidence "error"
+    """
+    verdicts = {}
+    pending = list(items)
+    batch_size = max_batch_size
+
+    for round_index in range(max_rounds):
+        if not pending:
+            break
+        if round_index == max_rounds - 1:
+            batch_size = 1
+        batches = plan_batches(pending, token_budget, batch_size)
+        prompts = [
+            batch_prompt(batch) if len(batch) > 1
+            else single_tweet_prompt(batch[0]["tweet_payload"], batch[0]["sensor_block"])
+            for batch in batches
+        ]
+        # Retries skip the response cache, which may hold the malformed answer
+        answers = llm.map(prompts, return_exceptions=True, use_cache=use_cache if round_index == 0 else False,
+                          format="json")
+
+        for batch, answer in zip(batches, answers):
+            if not isinstance(answer, Exception):
+                verdicts.update(parse_verdicts(answer, [item["id"] for item in batch]))
+
+        pending = [item for item in pending if item["id"] not in verdicts]
+        batch_size = max(1, batch_size // 2)
+
+    for item in pending:
+        verdicts[item["id"]] = {
+            "tweet": item["tweet_payload"].get("tweet", ""),
+            "confidence": "error",
+            "reason": f"Agent failed: no valid verdict after {max_rounds} attempts"
+        }
+    return verdicts
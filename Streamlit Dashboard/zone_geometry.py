@@ -0,0 +1,130 @@
+# zone_geometry.py
+#
+# Per-zone geometry and aggregates derived from the scored sensor table.
+#
+# One groupby over the sensors yields, for every zone: centroid, bounding
+# box, sensor count, sensors per type, dominant sensor type and anomaly score
+# statistics. The table is persisted next to zone_stress_index.csv, tagged
+# with the content hash of the sensor data it was built from, so it is only
+# recomputed when the sensors change. It is also tagged with the sensor files'
+# sizes and mtimes, so an unchanged file is recognised without hashing it. Maps join zones against it instead of
+# filtering the sensor table once per zone.
+
+import os
+import numpy as np
+import pandas as pd
+from typing import Optional, Sequence
+
+from data_store import DATA_DIR, write_atomic
+
+ZONE_GEOMETRY_PATH = os.path.join(DATA_DIR, "zone_geometry.csv")
+ANOMALY_QUANTILES = (0.25, 0.5, 0.75, 0.95)
+TYPE_COUNT_PREFIX = "sensors_"
+
+# Columns of the sensor table the geometry is built from
+SOURCE_COLUMNS = ["nearest_zone_name", "latitude", "longitude", "sensor_type", "anomaly_score"]
+
+
+def build_zone_geometry(sensors: pd.DataFrame, quantiles: Sequence[float] = ANOMALY_QUANTILES) -> pd.DataFrame:
+    """
+    Aggregate the sensor table per zone
+
+    Args:
+        sensors: Sensors with nearest_zone_name, latitude, longitude, sensor_type
+            and anomaly_score columns
+        quantiles: Anomaly score quantiles to compute
+
+    Returns:
+        DataFrame with one row per zone and columns:
+            - nearest_zone_name: Zone
+            - centroid_lat / centroid_lon: Mean sensor position
+            - min_lat / max_lat / min_lon / max_lon: Bounding box of the zone's sensors
+            - sensor_count: Number of sensors
+            - sensors_<type>: Number of sensors of each type
+            - dominant_sensor_type: Most common sensor type
+            - anomaly_mean / anomaly_max / anomaly_p<q>: Anomaly score statistics
+    """
+    types = sensors["sensor_type"].fillna("unknown").astype(str)
+    counts = pd.get_dummies(types, prefix=TYPE_COUNT_PREFIX.rstrip("_"), dtype=np.int32)
+    frame = pd.concat([sensors[["nearest_zone_name", "latitude", "longitude", "anomaly_score"]], counts], axis=1)
+
+    # One grouping, shared by every aggregate
+    grouped = frame.groupby("nearest_zone_name", sort=True)
+    table = grouped.agg(
+        centroid_lat=("latitude", "mean"),
+        centroid_lon=("longitude", "mean"),
+        min_lat=("latitude", "min"),
+        max_lat=("latitude", "max"),
+        min_lon=("longitude", "min"),
+        max_lon=("longitude", "max"),
+        sensor_count=("latitude", "size"),
+        anomaly_mean=("anomaly_score", "mean"),
+        anomaly_max=("anomaly_score", "max")
+    )
+    type_counts = grouped[list(counts.columns)].sum()
+    quantile_table = grouped["anomaly_score"].quantile(list(quantiles)).unstack()
+    quantile_table.columns = [f"anomaly_p{round(q * 100)}" for q in quantile_table.columns]
+
+    table = table.join(quantile_table).join(type_counts)
+    table["dominant_sensor_type"] = (
+        type_counts.idxmax(axis=1).str.slice(len(TYPE_COUNT_PREFIX)) if len(type_counts.columns) else "unknown"
+    )
+    return table.reset_index()
+
+
+def write_zone_geometry(table: pd.DataFrame, source_version: str, path: str = ZONE_GEOMETRY_PATH,
+                        source_stat: str = "") -> None:
+    """
+    Persist the zone table, tagged with the version of the sensor data it came from
+
+    Args:
+        table: Zone table (see build_zone_geometry)
+        source_version: Content hash of the sensor data (data_store.source_version)
+        path: Output CSV path
+        source_stat: Sizes and mtimes of the sensor files (data_store.source_stat)
+    """
+    table = table.assign(source_version=source_version, source_stat=source_stat)
+    write_atomic(path, lambda staging: table.to_csv(staging, index=False))
+
+
+def read_zone_geometry(source_version: Optional[str] = None, path: str = ZONE_GEOMETRY_PATH,
+                       source_stat: Optional[str] = None) -> Optional[pd.DataFrame]:
+    """
+    Persisted zone table, if it was built from this version of the sensor data
+
+    Checking source_stat alone avoids hashing the sensor data when its files
+    have not been written since the table was.
+
+    Args:
+        source_version: Required content hash of the sensor data, if given
+        path: CSV path
+        source_stat: Required sizes and mtimes of the sensor files, if given
+
+    Returns:
+        The table, or None if the file is missing, unreadable or from another version
+    """
+    if source_version is None and source_stat is None:
+        raise ValueError("source_version or source_stat is required")
+    try:
+        table = pd.read_csv(path, dtype={"nearest_zone_name": np.int32, "dominant_sensor_type": str,
+                                         "source_version": str, "source_stat": str})
+    except (OSError, ValueError, pd.errors.ParserError):
+        return None
+    tags = {"source_version": source_version, "source_stat": source_stat}
+    for column, expected in tags.items():
+        if expected is not None and (column not in table.columns or (table[column] != expected).any()):
+            return None
+    if table.empty:
+        return None
+    return table.drop(columns=[column for column in tags if column in table.columns])
+
+
+# Example usage
+if __name__ == "__main__":
+    from data_store import load_table, source_stat, source_version
+
+    sensors = load_table("sensor_scores", columns=SOURCE_COLUMNS)
+    geometry = build_zone_geometry(sensors)
+    write_zone_geometry(geometry, source_version("sensor_scores"), source_stat=source_stat("sensor_scores"))
+    print(f"✅ Wrote {len(geometry)} zones to {ZONE_GEOMETRY_PATH}")
+    print(geometry.head())
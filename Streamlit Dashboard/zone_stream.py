@@ -0,0 +1,392 @@
+# zone_stream.py
+#
+# Streaming, incremental zone stress aggregation.
+#
+# zone_stress_index.csv is computed in batch from the scored sensors. Here the
+# same metrics (avg_anomaly_score, faulty_rate, sensor_count and zone_stress =
+# 0.6 * avg_anomaly_score + 0.4 * faulty_rate) are maintained as scored sensor
+# readings arrive, each reading updating its zone in O(1):
+#
+# - Current state: the latest reading of every sensor. A new reading replaces
+#   the sensor's previous contribution (Welford add/remove), and sensors
+#   without a reading for sensor_ttl seconds expire.
+# - Sliding window: every reading of the last window_seconds.
+# - Tumbling windows: readings per fixed tumbling_seconds interval; the last
+#   closed intervals are kept.
+#
+# A reading older than its sensor's latest is counted as late and ignored by
+# all three, so the windows agree with the current state.
+#
+# The high-stress (> 0.6) zone set is updated with every reading. Snapshots are
+# published as one CSV replaced atomically, which the dashboard reads through
+# data_access.live_zones.
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+import pandas as pd
+
+from data_store import DATA_DIR, write_atomic
+
+LIVE_ZONES_PATH = os.path.join(DATA_DIR, "zone_stress_live.csv")
+ANOMALY_WEIGHT = 0.6
+FAULTY_WEIGHT = 0.4
+HIGH_STRESS_THRESHOLD = 0.6
+
+# Columns of a published snapshot: those of zone_stress_index.csv, then sliding window metrics
+ZONE_COLUMNS = ["nearest_zone_name", "avg_anomaly_score", "faulty_rate", "sensor_count", "zone_stress"]
+WINDOW_COLUMNS = ["window_readings", "window_avg_anomaly_score", "window_faulty_rate", "window_zone_stress"]
+
+
+def zone_stress(avg_anomaly_score: float, faulty_rate: float) -> float:
+    """Zone stress from the mean anomaly score and the faulty sensor rate"""
+    return ANOMALY_WEIGHT * avg_anomaly_score + FAULTY_WEIGHT * faulty_rate
+
+
+def is_faulty(status: Any) -> bool:
+    """Whether a sensor status means faulty"""
+    return str(status).lower() == "faulty"
+
+
+class RunningStats:
+    """
+    Count, mean and variance of anomaly scores plus a faulty count, with O(1)
+    add and remove (Welford's algorithm and its inverse)
+    """
+
+    __slots__ = ("count", "mean", "m2", "faulty")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.faulty = 0
+
+    def add(self, score: float, faulty: bool):
+        self.count += 1
+        delta = score - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (score - self.mean)
+        self.faulty += int(faulty)
+
+    def remove(self, score: float, faulty: bool):
+        if self.count <= 1:
+            self.__init__()
+            return
+        self.count -= 1
+        delta = score - self.mean
+        self.mean -= delta / self.count
+        self.m2 = max(self.m2 - delta * (score - self.mean), 0.0)
+        self.faulty -= int(faulty)
+
+    @property
+    def faulty_rate(self) -> float:
+        return self.faulty / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    @property
+    def stress(self) -> float:
+        return zone_stress(self.mean, self.faulty_rate)
+
+
+class ZoneStressAggregator:
+    """
+    Per-zone stress metrics maintained from a stream of scored sensor readings
+
+    Safe to update from one thread while others take snapshots.
+    """
+
+    def __init__(self, sensor_ttl: float = 3600.0, window_seconds: float = 300.0,
+                 tumbling_seconds: float = 60.0, closed_windows: int = 60,
+                 high_stress_threshold: float = HIGH_STRESS_THRESHOLD):
+        """
+        Create an empty aggregator
+
+        Args:
+            sensor_ttl: Seconds after its latest reading before a sensor expires
+            window_seconds: Length of the sliding window
+            tumbling_seconds: Length of the tumbling windows
+            closed_windows: Number of closed tumbling windows kept
+            high_stress_threshold: Zones with a stress above this are high stress
+        """
+        self.sensor_ttl = sensor_ttl
+        self.window_seconds = window_seconds
+        self.tumbling_seconds = tumbling_seconds
+        self.high_stress_threshold = high_stress_threshold
+        self._lock = threading.Lock()
+
+        # Latest reading per sensor, in order of update: sensor_id -> (zone, timestamp, score, faulty)
+        self._sensors: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._zones: Dict[Hashable, RunningStats] = {}
+        self._high_stress = set()
+
+        # Sliding window readings (zone, timestamp, score, faulty), in order of arrival
+        self._window: deque = deque()
+        self._window_zones: Dict[Hashable, RunningStats] = {}
+
+        self._tumbling_start: Optional[float] = None
+        self._tumbling_zones: Dict[Hashable, RunningStats] = {}
+        self._closed: deque = deque(maxlen=closed_windows)
+
+        self.watermark: Optional[float] = None
+        self.stats = {"readings": 0, "late_readings": 0, "expired_sensors": 0, "invalid_readings": 0}
+
+    def update(self, sensor_id: Hashable, zone: Hashable, timestamp: float, anomaly_score: float,
+               faulty: bool = False) -> None:
+        """
+        Add one reading
+
+        Args:
+            sensor_id: Sensor
+            zone: Zone of the sensor (nearest_zone_name)
+            timestamp: Reading time, in seconds since the epoch
+            anomaly_score: Anomaly score of the reading
+            faulty: Whether the sensor reported a faulty status
+        """
+        timestamp, anomaly_score, faulty = float(timestamp), float(anomaly_score), bool(faulty)
+        with self._lock:
+            if math.isnan(anomaly_score) or math.isnan(timestamp):
+                self.stats["invalid_readings"] += 1
+                return
+            self.stats["readings"] += 1
+            if self.watermark is None or timestamp > self.watermark:
+                self.watermark = timestamp
+
+            if not self._update_sensor(sensor_id, zone, timestamp, anomaly_score, faulty):
+                return
+            self._update_window(zone, timestamp, anomaly_score, faulty)
+            self._update_tumbling(zone, timestamp, anomaly_score, faulty)
+            self._expire_sensors()
+
+    def update_many(self, readings: pd.DataFrame, timestamp_column: str = "timestamp") -> None:
+        """
+        Add readings from a DataFrame with sensor_id, nearest_zone_name, timestamp,
+        anomaly_score and status columns, in row order
+        """
+        seconds = pd.to_datetime(readings[timestamp_column]).to_numpy("datetime64[ns]").astype("int64") / 1e9
+        faulty = readings["status"].astype(str).str.lower().eq("faulty").to_numpy()
+        for sensor_id, zone, ts, score, bad in zip(readings["sensor_id"].tolist(),
+                                                   readings["nearest_zone_name"].tolist(), seconds.tolist(),
+                                                   readings["anomaly_score"].tolist(), faulty.tolist()):
+            self.update(sensor_id, zone, ts, score, bad)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """
+        Expire sensors without a reading for sensor_ttl seconds
+
+        Called on every reading; call it with the current time when readings stop.
+
+        Returns:
+            Number of sensors expired
+        """
+        with self._lock:
+            if now is not None and (self.watermark is None or now > self.watermark):
+                self.watermark = float(now)
+            return self._expire_sensors()
+
+    def _update_sensor(self, sensor_id, zone, timestamp, score, faulty) -> bool:
+        # False for a late reading (older than the sensor's latest), which is then ignored
+        previous = self._sensors.get(sensor_id)
+        if previous is not None:
+            old_zone, old_timestamp, old_score, old_faulty = previous
+            if timestamp < old_timestamp:
+                self.stats["late_readings"] += 1
+                return False
+            self._zones[old_zone].remove(old_score, old_faulty)
+            self._refresh_zone(old_zone)
+            self._sensors.move_to_end(sensor_id)
+        self._sensors[sensor_id] = (zone, timestamp, score, faulty)
+        self._zones.setdefault(zone, RunningStats()).add(score, faulty)
+        self._refresh_zone(zone)
+        return True
+
+    def _refresh_zone(self, zone):
+        stats = self._zones[zone]
+        if stats.count == 0:
+            del self._zones[zone]
+            self._high_stress.discard(zone)
+        elif stats.stress > self.high_stress_threshold:
+            self._high_stress.add(zone)
+        else:
+            self._high_stress.discard(zone)
+
+    def _expire_sensors(self) -> int:
+        # Sensors are kept in order of update, so the stale ones are at the front (a sensor
+        # whose reading arrived out of order may expire up to that delay late)
+        expired = 0
+        cutoff = self.watermark - self.sensor_ttl if self.watermark is not None else None
+        while self._sensors and cutoff is not None:
+            sensor_id, (zone, timestamp, score, faulty) = next(iter(self._sensors.items()))
+            if timestamp >= cutoff:
+                break
+            del self._sensors[sensor_id]
+            self._zones[zone].remove(score, faulty)
+            self._refresh_zone(zone)
+            expired += 1
+        self.stats["expired_sensors"] += expired
+        return expired
+
+    def _update_window(self, zone, timestamp, score, faulty):
+        cutoff = self.watermark - self.window_seconds
+        if timestamp >= cutoff:
+            self._window.append((zone, timestamp, score, faulty))
+            self._window_zones.setdefault(zone, RunningStats()).add(score, faulty)
+        while self._window and self._window[0][1] < cutoff:
+            old_zone, _, old_score, old_faulty = self._window.popleft()
+            stats = self._window_zones[old_zone]
+            stats.remove(old_score, old_faulty)
+            if stats.count == 0:
+                del self._window_zones[old_zone]
+
+    def _update_tumbling(self, zone, timestamp, score, faulty):
+        start = math.floor(timestamp / self.tumbling_seconds) * self.tumbling_seconds
+        if self._tumbling_start is None:
+            self._tumbling_start = start
+        elif start > self._tumbling_start:
+            self._close_tumbling()
+            self._tumbling_start = start
+        elif start < self._tumbling_start:
+            # The reading's window is already closed
+            return
+        self._tumbling_zones.setdefault(zone, RunningStats()).add(score, faulty)
+
+    def _close_tumbling(self):
+        table = _zone_table(self._tumbling_zones)
+        table.insert(0, "window_start", pd.to_datetime(self._tumbling_start, unit="s"))
+        self._closed.append(table)
+        self._tumbling_zones = {}
+
+    @property
+    def high_stress_zones(self) -> List[Hashable]:
+        """Zones whose current stress is above the threshold"""
+        with self._lock:
+            return sorted(self._high_stress)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Consistent copy of the current metrics
+
+        Returns:
+            Dictionary containing:
+                - zones: DataFrame with the columns of zone_stress_index.csv (from the
+                  latest reading of every live sensor) and the sliding window metrics
+                - tumbling: Closed tumbling windows, one row per window and zone
+                - high_stress_zones: Zones above the stress threshold
+                - watermark: Time of the newest reading (datetime, or None)
+                - stats: Reading, late reading, invalid reading and expiry counters
+        """
+        with self._lock:
+            zones = _zone_table(self._zones)
+            window = _zone_table(self._window_zones)
+            tumbling = pd.concat(list(self._closed), ignore_index=True) if self._closed else pd.DataFrame()
+            high_stress = sorted(self._high_stress)
+            watermark = self.watermark
+            stats = dict(self.stats)
+
+        window = window.rename(columns={
+            "sensor_count": "window_readings",
+            "avg_anomaly_score": "window_avg_anomaly_score",
+            "faulty_rate": "window_faulty_rate",
+            "zone_stress": "window_zone_stress"
+        })
+        zones = zones.merge(window, on="nearest_zone_name", how="left")
+        zones["window_readings"] = zones["window_readings"].fillna(0).astype(int)
+        return {
+            "zones": zones,
+            "tumbling": tumbling,
+            "high_stress_zones": high_stress,
+            "watermark": pd.to_datetime(watermark, unit="s") if watermark is not None else None,
+            "stats": stats
+        }
+
+
+def _zone_table(zones: Dict[Hashable, RunningStats]) -> pd.DataFrame:
+    rows = [(zone, stats.mean, stats.faulty_rate, stats.count, stats.stress) for zone, stats in zones.items()]
+    return pd.DataFrame(rows, columns=ZONE_COLUMNS).sort_values("nearest_zone_name", ignore_index=True)
+
+
+def publish_snapshot(snapshot: Dict[str, Any], path: str = LIVE_ZONES_PATH) -> None:
+    """
+    Write a snapshot's zone table for the dashboard
+
+    Every row carries the snapshot's watermark and publication time.
+    """
+    table = snapshot["zones"].assign(
+        watermark=snapshot["watermark"],
+        published_at=pd.Timestamp.now().floor("s")
+    )
+    write_atomic(path, lambda staging: table.to_csv(staging, index=False))
+
+
+def read_snapshot(path: str = LIVE_ZONES_PATH) -> Optional[pd.DataFrame]:
+    """
+    Latest published zone table
+
+    Returns:
+        The table, or None if nothing was published
+    """
+    try:
+        return pd.read_csv(path, parse_dates=["watermark", "published_at"])
+    except (OSError, ValueError, pd.errors.ParserError):
+        return None
+
+
+def run(readings: Iterable[Dict[str, Any]], aggregator: Optional[ZoneStressAggregator] = None,
+        publish_interval: float = 2.0, path: str = LIVE_ZONES_PATH) -> ZoneStressAggregator:
+    """
+    Aggregate a stream of readings, publishing a snapshot every publish_interval seconds
+
+    Args:
+        readings: Iterable of dictionaries with sensor_id, nearest_zone_name,
+            timestamp (seconds since the epoch), anomaly_score and status keys
+            (e.g. a message queue consumer)
+        aggregator: Aggregator to update (a new one if None)
+        publish_interval: Seconds between snapshots
+        path: Snapshot file
+
+    Returns:
+        The aggregator, after a final snapshot once the stream ends
+    """
+    aggregator = aggregator or ZoneStressAggregator()
+    last_published = time.monotonic()
+    previous_high_stress = set()
+    for reading in readings:
+        aggregator.update(reading["sensor_id"], reading["nearest_zone_name"], reading["timestamp"],
+                          reading["anomaly_score"], is_faulty(reading.get("status")))
+        if time.monotonic() - last_published >= publish_interval:
+            previous_high_stress = _publish(aggregator, path, previous_high_stress)
+            last_published = time.monotonic()
+    _publish(aggregator, path, previous_high_stress)
+    return aggregator
+
+
+def _publish(aggregator: ZoneStressAggregator, path: str, previous_high_stress: set) -> set:
+    snapshot = aggregator.snapshot()
+    publish_snapshot(snapshot, path)
+    high_stress = set(snapshot["high_stress_zones"])
+    if high_stress != previous_high_stress:
+        print(f"⚠️ High stress zones: {len(high_stress)} "
+              f"(+{len(high_stress - previous_high_stress)}, -{len(previous_high_stress - high_stress)})")
+    return high_stress
+
+
+# Example usage
+if __name__ == "__main__":
+    from data_store import load_table
+
+    # Replaying the scored sensors as readings reproduces zone_stress_index.csv
+    sensors = load_table("sensor_scores", columns=["sensor_id", "nearest_zone_name", "anomaly_score", "status"])
+    now = time.time()
+    readings = (dict(row, timestamp=now) for row in sensors.to_dict("records"))
+    aggregator = run(readings)
+    snapshot = aggregator.snapshot()
+    print(f"✅ Published {len(snapshot['zones'])} zones to {LIVE_ZONES_PATH}")
+    print(f"High stress zones: {snapshot['high_stress_zones']}")
+    print(snapshot["zones"].head())